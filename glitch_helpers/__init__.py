@@ -0,0 +1,34 @@
+"""Reusable helpers for the fault injection training notebooks.
+
+The notebooks under ``day3`` and ``day4`` drive a single global
+``scope``/``target`` pair from hand written loops. The modules in this
+package pull the reusable parts of those loops out so they can be shared
+between the labs. To use them from a notebook, add the repository root to
+the path first::
+
+    import sys
+    sys.path.insert(0, "../..")
+    from glitch_helpers.search import Range, AdaptiveSearch
+"""
+
+from glitch_helpers.search import Range, AdaptiveSearch
+from glitch_helpers.campaign import CampaignRunner, StageTimer
+from glitch_helpers.results import ResultStore
+from glitch_helpers.anomaly import TraceAnomalyDetector
+from glitch_helpers.capture import BatchCapture, capture_batch
+from glitch_helpers.health import HealthMonitor
+from glitch_helpers.uart import LineReader
+from glitch_helpers.rigs import RigScheduler, RigSpec
+from glitch_helpers.checkpoint import Sweep, CheckpointedSweep, StopSweep
+from glitch_helpers.plotting import LivePlot
+from glitch_helpers.heatmap import GlitchHeatmap
+from glitch_helpers.classify import Classifier
+from glitch_helpers.bandit import BetaScheduler
+from glitch_helpers.timing import TriggerProfiler, JitterTracker
+from glitch_helpers.segment import rank_ext_offsets
+from glitch_helpers.instrument import Tracer, instrument
+from glitch_helpers.regcache import GlitchCache, sweep
+from glitch_helpers.archive import TraceArchive
+from glitch_helpers.dump import extract_dump, hexdump, print_dump
+from glitch_helpers.uart_mux import UartMux
+from glitch_helpers.cellstats import CellStats, wilson
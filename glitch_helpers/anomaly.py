@@ -0,0 +1,129 @@
+"""Streaming detector for glitched power traces.
+
+Attack 2 compares every trace against one captured ``ref_trace`` with
+``np.sum(abs(ref_trace - trace))`` and a hard coded threshold of 300. That
+allocates two temporary arrays per attempt and the threshold has to be
+tuned per board.
+
+:class:`TraceAnomalyDetector` instead learns a per-sample mean and
+variance from the first ``warmup`` unglitched captures and scores each
+trace as the RMS z-score against that reference. Normal traces score
+around 1 on any board, so the threshold does not need retuning. Scoring
+reuses preallocated buffers.
+
+Example::
+
+    det = TraceAnomalyDetector(scope.adc.samples, warmup=50, window=(0, 2000))
+    scope.io.hs2 = "clkgen"   # no glitches while learning the reference
+    for _ in range(50):
+        ...
+        det.add_reference(scope.get_last_trace())
+    scope.io.hs2 = "glitch"
+    ...
+    if det.is_anomaly(scope.get_last_trace()):
+        plot.send(trace)
+"""
+import numpy as np
+
+
+class TraceAnomalyDetector(object):
+    """Running mean/variance reference trace with in-place scoring.
+
+    Args:
+        samples (int): Length of the captured traces.
+        warmup (int): Number of reference traces to collect before scoring.
+        window (tuple): Optional ``(start, stop)`` sample range to score,
+            e.g. the part of the trace just after the trigger.
+        threshold (float): Score above which a trace is flagged. Scores are
+            RMS z-scores, so unglitched traces sit around 1.
+        min_std (float): Floor on the per-sample standard deviation, so
+            that samples with no noise in the reference do not dominate.
+    """
+    def __init__(self, samples, warmup=50, window=None, threshold=3.0, min_std=1e-3):
+        start, stop = window if window is not None else (0, samples)
+        self.window = slice(start, stop)
+        n = len(range(samples)[self.window])
+        self.warmup = warmup
+        self.threshold = threshold
+        self.min_std = min_std
+        self.count = 0
+        self._mean = np.zeros(n)
+        self._m2 = np.zeros(n)
+        self._delta = np.zeros(n)
+        self._inv_std = None
+        self._buf = np.zeros(n)
+        self._batch = np.zeros((0, n))
+
+    @property
+    def ready(self):
+        """True once ``warmup`` reference traces have been collected."""
+        return self.count >= self.warmup
+
+    @property
+    def mean(self):
+        """Mean reference trace over the scored window."""
+        return self._mean
+
+    @property
+    def std(self):
+        """Per-sample standard deviation of the reference traces."""
+        if self.count < 2:
+            return np.zeros_like(self._mean)
+        return np.sqrt(self._m2 / (self.count - 1))
+
+    def add_reference(self, trace):
+        """Fold an unglitched trace into the reference (Welford's update)."""
+        x = np.asarray(trace)[self.window]
+        self.count += 1
+        np.subtract(x, self._mean, out=self._delta)
+        self._mean += self._delta / self.count
+        # m2 += delta * (x - new_mean)
+        np.subtract(x, self._mean, out=self._buf)
+        self._buf *= self._delta
+        self._m2 += self._buf
+        self._inv_std = None
+
+    def _scale(self):
+        if self._inv_std is None:
+            self._inv_std = 1.0 / np.maximum(self.std, self.min_std)
+        return self._inv_std
+
+    def score(self, trace):
+        """RMS z-score of ``trace`` against the reference."""
+        if not self.ready:
+            raise RuntimeError("Need {} reference traces, have {}".format(self.warmup, self.count))
+        buf = self._buf
+        np.subtract(np.asarray(trace)[self.window], self._mean, out=buf)
+        buf *= self._scale()
+        return float(np.sqrt(np.dot(buf, buf) / len(buf)))
+
+    def is_anomaly(self, trace):
+        return self.score(trace) > self.threshold
+
+    def observe(self, trace):
+        """Use ``trace`` as a reference until warmed up, then score it.
+
+        Returns the score, or ``None`` while still warming up.
+        """
+        if not self.ready:
+            self.add_reference(trace)
+            return None
+        return self.score(trace)
+
+    def score_batch(self, traces):
+        """Score a ``(K, samples)`` array of traces at once."""
+        if not self.ready:
+            raise RuntimeError("Need {} reference traces, have {}".format(self.warmup, self.count))
+        traces = np.asarray(traces)
+        k = len(traces)
+        if self._batch.shape[0] < k:
+            self._batch = np.zeros((k, len(self._mean)))
+        buf = self._batch[:k]
+        np.subtract(traces[:, self.window], self._mean, out=buf)
+        buf *= self._scale()
+        np.square(buf, out=buf)
+        return np.sqrt(buf.mean(axis=1))
+
+    def flag_batch(self, traces):
+        """Boolean mask of the anomalous traces in a ``(K, samples)`` array."""
+        return self.score_batch(traces) > self.threshold
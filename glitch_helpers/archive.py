@@ -0,0 +1,347 @@
+"""Compressed, append-only archive of captured traces.
+
+Attack 2 keeps one trace, ``success_plot = trace[:]``, and the next
+success overwrites it. :class:`TraceArchive` keeps every trace (or every
+``n``-th unremarkable one, plus all others) together with its glitch
+settings and outcome, so a campaign can be re-analysed later.
+
+Traces are stored as int16 ADC codes (``trace * scale``; with the default
+``scale`` of 1024 the ChipWhisperer's 10 bit samples are kept exactly),
+delta encoded along the trace, byte shuffled and compressed in blocks of
+``block_size`` traces. zstandard or blosc are used if installed, zlib
+otherwise. A fixed size record per trace is kept in a separate index file
+that is memory mapped on read, so selecting traces by attempt number or
+by glitch settings only decompresses the blocks that hold them. Reopening
+an archive whose last flush was interrupted drops the half written records.
+
+Example::
+
+    archive = TraceArchive("attack2_traces", samples=scope.adc.samples)
+    ...
+    archive.add(trace, outcome="success" if success else "normal",
+                width=width, offset=offset, ext_offset=ext_offset)
+    ...
+    archive.close()
+
+    archive = TraceArchive.open("attack2_traces")
+    idx = archive.query(outcome="success", ext_offset=(5, 10))
+    traces = archive.traces(idx)
+"""
+import json
+import os
+import zlib
+
+import numpy as np
+
+DEFAULT_PARAMS = ("width", "offset", "ext_offset")
+OUTCOMES = ("normal", "success", "reset", "crash")
+CODECS = ("zstd", "blosc", "zlib")
+
+_META_FILE = "archive.json"
+_DATA_FILE = "traces.bin"
+_BLOCK_FILE = "blocks.bin"
+_INDEX_FILE = "index.bin"
+_BLOCK_DTYPE = np.dtype([("offset", "i8"), ("nbytes", "i8"), ("count", "i4")])
+
+
+def available_codec():
+    """Name of the best installed codec in :data:`CODECS`."""
+    for name in CODECS[:-1]:
+        try:
+            _compressor(name)
+        except ImportError:
+            continue
+        return name
+    return "zlib"
+
+
+def _compressor(name, level=3):
+    """``(compress, decompress, shuffles)`` functions for codec ``name``."""
+    if name == "zstd":
+        import zstandard
+        c = zstandard.ZstdCompressor(level=level)
+        d = zstandard.ZstdDecompressor()
+        return c.compress, d.decompress, False
+    if name == "blosc":
+        import blosc
+        # blosc shuffles bytes itself.
+        return (lambda data: blosc.compress(data, typesize=2, clevel=level, shuffle=blosc.SHUFFLE),
+                blosc.decompress, True)
+    if name == "zlib":
+        return lambda data: zlib.compress(data, level), zlib.decompress, False
+    raise ValueError("Unknown codec {!r}, expected one of {}".format(name, CODECS))
+
+
+def encode_block(codes):
+    """Delta encode ``(K, samples)`` int16 codes along each trace.
+
+    Wraps around on overflow, which :func:`decode_block` undoes exactly.
+    """
+    out = np.empty_like(codes)
+    out[:, 0] = codes[:, 0]
+    np.subtract(codes[:, 1:], codes[:, :-1], out=out[:, 1:])
+    return out
+
+
+def decode_block(deltas):
+    return np.cumsum(deltas, axis=1, dtype=np.int16)
+
+
+def _shuffle(a):
+    return a.view(np.uint8).reshape(-1, 2).T.tobytes()
+
+
+def _unshuffle(data, shape):
+    b = np.frombuffer(data, dtype=np.uint8).reshape(2, -1).T
+    return np.ascontiguousarray(b).view(np.int16).reshape(shape)
+
+
+class TraceArchive(object):
+    """Append-only trace archive in directory ``path``.
+
+    Args:
+        path (str): Directory to write to. Created if needed. If it already
+            holds an archive, the other arguments must match it.
+        samples (int): Samples per trace, e.g. ``scope.adc.samples``.
+        params (tuple): Glitch settings stored with each trace.
+        block_size (int): Traces compressed together.
+        scale (float): Traces are stored as ``round(trace * scale)``.
+        codec (str): One of :data:`CODECS`; the best installed by default.
+        keep_every (int): Store only every ``keep_every``-th ``"normal"``
+            trace. Other outcomes are always stored.
+    """
+    def __init__(self, path, samples, params=DEFAULT_PARAMS, block_size=256, scale=1024.0,
+                 codec=None, keep_every=1):
+        self.path = path
+        self.samples = samples
+        self.params = tuple(params)
+        self.block_size = block_size
+        self.scale = scale
+        self.keep_every = keep_every
+        meta_path = os.path.join(path, _META_FILE)
+        exists = os.path.exists(meta_path)
+        if exists:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            # An existing archive keeps its codec even if a better one is installed now.
+            codec = codec or meta["codec"]
+            self.codec = codec
+            self._check_meta(meta)
+        else:
+            self.codec = codec or available_codec()
+        self.attempts = 0
+        self.index_dtype = np.dtype([("attempt", "i8")] + [(p, "f8") for p in self.params] +
+                                    [("outcome", "i1"), ("block", "i4"), ("row", "i4")])
+        self._compress, self._decompress, self._codec_shuffles = _compressor(self.codec)
+        self._buf = np.zeros((block_size, samples), dtype=np.int16)
+        self._rows = np.zeros(block_size, dtype=self.index_dtype)
+        self._n = 0
+        self._cached = (None, None)
+        if not exists:
+            os.makedirs(path, exist_ok=True)
+            self._save_meta()
+        else:
+            self._recover()
+        self._data = open(os.path.join(path, _DATA_FILE), "ab")
+        self._blocks = open(os.path.join(path, _BLOCK_FILE), "ab")
+        self._index = open(os.path.join(path, _INDEX_FILE), "ab")
+        self._load()
+
+    def _save_meta(self):
+        meta = {"samples": self.samples, "params": list(self.params), "block_size": self.block_size,
+                "scale": self.scale, "codec": self.codec, "keep_every": self.keep_every,
+                "outcomes": list(OUTCOMES)}
+        tmp = os.path.join(self.path, _META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, _META_FILE))
+
+    def _check_meta(self, meta):
+        mine = {"samples": self.samples, "params": list(self.params), "block_size": self.block_size,
+                "scale": self.scale, "codec": self.codec, "keep_every": self.keep_every}
+        for key, value in mine.items():
+            if meta.get(key, 1 if key == "keep_every" else None) != value:
+                raise ValueError("Archive {} has {}={!r}, not {!r}; use TraceArchive.open() to append "
+                                 "to it".format(self.path, key, meta.get(key), value))
+
+    def _recover(self):
+        """Cut off what an interrupted :meth:`flush` left half written.
+
+        The block and index files are truncated to whole records, and the
+        index before its first record whose block is missing, so appends
+        line up with the records again.
+        """
+        fn = os.path.join(self.path, _DATA_FILE)
+        data_size = os.path.getsize(fn) if os.path.exists(fn) else 0
+        blocks = self._truncate(_BLOCK_FILE, _BLOCK_DTYPE)
+        missing = np.flatnonzero(blocks["offset"] + blocks["nbytes"] > data_size)
+        if len(missing):
+            blocks = self._truncate(_BLOCK_FILE, _BLOCK_DTYPE, int(missing[0]))
+        index = self._truncate(_INDEX_FILE, self.index_dtype)
+        missing = np.flatnonzero(index["block"] >= len(blocks))
+        if len(missing):
+            self._truncate(_INDEX_FILE, self.index_dtype, int(missing[0]))
+
+    def _truncate(self, name, dtype, n=None):
+        """Truncate file ``name`` to ``n`` records, by default all whole ones, and read them."""
+        fn = os.path.join(self.path, name)
+        if not os.path.exists(fn):
+            return np.zeros(0, dtype=dtype)
+        size = os.path.getsize(fn)
+        if n is None:
+            n = size // dtype.itemsize
+        if size != n * dtype.itemsize:
+            with open(fn, "r+b") as f:
+                f.truncate(n * dtype.itemsize)
+        return np.fromfile(fn, dtype=dtype)
+
+    def _load(self):
+        self.blocks = self._map(_BLOCK_FILE, _BLOCK_DTYPE)
+        self.index = self._map(_INDEX_FILE, self.index_dtype)
+        if len(self.index):
+            self.attempts = int(self.index["attempt"][-1]) + 1
+
+    def _map(self, name, dtype):
+        fn = os.path.join(self.path, name)
+        n = os.path.getsize(fn) // dtype.itemsize
+        if n == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(fn, dtype=dtype, mode="r", shape=(n,))
+
+    @classmethod
+    def open(cls, path):
+        """Reopen an archive. New traces are appended to it."""
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+        return cls(path, meta["samples"], meta["params"], meta["block_size"], meta["scale"],
+                   meta["codec"], meta.get("keep_every", 1))
+
+    def __len__(self):
+        return len(self.index) + self._n
+
+    def add(self, trace, outcome="normal", **params):
+        """Add the trace of the next attempt.
+
+        Returns:
+            True if the trace was stored, False if skipped by ``keep_every``.
+        """
+        attempt = self.attempts
+        self.attempts += 1
+        if outcome == "normal" and attempt % self.keep_every:
+            return False
+        i = self._n
+        np.rint(np.asarray(trace) * self.scale, out=self._buf[i], casting="unsafe")
+        row = self._rows[i]
+        row["attempt"] = attempt
+        for p in self.params:
+            row[p] = params.get(p, 0)
+        row["outcome"] = OUTCOMES.index(outcome)
+        row["block"] = len(self.blocks)
+        row["row"] = i
+        self._n = i + 1
+        if self._n == self.block_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Compress and write the buffered traces."""
+        n = self._n
+        if n == 0:
+            return
+        deltas = encode_block(self._buf[:n])
+        raw = deltas.tobytes() if self._codec_shuffles else _shuffle(deltas)
+        data = self._compress(raw)
+        offset = self._data.seek(0, os.SEEK_END)
+        self._data.write(data)
+        self._data.flush()
+        # Blocks, then index: an index record never points at a missing block.
+        block = np.array([(offset, len(data), n)], dtype=_BLOCK_DTYPE)
+        self._blocks.write(block.tobytes())
+        self._blocks.flush()
+        self._index.write(self._rows[:n].tobytes())
+        self._index.flush()
+        self._n = 0
+        self._load()
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        self._blocks.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _block(self, b):
+        if self._cached[0] == b:
+            return self._cached[1]
+        offset, nbytes, count = self.blocks[b].tolist()
+        with open(os.path.join(self.path, _DATA_FILE), "rb") as f:
+            f.seek(offset)
+            raw = self._decompress(f.read(nbytes))
+        shape = (count, self.samples)
+        if self._codec_shuffles:
+            deltas = np.frombuffer(raw, dtype=np.int16).reshape(shape)
+        else:
+            deltas = _unshuffle(raw, shape)
+        codes = decode_block(deltas)
+        self._cached = (b, codes)
+        return codes
+
+    def traces(self, idx):
+        """Traces at archive positions ``idx`` (e.g. from :meth:`query`) as floats.
+
+        Only the blocks holding them are decompressed, each once.
+        """
+        idx = np.atleast_1d(np.asarray(idx, dtype=np.int64))
+        out = np.zeros((len(idx), self.samples))
+        if len(idx) == 0:
+            return out
+        rec = self.index[idx]
+        for b in np.unique(rec["block"]):
+            sel = np.flatnonzero(rec["block"] == b)
+            out[sel] = self._block(int(b))[rec["row"][sel]]
+        return out / self.scale
+
+    def __getitem__(self, i):
+        return self.traces([i])[0]
+
+    def find(self, attempt):
+        """Archive position of campaign attempt number ``attempt``, or None if not kept."""
+        pos = int(np.searchsorted(self.index["attempt"], attempt))
+        if pos < len(self.index) and self.index["attempt"][pos] == attempt:
+            return pos
+        return None
+
+    def query(self, outcome=None, **conditions):
+        """Archive positions whose index records match.
+
+        Conditions are values or inclusive ``(lo, hi)`` tuples, as in
+        :meth:`glitch_helpers.results.ResultStore.select`. Call
+        :meth:`flush` first to include buffered traces.
+        """
+        index = self.index
+        m = np.ones(len(index), dtype=bool)
+        if outcome is not None:
+            m &= index["outcome"] == OUTCOMES.index(outcome)
+        for k, cond in conditions.items():
+            col = index[k]
+            if isinstance(cond, tuple):
+                lo, hi = cond
+                m &= (col >= lo) & (col <= hi)
+            else:
+                m &= col == cond
+        return np.flatnonzero(m)
+
+    def outcomes(self, idx=None):
+        """Outcome names of the traces at ``idx`` (all by default)."""
+        codes = self.index["outcome"] if idx is None else self.index["outcome"][idx]
+        return [OUTCOMES[c] for c in np.atleast_1d(codes).tolist()]
+
+    def nbytes(self):
+        """Compressed size on disk of the trace data."""
+        return os.path.getsize(os.path.join(self.path, _DATA_FILE))
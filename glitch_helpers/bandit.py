@@ -0,0 +1,139 @@
+"""Success-probability driven scheduling of glitch attempts.
+
+The labs spend ``sample_size`` attempts on every grid cell, and the
+tutorial suggests looping over ``ext_offset`` forever because even good
+settings only work some of the time. :class:`BetaScheduler` keeps a Beta
+posterior of the success rate of every cell and picks the next cell by
+Thompson sampling: cells that look good, or that have not been tried
+enough to tell, get the attempts. Cells that have only ever reset are
+retired.
+
+Example::
+
+    sched = BetaScheduler({"width": Range(-12, -10, 1),
+                           "offset": Range(-48, -40, 1),
+                           "ext_offset": Range(0, 100, 1)})
+
+    def attempt(params):
+        ...
+        return "success" if 'Welcome' in response else "normal"
+
+    sched.run(attempt, budget=5000)
+    print(sched.best(5))
+"""
+from collections import OrderedDict
+import itertools
+
+import numpy as np
+
+from glitch_helpers.search import axis_values
+
+
+class BetaScheduler(object):
+    """Thompson sampling over glitch parameter cells.
+
+    Args:
+        parameters (dict): Parameter name to :class:`Range` or values.
+        prior (tuple): Beta prior ``(alpha, beta)`` on each cell's success
+            rate. The default assumes successes are rare; with thousands of
+            cells a flatter prior spends most attempts on exploring.
+        retire_after (int): Attempts after which a cell with no successes
+            can be retired.
+        retire_reset_rate (float): A cell with no successes is retired once
+            this fraction of its attempts (or more) were resets.
+        retire_upper (float): A cell with no successes is also retired once
+            its chance of a success rate above this is negligible.
+        seed (int): Seed for the sampling.
+    """
+    def __init__(self, parameters, prior=(1.0, 40.0), retire_after=5, retire_reset_rate=0.9,
+                 retire_upper=0.02, seed=None):
+        self.names = list(parameters.keys())
+        axes = [axis_values(v) for v in parameters.values()]
+        self.cells = list(itertools.product(*axes))
+        n = len(self.cells)
+        self.prior = prior
+        self.retire_after = retire_after
+        self.retire_reset_rate = retire_reset_rate
+        self.retire_upper = retire_upper
+        self.rng = np.random.RandomState(seed)
+        self.trials = np.zeros(n, dtype=np.int64)
+        self.successes = np.zeros(n, dtype=np.int64)
+        self.resets = np.zeros(n, dtype=np.int64)
+        self.active = np.ones(n, dtype=bool)
+
+    def params(self, cell):
+        return OrderedDict(zip(self.names, self.cells[cell]))
+
+    def posterior(self):
+        """``(alpha, beta)`` arrays of every cell's success posterior."""
+        a, b = self.prior
+        return a + self.successes, b + self.trials - self.successes
+
+    def mean(self):
+        """Posterior mean success rate of every cell."""
+        a, b = self.posterior()
+        return a / (a + b)
+
+    def next(self, k=1):
+        """Pick the next ``k`` cells to try (indexes into :attr:`cells`).
+
+        Returns an empty array once every cell has been retired.
+        """
+        live = np.flatnonzero(self.active)
+        if len(live) == 0:
+            return live
+        a, b = self.posterior()
+        theta = self.rng.beta(a[live], b[live])
+        if k == 1:
+            return live[[int(np.argmax(theta))]]
+        k = min(k, len(live))
+        return live[np.argpartition(-theta, k - 1)[:k]]
+
+    def update(self, cell, outcome):
+        """Record one ``"success"``/``"reset"``/other outcome for ``cell``."""
+        self.trials[cell] += 1
+        if outcome == "success":
+            self.successes[cell] += 1
+        elif outcome == "reset":
+            self.resets[cell] += 1
+        self._maybe_retire(cell)
+
+    def _maybe_retire(self, cell):
+        n = self.trials[cell]
+        if self.successes[cell] or n < self.retire_after:
+            return
+        if self.resets[cell] >= self.retire_reset_rate * n:
+            self.active[cell] = False
+            return
+        # With no successes the posterior is Beta(a, b + n), and
+        # P(rate > u) is at most (1 - u) ** (b + n - 1) for a = 1.
+        a, b = self.prior
+        if a <= 1 and (1 - self.retire_upper) ** (b + n - 1) < 0.05:
+            self.active[cell] = False
+
+    def run(self, attempt, budget, progress=None):
+        """Spend ``budget`` attempts, calling ``attempt(params)`` for each.
+
+        Returns:
+            Number of attempts made (less than ``budget`` only if every cell
+            was retired).
+        """
+        steps = range(budget)
+        if progress is not None:
+            steps = progress(steps)
+        made = 0
+        for _ in steps:
+            cells = self.next()
+            if len(cells) == 0:
+                break
+            cell = int(cells[0])
+            self.update(cell, attempt(self.params(cell)))
+            made += 1
+        return made
+
+    def best(self, n=10):
+        """Top ``n`` cells by posterior mean as ``(params, mean, trials, successes)``."""
+        m = self.mean()
+        order = np.argsort(-m)[:n]
+        return [(self.params(i), float(m[i]), int(self.trials[i]), int(self.successes[i]))
+                for i in order]
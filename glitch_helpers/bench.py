@@ -0,0 +1,245 @@
+"""Throughput benchmarks for the glitch campaign loops.
+
+Each benchmark re-creates the hot loop of one of the labs against the
+simulated scope and target from :mod:`glitch_helpers.sim`:
+
+* ``attack1``: Fault_1 Attack 1, reset per attempt and look for ``"1234"``.
+* ``attack2``: Fault_1 Attack 2, password write, trace diff and live plot.
+* ``do_glitch``: Fault_2 ``do_glitch()`` polling counter lines.
+* ``bootloader``: Fault_3 bootloader glitch loop.
+
+Hardware latencies are modelled by sleeps taken from a latency profile, so
+the numbers show how each loop structure behaves on a given rig without
+needing one. Every run reports attempts per second, p50/p99 per-attempt
+latency and a per-stage breakdown, to compare against before and after
+changing a loop.
+
+From the command line::
+
+    python -m glitch_helpers.bench --profile cwlite --scale 0.1 -n 200
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from glitch_helpers import sim
+from glitch_helpers.campaign import StageTimer
+
+PROFILES = {
+    "zero": {"arm": 0.0, "capture": 0.0, "read": 0.0, "reset": 0.0, "plot": 0.0, "uart_poll": 0.0,
+             "settle": 0.0},
+    # Rough figures for a CW-Lite over USB, with Setup_Generic's reset_target
+    # and a notebook matplotlib redraw.
+    "cwlite": {"arm": 0.0005, "capture": 0.002, "read": 0.001, "reset": 0.1, "plot": 0.03,
+               "uart_poll": 0.1, "settle": 0.05},
+}
+"""Latency profiles in seconds: per call for arm/capture/read/reset/plot,
+the sleep between UART polls in the VCC lab and the sleep before reading
+the bootloader's response in Fault_3."""
+
+
+def _connect(firmware, latency, seed, fault_rate):
+    return sim.connect(fault_rate=fault_rate, firmware=firmware, seed=seed,
+                       arm_latency=latency["arm"], capture_latency=latency["capture"],
+                       read_latency=latency["read"], reset_latency=latency["reset"])
+
+
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def bench_attack1(n, latency, seed=0):
+    """Fault_1 Attack 1 loop body."""
+    scope, target = _connect("glitch1", latency, seed, lambda g: 0.05)
+    scope.io.hs2 = "glitch"
+    t = StageTimer()
+    for _ in range(n):
+        start = time.perf_counter()
+        with t.time("arm"):
+            scope.arm()
+        with t.time("reset"):
+            sim.reset_target(scope)
+        with t.time("capture"):
+            scope.capture()
+        with t.time("read"):
+            response = target.read(timeout=10)
+        with t.time("classify"):
+            if '1234' in repr(response):
+                pass
+            elif len(response.split("hello\nA")[1]) > 1:
+                pass
+        t.add("attempt", time.perf_counter() - start)
+    return t
+
+
+def bench_attack2(n, latency, seed=0):
+    """Fault_1 Attack 2 loop body."""
+    scope, target = _connect("glitch3", latency, seed, lambda g: 0.01)
+    scope.io.hs2 = "glitch"
+    scope.adc.timeout = 0.1
+    t = StageTimer()
+    ref_trace = scope._make_trace(False)
+    for i in range(n):
+        start = time.perf_counter()
+        scope.glitch.ext_offset = i % 100
+        with t.time("flush"):
+            target.flush()
+        with t.time("arm"):
+            scope.arm()
+        with t.time("write"):
+            target.write("x\n")
+        with t.time("capture"):
+            ret = scope.capture()
+        if ret:
+            with t.time("reset"):
+                sim.reset_target(scope)
+        with t.time("read"):
+            response = target.read(timeout=10)
+        with t.time("trace"):
+            trace = scope.get_last_trace()
+        with t.time("classify"):
+            np.sum(abs(ref_trace - trace))
+            'Welcome' in repr(response)
+        with t.time("plot"):
+            _sleep(latency["plot"])
+        t.add("attempt", time.perf_counter() - start)
+    return t
+
+
+def bench_do_glitch(n, latency, seed=0):
+    """Fault_2 ``do_glitch()`` as written in the VCC lab."""
+    scope, target = _connect("glitch_inf", latency, seed, lambda g: 0.02)
+    scope.glitch.trigger_src = "ext_continuous"
+    scope.io.glitch_lp = True
+    t = StageTimer()
+    for _ in range(n):
+        start = time.perf_counter()
+        with t.time("read"):
+            line = ""
+            while "\n" not in line:
+                _sleep(latency["uart_poll"])
+                if target.in_waiting() == 0:
+                    break
+                line += target.read()
+            lines = line.split("\n")
+            line = lines[-1] if len(lines) > 1 else ""
+            while "\n" not in line:
+                _sleep(latency["uart_poll"])
+                if target.in_waiting() == 0:
+                    break
+                line += target.read()
+        with t.time("classify"):
+            nums = line.split(" ")
+            "hello" in line
+            try:
+                int(nums[0]) != 40000
+            except ValueError:
+                pass
+        t.add("attempt", time.perf_counter() - start)
+    return t
+
+
+def bench_bootloader(n, latency, seed=0):
+    """Fault_3 bootloader glitch loop body."""
+    scope, target = _connect("bootloader", latency, seed, lambda g: 0.01)
+    scope.io.hs2 = "glitch"
+    t = StageTimer()
+    for i in range(n):
+        start = time.perf_counter()
+        if scope.adc.state:
+            with t.time("reset"):
+                sim.reset_target(scope)
+        scope.glitch.ext_offset = i % 3
+        with t.time("arm"):
+            scope.arm()
+        with t.time("write"):
+            target.write(sim.BOOTLOADER_COMMAND)
+        with t.time("capture"):
+            ret = scope.capture()
+        if ret:
+            with t.time("reset"):
+                sim.reset_target(scope)
+            t.add("attempt", time.perf_counter() - start)
+            continue
+        with t.time("read"):
+            _sleep(latency["settle"])
+            output = target.read(timeout=2)
+        with t.time("classify"):
+            parts = output.split("r0")
+            len(parts[1]) > 6 if len(parts) > 1 else False
+        t.add("attempt", time.perf_counter() - start)
+    return t
+
+
+BENCHMARKS = {
+    "attack1": bench_attack1,
+    "attack2": bench_attack2,
+    "do_glitch": bench_do_glitch,
+    "bootloader": bench_bootloader,
+}
+
+
+def summarize(timer):
+    """Attempts/s, p50/p99 attempt latency and per-stage means from a timer."""
+    report = timer.report()
+    attempt = report.pop("attempt")
+    return {
+        "attempts": attempt["count"],
+        "attempts_per_sec": attempt["count"] / attempt["total"] if attempt["total"] else float("inf"),
+        "p50_ms": attempt["p50"] * 1e3,
+        "p99_ms": attempt["p99"] * 1e3,
+        "stages_ms": dict((k, v["mean"] * 1e3) for k, v in report.items()),
+        "stage_share": dict((k, v["total"] / attempt["total"] if attempt["total"] else 0.0)
+                            for k, v in report.items()),
+    }
+
+
+def run(names=None, n=200, profile="zero", scale=1.0, seed=0):
+    """Run the named benchmarks and return ``{name: summary}``.
+
+    Args:
+        names (list): Benchmarks to run, all of :data:`BENCHMARKS` by default.
+        n (int): Attempts per benchmark.
+        profile (str or dict): Name in :data:`PROFILES` or a latency dict.
+        scale (float): Multiplier on every latency, to keep CI runs short.
+    """
+    latency = PROFILES[profile] if isinstance(profile, str) else dict(profile)
+    latency = dict((k, v * scale) for k, v in latency.items())
+    out = {}
+    for name in names or sorted(BENCHMARKS):
+        out[name] = summarize(BENCHMARKS[name](n, latency, seed=seed))
+    return out
+
+
+def format_results(results):
+    lines = []
+    for name, r in sorted(results.items()):
+        lines.append("{}: {:.1f} attempts/s, p50 {:.3f} ms, p99 {:.3f} ms".format(
+            name, r["attempts_per_sec"], r["p50_ms"], r["p99_ms"]))
+        for stage, ms in sorted(r["stages_ms"].items(), key=lambda kv: -r["stage_share"][kv[0]]):
+            lines.append("    {:<10} {:>9.3f} ms  {:>5.1f}%".format(stage, ms, 100 * r["stage_share"][stage]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("benchmarks", nargs="*",
+                        help="benchmarks to run: {} (default: all)".format(", ".join(sorted(BENCHMARKS))))
+    parser.add_argument("-n", "--attempts", type=int, default=200)
+    parser.add_argument("--profile", default="zero", choices=sorted(PROFILES))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply all latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmark(s): {}".format(", ".join(sorted(unknown))))
+    results = run(args.benchmarks, args.attempts, args.profile, args.scale, args.seed)
+    print(json.dumps(results, indent=2, sort_keys=True) if args.json else format_results(results))
+
+
+if __name__ == "__main__":
+    main()
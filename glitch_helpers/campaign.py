@@ -0,0 +1,256 @@
+"""Pipelined glitch campaign runner.
+
+The Attack 2 loop in the clock glitch lab flushes, arms, writes, captures,
+reads and then diffs and plots the trace, all on one thread. While the
+trace is being diffed and plotted the target sits idle.
+
+:class:`CampaignRunner` keeps only the hardware facing steps on the calling
+thread and hands each finished :class:`Attempt` to a worker thread, which
+runs the classification, plotting and storage handlers. Every step is
+timed so :meth:`StageTimer.report` shows where each attempt's time goes.
+
+Example::
+
+    runner = CampaignRunner(scope, target, command="x\\n", reset=reset_target)
+    runner.add_handler("classify", lambda a: a.meta.update(success='Welcome' in a.response))
+    runner.add_handler("plot", lambda a: plot.send(a.trace))
+    runner.run({"width": w, "offset": o, "ext_offset": e}
+               for w in range(-12, -10) for o in range(-48, -40) for e in range(100))
+    print(runner.timer.report())
+"""
+import queue
+import threading
+import time
+
+import numpy as np
+
+from glitch_helpers.regcache import GlitchCache
+
+
+class StageTimer(object):
+    """Collects per-stage latencies.
+
+    Safe to use from several threads at once.
+    """
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def time(self, stage):
+        """Context manager that records the time spent in its body."""
+        return _Timed(self, stage)
+
+    def report(self):
+        """Return ``{stage: {"count", "total", "mean", "p50", "p99"}}`` in seconds."""
+        out = {}
+        with self._lock:
+            items = [(k, np.asarray(v)) for k, v in self.samples.items()]
+        for stage, s in items:
+            out[stage] = {
+                "count": len(s),
+                "total": float(s.sum()),
+                "mean": float(s.mean()),
+                "p50": float(np.percentile(s, 50)),
+                "p99": float(np.percentile(s, 99)),
+            }
+        return out
+
+    def format_report(self):
+        """Report as a printable table, slowest stage first."""
+        rows = sorted(self.report().items(), key=lambda kv: kv[1]["total"], reverse=True)
+        lines = ["{:<12} {:>8} {:>10} {:>10} {:>10}".format("stage", "count", "mean ms", "p50 ms", "p99 ms")]
+        for stage, r in rows:
+            lines.append("{:<12} {:>8} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+                stage, r["count"], r["mean"] * 1e3, r["p50"] * 1e3, r["p99"] * 1e3))
+        return "\n".join(lines)
+
+
+class _Timed(object):
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Attempt(object):
+    """Everything collected for one glitch attempt.
+
+    Handlers can stash their results (``success``, ``diff``...) in ``meta``.
+    """
+    __slots__ = ("index", "params", "response", "trace", "timed_out", "meta")
+
+    def __init__(self, index, params, response, trace, timed_out):
+        self.index = index
+        self.params = params
+        self.response = response
+        self.trace = trace
+        self.timed_out = timed_out
+        self.meta = {}
+
+    def __repr__(self):
+        return "Attempt({}, {}, {!r}, timed_out={})".format(
+            self.index, dict(self.params), self.response, self.timed_out)
+
+
+class CampaignRunner(object):
+    """Runs glitch attempts with post-processing moved off the hardware thread.
+
+    Args:
+        scope: ChipWhisperer scope (or :class:`glitch_helpers.sim.SimScope`).
+        target: ChipWhisperer target.
+        command (str): Written to the target after arming. ``None`` to
+            skip, e.g. when the target is reset instead.
+        reset (callable): ``reset(scope)``, called after a capture timeout.
+            Pass ``reset_target`` from ``Setup_Generic.ipynb``.
+        reset_each (bool): Reset before each attempt instead of writing
+            ``command`` (the Attack 1 style).
+        read_timeout (int): Timeout passed to ``target.read``.
+        capture_trace (bool): Fetch ``scope.get_last_trace()`` each attempt.
+        queue_size (int): Attempts buffered for the worker before the
+            hardware thread blocks.
+    """
+    def __init__(self, scope, target, command="x\n", reset=None, reset_each=False,
+                 read_timeout=10, capture_trace=True, queue_size=256):
+        if reset_each and reset is None:
+            raise ValueError("reset_each=True needs a reset function")
+        self.scope = scope
+        self.target = target
+        self.command = command
+        self.reset = reset
+        self.reset_each = reset_each
+        self.read_timeout = read_timeout
+        self.capture_trace = capture_trace
+        self.queue_size = queue_size
+        self.glitch = GlitchCache(scope.glitch)
+        self.handlers = []
+        self.timer = StageTimer()
+        self.attempts = 0
+        self.timeouts = 0
+        self.elapsed = 0.0
+        self.last_run = 0
+        self._error = None
+
+    def add_handler(self, name, fn):
+        """Run ``fn(attempt)`` on the worker thread for every attempt.
+
+        Handlers run in the order they were added and are timed under
+        ``name``.
+        """
+        self.handlers.append((name, fn))
+
+    def apply(self, params):
+        """Write glitch settings to ``scope.glitch``, skipping unchanged ones.
+
+        Goes through :attr:`glitch`, a :class:`GlitchCache`, so checking for
+        a change doesn't read the setting back from the scope. The cache is
+        cleared at the start of every :meth:`run`, so settings changed on
+        ``scope.glitch`` in between are always rewritten.
+        """
+        self.glitch.update(params)
+
+    def attempt(self, index, params):
+        """Run one attempt on the hardware thread and return an :class:`Attempt`."""
+        t = self.timer
+        with t.time("setup"):
+            self.apply(params)
+        with t.time("flush"):
+            self.target.flush()
+        with t.time("arm"):
+            self.scope.arm()
+        if self.reset_each:
+            with t.time("reset"):
+                self.reset(self.scope)
+        elif self.command is not None:
+            with t.time("write"):
+                self.target.write(self.command)
+        with t.time("capture"):
+            timed_out = bool(self.scope.capture())
+        if timed_out:
+            self.timeouts += 1
+            if self.reset is not None and not self.reset_each:
+                with t.time("reset"):
+                    self.reset(self.scope)
+        with t.time("read"):
+            response = self.target.read(timeout=self.read_timeout)
+        trace = None
+        if self.capture_trace:
+            with t.time("trace"):
+                # copy, the real scope may reuse its buffer on the next capture
+                trace = np.array(self.scope.get_last_trace(), copy=True)
+        return Attempt(index, dict(params), response, trace, timed_out)
+
+    def _worker(self, q):
+        while True:
+            attempt = q.get()
+            if attempt is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                for name, fn in self.handlers:
+                    with self.timer.time(name):
+                        fn(attempt)
+            except Exception as e:
+                self._error = e
+
+    def run(self, points, progress=None):
+        """Run one attempt for each dict of glitch settings in ``points``.
+
+        Args:
+            points: Iterable of dicts mapping ``scope.glitch`` attribute
+                names to values.
+            progress (callable): Optional wrapper for ``points``, e.g.
+                ``tqdm``.
+
+        Returns:
+            The number of attempts made.
+
+        Raises:
+            Re-raises the first exception from a handler, after stopping the
+            campaign.
+        """
+        self._error = None
+        # scope.glitch may have been changed directly since the last run.
+        self.glitch.invalidate()
+        q = queue.Queue(maxsize=self.queue_size)
+        worker = threading.Thread(target=self._worker, args=(q,), name="glitch-worker")
+        worker.daemon = True
+        worker.start()
+        start = time.perf_counter()
+        n = 0
+        try:
+            if progress is not None:
+                points = progress(points)
+            for params in points:
+                if self._error is not None:
+                    break
+                with self.timer.time("attempt"):
+                    a = self.attempt(self.attempts, params)
+                self.attempts += 1
+                n += 1
+                with self.timer.time("enqueue"):
+                    q.put(a)
+        finally:
+            q.put(None)
+            worker.join()
+            self.elapsed = time.perf_counter() - start
+            self.last_run = n
+        if self._error is not None:
+            raise self._error
+        return n
+
+    @property
+    def rate(self):
+        """Attempts per second over the last :meth:`run`."""
+        return self.last_run / self.elapsed if self.elapsed else 0.0
@@ -0,0 +1,119 @@
+"""Batched trace capture for the glitch labs.
+
+Every attempt in the Fault_1 loops does its own arm/capture/readout and
+builds a fresh trace array. :class:`BatchCapture` runs ``K`` attempts from
+a list of ``(width, offset, ext_offset)`` settings and writes the traces
+straight into one preallocated ``(K, samples)`` array, with the per
+attempt details in a matching numpy record array. The buffers are reused
+between batches, and settings go through a
+:class:`~glitch_helpers.regcache.GlitchCache`, so they are only written to
+``scope.glitch`` when they change.
+
+The CW-Lite has no segmented capture mode, so each attempt still needs its
+own arm/capture pair. What is saved is the per-attempt allocation and
+Python bookkeeping around them.
+
+Example::
+
+    batch = BatchCapture(scope, target, reset=reset_target)
+    settings = [(w, o, e) for w in range(-12, -10) for o in range(-48, -40) for e in range(100)]
+    traces, meta, responses = batch.run(settings)
+    hits = meta["ext_offset"][np.char.find(responses, "Welcome") >= 0]
+"""
+import numpy as np
+
+from glitch_helpers.regcache import GlitchCache
+
+META_DTYPE = np.dtype([
+    ("width", "f8"),
+    ("offset", "f8"),
+    ("ext_offset", "i4"),
+    ("timed_out", "?"),
+    ("trig_count", "i8"),
+])
+"""Per-attempt record. ``trig_count`` is -1 unless it was asked for."""
+
+
+class BatchCapture(object):
+    """Runs batches of glitch attempts into preallocated arrays.
+
+    Args:
+        scope: ChipWhisperer scope.
+        target: ChipWhisperer target.
+        command (str): Written to the target after arming. ``None`` resets
+            the target instead, as in Attack 1.
+        reset (callable): ``reset_target(scope)`` from Setup_Generic.
+        read_timeout (int): Timeout passed to ``target.read``.
+        samples (int): Samples per trace. Defaults to ``scope.adc.samples``.
+        trig_count (bool): Read ``scope.adc.trig_count`` after every
+            attempt. Off by default, as it costs a USB read per attempt.
+        glitch (GlitchCache): Cache in front of ``scope.glitch`` to write
+            the settings through. A new one is made if not given; call its
+            ``invalidate()`` if ``scope.glitch`` is changed behind its back.
+    """
+    def __init__(self, scope, target, command="x\n", reset=None, read_timeout=10, samples=None,
+                 trig_count=False, glitch=None):
+        if command is None and reset is None:
+            raise ValueError("command=None resets the target each attempt and needs a reset function")
+        self.scope = scope
+        self.target = target
+        self.command = command
+        self.reset = reset
+        self.read_timeout = read_timeout
+        self.samples = samples or int(scope.adc.samples)
+        self.trig_count = trig_count
+        self.glitch = glitch if glitch is not None else GlitchCache(scope.glitch)
+        self._traces = np.zeros((0, self.samples))
+        self._meta = np.zeros(0, dtype=META_DTYPE)
+
+    def _reserve(self, k):
+        if len(self._traces) < k:
+            self._traces = np.zeros((k, self.samples))
+            self._meta = np.zeros(k, dtype=META_DTYPE)
+
+    def run(self, settings):
+        """Run one attempt per ``(width, offset, ext_offset)`` in ``settings``.
+
+        Returns:
+            ``(traces, meta, responses)`` where ``traces`` is a ``(K,
+            samples)`` array, ``meta`` a :data:`META_DTYPE` record array and
+            ``responses`` a list of ``K`` strings. ``traces`` and ``meta``
+            are views on buffers that the next call overwrites; copy them to
+            keep them.
+        """
+        settings = list(settings)
+        k = len(settings)
+        self._reserve(k)
+        traces = self._traces[:k]
+        meta = self._meta[:k]
+        responses = [None] * k
+
+        scope, target, glitch = self.scope, self.target, self.glitch
+        for i, (width, offset, ext_offset) in enumerate(settings):
+            glitch.width = width
+            glitch.offset = offset
+            glitch.ext_offset = ext_offset
+
+            target.flush()
+            scope.arm()
+            if self.command is None:
+                self.reset(scope)
+            else:
+                target.write(self.command)
+            timed_out = scope.capture()
+            if timed_out and self.command is not None and self.reset is not None:
+                self.reset(scope)
+            responses[i] = target.read(timeout=self.read_timeout)
+            if timed_out:
+                traces[i] = 0
+            else:
+                traces[i] = scope.get_last_trace()
+            meta[i] = (width, offset, ext_offset, bool(timed_out),
+                       scope.adc.trig_count if self.trig_count else -1)
+        return traces, meta, responses
+
+
+def capture_batch(scope, target, settings, **kwargs):
+    """One-off :meth:`BatchCapture.run` that returns arrays the caller owns."""
+    traces, meta, responses = BatchCapture(scope, target, **kwargs).run(settings)
+    return traces, meta, responses
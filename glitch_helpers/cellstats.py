@@ -0,0 +1,210 @@
+"""Per-cell success statistics with early stopping.
+
+Attack 1 spends exactly ``sample_size`` attempts on every (width, offset)
+cell and forgets its ``successes`` count at the end of the cell.
+:class:`CellStats` keeps running success/reset/normal counts for every
+cell with a Wilson score interval on the success rate. :meth:`CellStats.run`
+stops sampling a cell once it looks dead or clearly working, and spends
+the attempts saved on the cells that are still uncertain.
+
+A cell without successes is dropped once the upper end of its interval is
+below ``zero_upper``. With the defaults (``z=1.64``, ``zero_upper=0.4``)
+that takes 5 failures, which bound the success rate below 0.35 with 95%
+confidence, so dead cells cost as much as in Attack 1 and a weak cell is
+no more likely to be missed. The attempts saved come from cells that are
+clearly working, and go to cells that have shown a success but not yet
+enough to settle them.
+
+A larger ``zero_upper`` drops dead cells sooner, e.g. 0.6 after 2
+failures, but then only rules out rates above about 60% and misses over
+half of the isolated cells with a 20-30% rate. Working settings usually
+come in clusters, so a dropped cell next to a success is reopened and
+sampled up to ``sample_size`` after all; that recovers clustered cells,
+not isolated ones.
+
+Example::
+
+    stats = CellStats({"width": Range(-20, 0, 1), "offset": Range(-49, -35, 1)})
+
+    def attempt(params):
+        scope.glitch.width = params["width"]
+        scope.glitch.offset = params["offset"]
+        ...
+        return group                  # "success", "reset" or "normal"
+
+    stats.run(attempt)
+    attack1_data = stats.table()
+"""
+from collections import OrderedDict
+import itertools
+
+import numpy as np
+
+from glitch_helpers.search import GROUPS, axis_values
+
+OPEN, ZERO, HIGH, DONE = 0, 1, 2, 3
+"""Cell states: still sampling, clearly dead, clearly working, out of samples."""
+
+
+def wilson(successes, n, z=1.96):
+    """Wilson score interval ``(lo, hi)`` for ``successes`` out of ``n``.
+
+    Works elementwise on arrays; cells with ``n == 0`` get ``(0, 1)``.
+    """
+    successes = np.asarray(successes, dtype=float)
+    n = np.asarray(n, dtype=float)
+    safe = np.maximum(n, 1)
+    p = successes / safe
+    z2 = z * z
+    denom = 1 + z2 / safe
+    centre = (p + z2 / (2 * safe)) / denom
+    half = z * np.sqrt(p * (1 - p) / safe + z2 / (4 * safe * safe)) / denom
+    lo = np.where(n > 0, np.clip(centre - half, 0, 1), 0.0)
+    hi = np.where(n > 0, np.clip(centre + half, 0, 1), 1.0)
+    return lo, hi
+
+
+class CellStats(object):
+    """Incremental outcome counts and stopping decisions per parameter cell.
+
+    Args:
+        parameters (dict): Parameter name to :class:`Range` or values.
+        sample_size (int): Attempts Attack 1 would spend per cell. Sets the
+            default budget of :meth:`run`, and how far a reopened cell is
+            sampled.
+        groups (tuple): Outcome names; the first is success.
+        z (float): Width of the Wilson interval in standard deviations.
+        min_samples (int): Attempts before a cell can be stopped.
+        zero_upper (float): A cell without successes is dropped once the
+            upper end of its interval is below this. The default needs 5
+            failures; see the module notes.
+        high_lower (float): A cell is working once the lower end of its
+            interval is above this.
+        max_samples (int): Most attempts any one cell gets, including
+            attempts reassigned from settled cells. Defaults to twice
+            ``sample_size``.
+    """
+    def __init__(self, parameters, sample_size=5, groups=GROUPS, z=1.64, min_samples=2,
+                 zero_upper=0.4, high_lower=0.5, max_samples=None):
+        self.names = list(parameters.keys())
+        self.values = [axis_values(v) for v in parameters.values()]
+        self.shape = tuple(len(v) for v in self.values)
+        self.cells = list(itertools.product(*self.values))
+        self.sample_size = sample_size
+        self.groups = tuple(groups)
+        self.z = z
+        self.min_samples = min_samples
+        self.zero_upper = zero_upper
+        self.high_lower = high_lower
+        self.max_samples = max_samples or 2 * sample_size
+        n = len(self.cells)
+        self.counts = np.zeros((n, len(self.groups)), dtype=np.int64)
+        self.state = np.zeros(n, dtype=np.int8)
+        self.need = np.full(n, min_samples, dtype=np.int64)
+        self.attempts = 0
+
+    def params(self, cell):
+        return OrderedDict(zip(self.names, self.cells[cell]))
+
+    @property
+    def trials(self):
+        return self.counts.sum(axis=1)
+
+    @property
+    def successes(self):
+        return self.counts[:, 0]
+
+    def interval(self):
+        """Wilson ``(lo, hi)`` arrays of every cell's success rate."""
+        return wilson(self.successes, self.trials, self.z)
+
+    def rate(self, group=None):
+        """Observed rate of ``group`` (success by default) per cell, NaN if untried."""
+        g = 0 if group is None else self.groups.index(group)
+        n = self.trials
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, self.counts[:, g] / np.maximum(n, 1), np.nan)
+
+    def add(self, cell, group):
+        """Record one outcome for ``cell`` and update its state."""
+        self.counts[cell, self.groups.index(group)] += 1
+        self.attempts += 1
+        if group == self.groups[0]:
+            self._reopen_neighbours(cell)
+        self._update(cell)
+
+    def _update(self, cell):
+        n = int(self.counts[cell].sum())
+        s = int(self.counts[cell, 0])
+        lo, hi = wilson(s, n, self.z)
+        if n >= self.need[cell] and s == 0 and hi < self.zero_upper:
+            self.state[cell] = ZERO
+        elif n >= self.min_samples and lo > self.high_lower:
+            self.state[cell] = HIGH
+        elif n >= self.max_samples:
+            self.state[cell] = DONE
+        else:
+            self.state[cell] = OPEN
+
+    def neighbours(self, cell):
+        """Cells next to ``cell`` on the grid, diagonals included."""
+        point = np.unravel_index(cell, self.shape)
+        axes = [range(max(i - 1, 0), min(i + 2, n)) for i, n in zip(point, self.shape)]
+        for p in itertools.product(*axes):
+            c = int(np.ravel_multi_index(p, self.shape))
+            if c != cell:
+                yield c
+
+    def _reopen_neighbours(self, cell):
+        for c in self.neighbours(cell):
+            if self.state[c] == ZERO and self.need[c] < self.sample_size:
+                self.need[c] = self.sample_size
+                self.state[c] = OPEN
+
+    def run(self, attempt, budget=None, progress=None):
+        """Sample the grid in passes until every cell is settled.
+
+        Each pass gives one attempt to every open cell. Cells leave once
+        :meth:`add` settles them or they reach ``max_samples``.
+
+        Args:
+            attempt (callable): Called with a params dict, returns a group.
+            budget (int): Most attempts to make. Defaults to what Attack 1
+                would spend, ``sample_size`` times the number of cells.
+            progress (callable): Optional wrapper for the pass iterator,
+                e.g. ``tqdm``.
+
+        Returns:
+            Number of attempts made.
+        """
+        if budget is None:
+            budget = self.sample_size * len(self.cells)
+        start = self.attempts
+        passes = itertools.count()
+        if progress is not None:
+            passes = progress(passes)
+        for _ in passes:
+            live = np.flatnonzero(self.state == OPEN)
+            if len(live) == 0:
+                break
+            for cell in live.tolist():
+                if self.attempts - start >= budget:
+                    return self.attempts - start
+                if self.state[cell] != OPEN:
+                    continue
+                self.add(cell, attempt(self.params(cell)))
+        return self.attempts - start
+
+    def table(self):
+        """Attack 1 style rows: ``[*params, trials, successes, lo, hi]`` per tried cell."""
+        lo, hi = self.interval()
+        n = self.trials
+        return [list(self.cells[i]) + [int(n[i]), int(self.successes[i]), float(lo[i]), float(hi[i])]
+                for i in np.flatnonzero(n)]
+
+    def best(self, n=10):
+        """Top ``n`` cells by the lower end of their interval."""
+        lo, hi = self.interval()
+        order = np.argsort(-lo, kind="stable")[:n]
+        return [(self.params(i), float(lo[i]), float(hi[i]), int(self.trials[i]))
+                for i in order]
@@ -0,0 +1,210 @@
+"""Checkpoint and resume for long glitch sweeps.
+
+The attack loops step ``scope.glitch.offset += offset_range.step`` from
+inside nested loops, so once the kernel restarts (or ``broken = True``
+stops the loop) there is no way to pick up from the middle. Here a sweep
+is declared up front as a :class:`Sweep`, every point has a fixed index,
+and each finished point is appended to a journal file on disk. Running
+the same sweep against the same journal again skips everything already
+done.
+
+Example::
+
+    sweep = Sweep([("width", Range(-12, -1, 1)),
+                   ("offset", Range(-48, -36, 1)),
+                   ("ext_offset", ext_range)])
+
+    def attempt(params):
+        for k, v in params.items():
+            setattr(scope.glitch, k, v)
+        ...
+        return {"success": success, "response": output}
+
+    run = CheckpointedSweep(sweep, "bootloader_sweep.jsonl")
+    run.run(attempt)          # rerun this cell after a crash to resume
+    hits = [p for p, r in run.results() if r["success"]]
+"""
+import json
+import os
+
+from glitch_helpers.search import axis_values
+
+
+class StopSweep(Exception):
+    """Raise from an attempt function to stop the sweep early.
+
+    The attempt is still recorded if ``result`` is given. Replaces the
+    ``broken = True`` flags in the notebooks.
+    """
+    def __init__(self, result=None):
+        Exception.__init__(self)
+        self.result = result
+
+
+class Sweep(object):
+    """A fixed, ordered grid of glitch settings.
+
+    Args:
+        axes (list): ``(name, values)`` pairs, outermost first. ``values``
+            is a :class:`Range` or any sequence.
+        repeat (int): Attempts at each grid point. The repeat number is
+            passed as ``params["attempt"]``.
+    """
+    def __init__(self, axes, repeat=1):
+        self.names = [name for name, _ in axes]
+        self.axes = [axis_values(v) for _, v in axes]
+        self.repeat = repeat
+
+    def __len__(self):
+        n = self.repeat
+        for a in self.axes:
+            n *= len(a)
+        return n
+
+    def spec(self):
+        """JSON description, stored in the journal to catch mismatched resumes."""
+        return {"names": self.names, "axes": self.axes, "repeat": self.repeat}
+
+    def point(self, index):
+        """Return the settings for flat ``index`` without walking the sweep."""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        index, attempt = divmod(index, self.repeat)
+        params = []
+        for name, axis in zip(reversed(self.names), reversed(self.axes)):
+            index, i = divmod(index, len(axis))
+            params.append((name, axis[i]))
+        params.reverse()
+        params = dict(params)
+        if self.repeat > 1:
+            params["attempt"] = attempt
+        return params
+
+
+class CheckpointedSweep(object):
+    """Runs a :class:`Sweep` with a persistent journal.
+
+    The journal is a JSON lines file: a header with the sweep spec, then
+    one ``{"i": index, "r": result}`` line per finished attempt. A half
+    written last line (from a crash mid-write) is cut off. A corrupt line
+    further up is skipped and counted in :attr:`corrupt`; its attempt is
+    run again, and the records after it are kept.
+
+    Args:
+        sweep (Sweep): What to run.
+        path (str): Journal file. Created if it does not exist.
+        sync_every (int): ``fsync`` the journal every this many attempts.
+    """
+    def __init__(self, sweep, path, sync_every=50):
+        self.sweep = sweep
+        self.path = path
+        self.sync_every = sync_every
+        self.done = {}
+        self.stopped = False
+        self.corrupt = 0
+        self._load()
+
+    def _load(self):
+        data = b""
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+        header_end = data.find(b"\n")
+        if not data.strip() or header_end < 0:
+            # New journal, or one whose header never got its newline.
+            if data.strip():
+                self._check_header(data)
+            with open(self.path, "w") as f:
+                f.write(json.dumps({"sweep": self.sweep.spec()}) + "\n")
+            return
+        self._check_header(data[:header_end])
+        good = pos = header_end + 1
+        while True:
+            end = data.find(b"\n", pos)
+            if end < 0:
+                break  # No newline: the last record was torn mid-write.
+            line = data[pos:end]
+            pos = end + 1
+            if line.strip():
+                try:
+                    entry = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    if not data[pos:].strip():
+                        break  # Garbage at the very end: torn like a missing newline.
+                    # Valid records follow, so keep them and just redo this one.
+                    self.corrupt += 1
+                    good = pos
+                    continue
+                self.done[entry["i"]] = entry.get("r")
+            good = pos
+        # Cut off a torn last line so new entries start on a clean line.
+        if good < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+
+    def _check_header(self, line):
+        header = json.loads(line.decode("utf-8"))
+        if header.get("sweep") != json.loads(json.dumps(self.sweep.spec())):
+            raise ValueError("Journal {} was written for a different sweep".format(self.path))
+
+    @property
+    def cursor(self):
+        """Index of the first attempt that has not been done yet."""
+        i = 0
+        while i in self.done:
+            i += 1
+        return i
+
+    @property
+    def remaining(self):
+        return len(self.sweep) - len(self.done)
+
+    def pending(self):
+        """Indexes still to do, in sweep order."""
+        return [i for i in range(len(self.sweep)) if i not in self.done]
+
+    def run(self, attempt, progress=None):
+        """Call ``attempt(params)`` for every point not yet in the journal.
+
+        ``attempt`` must return something JSON serialisable. It can raise
+        :class:`StopSweep` to end the sweep early; progress so far is kept.
+
+        Args:
+            progress (callable): Optional wrapper for the pending indexes,
+                e.g. ``tqdm``.
+
+        Returns:
+            True if the sweep is complete.
+        """
+        self.stopped = False
+        todo = self.pending()
+        if progress is not None:
+            todo = progress(todo)
+        with open(self.path, "a") as f:
+            n = 0
+            for i in todo:
+                params = self.sweep.point(i)
+                try:
+                    result = attempt(params)
+                except StopSweep as e:
+                    if e.result is not None:
+                        self._record(f, i, e.result)
+                    self.stopped = True
+                    break
+                self._record(f, i, result)
+                n += 1
+                if n % self.sync_every == 0:
+                    f.flush()
+                    os.fsync(f.fileno())
+            f.flush()
+            os.fsync(f.fileno())
+        return self.remaining == 0
+
+    def _record(self, f, i, result):
+        f.write(json.dumps({"i": i, "r": result}) + "\n")
+        self.done[i] = result
+
+    def results(self):
+        """``(params, result)`` for every finished attempt, in sweep order."""
+        for i in sorted(self.done):
+            yield self.sweep.point(i), self.done[i]
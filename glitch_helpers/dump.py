@@ -0,0 +1,146 @@
+"""Streaming extraction of bootloader memory dumps.
+
+A successful Fault_3 glitch makes the bootloader send far more than the
+``r0`` response: it leaks memory until it runs off the end of the buffer.
+The lab polls ``target.in_waiting()`` 500 times and passes every
+character to ``my_print``, which does an ``ord()`` check and a
+``print(..., end='')`` call per byte. Large dumps take minutes that way
+and flood the notebook.
+
+:func:`read_dump` instead drains the serial port in bulk reads into a
+bytearray until it goes idle. :func:`save_dump` writes the binary image,
+and :func:`hexdump` renders a hex/ASCII view a chunk of rows at a time
+with numpy lookups::
+
+    if len(output.split("r0")[1]) > 6:
+        data = extract_dump(target, output, "dump_{}_{}_{}.bin".format(width, offset, ext_offset))
+        print_dump(data)
+"""
+import sys
+import time
+
+import numpy as np
+
+_HEX = np.frombuffer(b"".join(b"%02X " % i for i in range(256)), dtype=np.uint8).reshape(256, 3)
+_PRINTABLE = np.array([32 <= i < 127 for i in range(256)])
+_ASCII = np.where(_PRINTABLE, np.arange(256), ord(".")).astype(np.uint8)
+_ESCAPE = dict((i, "0x{:02X}".format(i)) for i in range(256) if not (32 <= i < 127 or i == 10))
+
+
+def escape(text):
+    """``my_print``'s rendering as one string: non-printables become ``0xNN``."""
+    return text.translate(_ESCAPE)
+
+
+def to_bytes(text):
+    """Bytes of a ``target.read()`` string (one character per byte)."""
+    if isinstance(text, (bytes, bytearray)):
+        return bytes(text)
+    return text.encode("latin-1")
+
+
+def read_dump(target, initial=b"", idle=0.1, timeout=30.0, max_bytes=1 << 20, poll=0.001):
+    """Read everything the target sends until it stops.
+
+    Args:
+        target: ChipWhisperer target.
+        initial: Bytes (or string) already read, e.g. the glitched response.
+        idle (float): Stop after this many seconds without new bytes.
+        timeout (float): Stop after this many seconds in total.
+        max_bytes (int): Stop once this much has been read.
+        poll (float): Sleep between polls of ``in_waiting()``.
+
+    Returns:
+        A ``bytearray`` of ``initial`` followed by everything read.
+    """
+    data = bytearray(to_bytes(initial))
+    start = last = time.perf_counter()
+    while len(data) < max_bytes:
+        n = target.in_waiting()
+        now = time.perf_counter()
+        if n:
+            data += to_bytes(target.read(n, timeout=0))
+            last = now
+            continue
+        if now - last > idle or now - start > timeout:
+            break
+        time.sleep(poll)
+    return data
+
+
+def strip_response(data, prefix=b"r0"):
+    """The leaked bytes: everything after the first ``prefix`` in ``data``."""
+    data = to_bytes(data)
+    i = data.find(prefix)
+    return data if i < 0 else data[i + len(prefix):]
+
+
+def save_dump(data, path):
+    """Write ``data`` to ``path`` as a binary image."""
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def hexdump(data, width=16, start=0, chunk_rows=4096):
+    """Yield the hex/ASCII view of ``data`` as text, ``chunk_rows`` lines at a time.
+
+    Lines look like ``00000010  48 65 6C 6C 6F ...  |Hello...|``.
+
+    Args:
+        start (int): Address of the first byte.
+    """
+    buf = np.frombuffer(bytes(data), dtype=np.uint8)
+    step = width * chunk_rows
+    for pos in range(0, len(buf), step):
+        block = buf[pos:pos + step]
+        rows = -(-len(block) // width)
+        padded = np.zeros(rows * width, dtype=np.uint8)
+        padded[:len(block)] = block
+        valid = np.arange(rows * width) < len(block)
+        hexes = _HEX[padded]
+        hexes[~valid] = ord(" ")
+        ascii_ = _ASCII[padded]
+        ascii_[~valid] = ord(" ")
+        addr = np.frombuffer("".join("{:08X}".format(a) for a in range(
+            start + pos, start + pos + rows * width, width)).encode(), dtype=np.uint8)
+        line = np.concatenate([
+            addr.reshape(rows, 8),
+            np.full((rows, 2), ord(" "), dtype=np.uint8),
+            hexes.reshape(rows, width * 3),
+            np.full((rows, 2), [ord(" "), ord("|")], dtype=np.uint8),
+            ascii_.reshape(rows, width),
+            np.full((rows, 2), [ord("|"), ord("\n")], dtype=np.uint8),
+        ], axis=1)
+        yield line.tobytes().decode("ascii")
+
+
+def print_dump(data, max_lines=32, width=16, start=0, out=None):
+    """Print a hex/ASCII view of ``data``, eliding the middle of long dumps."""
+    out = out or sys.stdout
+    rows = -(-len(data) // width)
+    if rows <= max_lines:
+        for text in hexdump(data, width, start):
+            out.write(text)
+        return
+    head = max_lines // 2
+    tail = max_lines - head
+    out.write(next(hexdump(data[:head * width], width, start)))
+    out.write("... {} lines ({} bytes) not shown ...\n".format(rows - max_lines,
+                                                             (rows - max_lines) * width))
+    skip = (rows - tail) * width
+    out.write(next(hexdump(data[skip:], width, start + skip)))
+
+
+def extract_dump(target, output, path=None, prefix=b"r0", **kwargs):
+    """Drain a leaking bootloader and return the leaked bytes.
+
+    Args:
+        output (str): The response that showed the leak, e.g. from
+            ``target.read(timeout=2)``.
+        path (str): Write the leaked bytes here if given.
+        **kwargs: Passed to :func:`read_dump`.
+    """
+    data = strip_response(read_dump(target, output, **kwargs), prefix)
+    if path is not None:
+        save_dump(data, path)
+    return data
@@ -0,0 +1,156 @@
+"""Fast crash detection and reset policy.
+
+The glitch loops detect crashes by waiting out ``target.read(timeout=10)``
+or an ADC timeout, and then reset unconditionally. :class:`HealthMonitor`
+polls the UART instead and stops reading as soon as the outcome is known:
+a terminator such as ``"Denied\\n"`` has arrived, the expected number of
+characters is in, or the line has gone idle. It combines that with the
+trigger state (``scope.adc.state`` stays high when the target hangs
+mid-trigger) and a reset banner such as ``"hello\\n"`` to decide whether
+the target is actually hung, and only resets it then.
+
+Example (Attack 2)::
+
+    health = HealthMonitor(scope, target, reset_target,
+                           terminators=("Denied\\n", "Welcome\\n"))
+    scope.adc.timeout = 0.1
+    for ...:
+        target.flush()
+        scope.arm()
+        target.write("x\\n")
+        timed_out = scope.capture()
+        response, status = health.read_response(timed_out)
+        health.recover(status)
+"""
+import time
+
+NORMAL = "normal"
+"""Full response arrived."""
+PARTIAL = "partial"
+"""Some output arrived but the line went idle before it was complete."""
+RESET = "reset"
+"""The target printed its reset banner, i.e. it rebooted."""
+CRASH = "crash"
+"""No output at all, the target is hung (trigger stuck) or went silent."""
+
+
+def read_until(target, done=None, timeout=0.25, idle=0.02, poll=0.0005):
+    """Read from ``target`` until ``done(text)`` is true or the line goes quiet.
+
+    Args:
+        target: ChipWhisperer target (needs ``in_waiting()`` and ``read()``).
+        done (callable): Called with everything read so far after each
+            chunk. Reading stops as soon as it returns True.
+        timeout (float): Give up after this many seconds in total.
+        idle (float): Give up after this many seconds without new bytes,
+            once at least one byte has arrived.
+        poll (float): Sleep between polls of ``in_waiting()``.
+
+    Returns:
+        ``(text, finished)`` where ``finished`` is True if ``done`` matched.
+    """
+    text = ""
+    start = last = time.perf_counter()
+    while True:
+        n = target.in_waiting()
+        now = time.perf_counter()
+        if n:
+            text += target.read(n, timeout=0)
+            last = now
+            if done is not None and done(text):
+                return text, True
+        elif text and now - last > idle:
+            return text, False
+        if now - start > timeout:
+            return text, False
+        if not n:
+            time.sleep(poll)
+
+
+class HealthMonitor(object):
+    """Decides the outcome of an attempt from as little waiting as possible.
+
+    Args:
+        scope: ChipWhisperer scope.
+        target: ChipWhisperer target.
+        reset (callable): ``reset_target(scope)`` from Setup_Generic.
+        terminators (tuple): Strings that end a complete response.
+        expected_len (int): Alternatively, stop once this many characters
+            arrived after ``prefix`` (or in total, without a prefix).
+        prefix (str): Part of the response that comes before the
+            interesting bit, e.g. ``"hello\\nA"`` in Attack 1. Not counted
+            towards ``expected_len``.
+        banner (str): Printed by the target on boot. Seeing it in a
+            response means the glitch reset the target.
+        timeout (float): Longest time to wait for a response.
+        idle (float): Time without new bytes after which a partial
+            response is given up on.
+    """
+    def __init__(self, scope, target, reset, terminators=(), expected_len=None,
+                 prefix="", banner="hello\n", timeout=0.25, idle=0.02):
+        self.scope = scope
+        self.target = target
+        self.reset = reset
+        self.terminators = tuple(terminators)
+        self.expected_len = expected_len
+        self.prefix = prefix
+        self.banner = banner
+        self.timeout = timeout
+        self.idle = idle
+        self.resets = 0
+
+    def _done(self, text):
+        for t in self.terminators:
+            if text.endswith(t):
+                return True
+        if self.expected_len is not None:
+            if not self.prefix:
+                return len(text) >= self.expected_len
+            i = text.find(self.prefix)
+            if i >= 0 and len(text) - i - len(self.prefix) >= self.expected_len:
+                return True
+        return False
+
+    def hung(self):
+        """True if the trigger never went low again, so the target is stuck."""
+        return bool(self.scope.adc.state)
+
+    def read_response(self, timed_out=False):
+        """Read the response to the current attempt.
+
+        Args:
+            timed_out (bool): Return value of ``scope.capture()``. When the
+                capture timed out and the trigger is stuck, no time is spent
+                reading at all.
+
+        Returns:
+            ``(response, status)`` with status one of :data:`NORMAL`,
+            :data:`PARTIAL`, :data:`RESET` or :data:`CRASH`.
+        """
+        if timed_out and self.hung() and not self.target.in_waiting():
+            return "", CRASH
+        text, finished = read_until(self.target, self._done, timeout=self.timeout, idle=self.idle)
+        if self.banner and self.banner in text and not text.startswith(self.banner):
+            return text, RESET
+        if finished:
+            return text, NORMAL
+        if not text:
+            # Silent target: either stuck in the trigger or it died after it.
+            return text, CRASH
+        return text, PARTIAL
+
+    def recover(self, status=None):
+        """Reset the target, but only if it is actually hung.
+
+        Args:
+            status: Status from :meth:`read_response`. A :data:`CRASH` forces
+                the reset, otherwise the trigger state decides.
+
+        Returns:
+            True if the target was reset.
+        """
+        if status == CRASH or self.hung():
+            self.reset(self.scope)
+            self.resets += 1
+            return True
+        return False
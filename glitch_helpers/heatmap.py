@@ -0,0 +1,169 @@
+"""Binned glitch results and heatmap rendering.
+
+``glitch.GlitchResults`` keeps every ``gr.add(...)`` call and
+``gr.plot_2d`` draws one marker per attempt, which stops being usable
+after a few hundred thousand attempts. :class:`GlitchHeatmap` bins each
+outcome straight into a numpy count tensor over the parameter grid, so
+memory and render time depend only on the grid size.
+
+``add`` takes the same arguments as ``GlitchResults.add``, so it can be
+swapped in without changing the attack loops::
+
+    gr = GlitchHeatmap({"width": width_range, "offset": offset_range})
+    ...
+    gr.add("success", (scope.glitch.width, scope.glitch.offset))
+    ...
+    gr.plot("success")
+"""
+from collections import OrderedDict
+import warnings
+
+import numpy as np
+
+from glitch_helpers.search import Range, range_values
+
+
+class GlitchHeatmap(object):
+    """Per-cell outcome counts over a grid of glitch parameters.
+
+    Args:
+        parameters (dict): Parameter name to :class:`Range` (or sequence
+            of evenly spaced values), in the order values are passed to
+            :meth:`add`.
+        groups (tuple): Outcome names.
+    """
+    def __init__(self, parameters, groups=("success", "reset", "normal")):
+        self.names = list(parameters.keys())
+        self.axes = []
+        for name in self.names:
+            r = parameters[name]
+            self.axes.append(range_values(r) if isinstance(r, Range) else np.asarray(list(r), dtype=float))
+        self.mins = np.array([a[0] for a in self.axes], dtype=float)
+        self.steps = np.array([(a[1] - a[0]) if len(a) > 1 else 1.0 for a in self.axes], dtype=float)
+        self.shape = tuple(len(a) for a in self.axes)
+        self.groups = list(groups)
+        self.counts = np.zeros((len(self.groups),) + self.shape, dtype=np.int64)
+        self.dropped = 0
+
+    def _index(self, values):
+        """Grid indexes for an ``(N, dims)`` array of values, plus an on-grid mask."""
+        idx = np.rint((np.asarray(values, dtype=float) - self.mins) / self.steps).astype(np.int64)
+        ok = np.all((idx >= 0) & (idx < np.array(self.shape)), axis=1)
+        return idx, ok
+
+    def add(self, group, values):
+        """Count one attempt, like ``GlitchResults.add``."""
+        idx, ok = self._index([values])
+        if not ok[0]:
+            self.dropped += 1
+            return
+        self.counts[(self.groups.index(group),) + tuple(idx[0])] += 1
+
+    def add_batch(self, groups, values):
+        """Count many attempts at once.
+
+        Args:
+            groups: Sequence of group names or integer group indexes.
+            values: ``(N, dims)`` array of parameter values.
+        """
+        groups = np.asarray(groups)
+        if len(groups) == 0:
+            return
+        if groups.dtype.kind in "US":
+            lookup = dict((g, i) for i, g in enumerate(self.groups))
+            groups = np.array([lookup[g] for g in groups.tolist()], dtype=np.int64)
+        groups = groups.astype(np.int64, copy=False)
+        idx, ok = self._index(values)
+        self.dropped += int(np.count_nonzero(~ok))
+        flat = np.ravel_multi_index((groups[ok],) + tuple(idx[ok].T), self.counts.shape)
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    @property
+    def total(self):
+        """Attempts per cell."""
+        return self.counts.sum(axis=0)
+
+    def rate(self, group):
+        """Per-cell fraction of attempts in ``group``; NaN where untried."""
+        total = self.total
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, self.counts[self.groups.index(group)] / total, np.nan)
+
+    def reduce(self, data, keep=2, **fixed):
+        """Slice or collapse ``data`` down to its first ``keep`` free axes.
+
+        Axes named in ``fixed`` are sliced at that value. Remaining extra
+        axes are combined with ``nanmax``, so a cell shows its best rate.
+        """
+        index = []
+        names = []
+        for name, axis in zip(self.names, self.axes):
+            if name in fixed:
+                index.append(int(np.argmin(np.abs(axis - fixed[name]))))
+            else:
+                index.append(slice(None))
+                names.append(name)
+        data = data[tuple(index)]
+        while data.ndim > keep:
+            with warnings.catch_warnings():
+                # all-NaN cells (never tried) are expected and stay NaN
+                warnings.simplefilter("ignore", RuntimeWarning)
+                data = np.nanmax(data, axis=-1)
+            names.pop()
+        return data, names
+
+    def best(self, group="success", n=10, min_attempts=1):
+        """The ``n`` cells with the highest ``group`` rate as ``(params, rate, attempts)``."""
+        rate = np.where(self.total >= min_attempts, self.rate(group), -1)
+        order = np.argsort(rate, axis=None)[::-1][:n]
+        out = []
+        for flat in order:
+            cell = np.unravel_index(flat, self.shape)
+            if rate[cell] < 0:
+                break
+            params = OrderedDict((name, float(a[i])) for name, a, i in zip(self.names, self.axes, cell))
+            out.append((params, float(rate[cell]), int(self.total[cell])))
+        return out
+
+    def plot(self, group="success", ax=None, **fixed):
+        """Draw the ``group`` rate over the first two free parameters.
+
+        Extra parameters can be fixed with keyword arguments (e.g.
+        ``ext_offset=37``); otherwise the best rate over them is shown.
+        """
+        import matplotlib.pyplot as plt
+        data, names = self.reduce(self.rate(group), **fixed)
+        if ax is None:
+            ax = plt.gca()
+        if data.ndim == 1:
+            data = data[:, None]
+            names.append("")
+        a0 = self.axes[self.names.index(names[0])]
+        extent = [a0[0] - 0.5 * self.steps[self.names.index(names[0])],
+                  a0[-1] + 0.5 * self.steps[self.names.index(names[0])], -0.5, data.shape[1] - 0.5]
+        if names[1]:
+            j = self.names.index(names[1])
+            a1 = self.axes[j]
+            extent[2:] = [a1[0] - 0.5 * self.steps[j], a1[-1] + 0.5 * self.steps[j]]
+        im = ax.imshow(data.T, origin="lower", aspect="auto", extent=extent,
+                       vmin=0, vmax=1, interpolation="nearest")
+        ax.set_xlabel(names[0])
+        ax.set_ylabel(names[1])
+        ax.set_title("{} rate".format(group))
+        ax.figure.colorbar(im, ax=ax)
+        return ax
+
+    def plot_slices(self, axis, group="success", cols=4):
+        """One heatmap per value of ``axis`` (e.g. ``"ext_offset"``) with any trials."""
+        import matplotlib.pyplot as plt
+        k = self.names.index(axis)
+        tried = np.moveaxis(self.total, k, 0).reshape(self.shape[k], -1).sum(axis=1) > 0
+        values = self.axes[k][tried]
+        rows = max(1, int(np.ceil(len(values) / float(cols))))
+        fig, axs = plt.subplots(rows, cols, squeeze=False, figsize=(4 * cols, 3 * rows))
+        for ax, v in zip(axs.flat, values):
+            self.plot(group, ax=ax, **{axis: v})
+            ax.set_title("{} = {}".format(axis, v))
+        for ax in list(axs.flat)[len(values):]:
+            ax.axis("off")
+        return fig
@@ -0,0 +1,222 @@
+"""Opt-in tracing of scope and target calls.
+
+Wrap the notebook's ``scope`` and ``target`` to see whether a slow
+campaign is bound by ``reset_target``, ``target.read``, ``scope.capture``
+or Python overhead::
+
+    tracer = Tracer()
+    scope = instrument(scope, tracer, "scope")
+    target = instrument(target, tracer, "target")
+    reset_target = tracer.wrap(reset_target, "reset_target")
+    ...  # run the attack loop unchanged
+    print(tracer.format_summary())
+    tracer.to_chrome_trace("campaign.json")   # open in ui.perfetto.dev
+
+Every method call, attribute read and attribute write on the wrapped
+objects (including ``scope.glitch``, ``scope.adc`` and ``scope.io``) is
+recorded with ``time.perf_counter_ns`` into preallocated numpy arrays used
+as a ring buffer. With ``tracer.enabled = False`` the wrappers only check
+that flag, and :func:`instrument` returns the object untouched if the
+tracer is disabled when it is called.
+"""
+import json
+import threading
+import time
+
+import numpy as np
+
+CHILDREN = ("glitch", "adc", "io", "clock", "gain", "trigger")
+"""Scope sub-objects that are wrapped too, so their settings are traced."""
+
+
+class Tracer(object):
+    """Preallocated ring buffer of timed spans.
+
+    Args:
+        capacity (int): Spans kept; the oldest are overwritten.
+        enabled (bool): Start recording straight away.
+    """
+    def __init__(self, capacity=1 << 16, enabled=True):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.start = np.zeros(capacity, dtype=np.int64)
+        self.duration = np.zeros(capacity, dtype=np.int64)
+        self.name_id = np.zeros(capacity, dtype=np.int32)
+        self.thread = np.zeros(capacity, dtype=np.int64)
+        self.names = []
+        self._ids = {}
+        self.count = 0
+        self.t0 = time.perf_counter_ns()
+
+    def intern(self, name):
+        """Id for ``name``, used to record spans without string handling."""
+        i = self._ids.get(name)
+        if i is None:
+            i = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def record(self, name_id, start, end):
+        """Store one span; ``start`` and ``end`` come from ``perf_counter_ns``."""
+        i = self.count % self.capacity
+        self.start[i] = start
+        self.duration[i] = end - start
+        self.name_id[i] = name_id
+        self.thread[i] = threading.get_ident()
+        self.count += 1
+
+    def span(self, name):
+        """Context manager that records its body as one span."""
+        return _Span(self, self.intern(name))
+
+    def wrap(self, fn, name=None):
+        """Return ``fn`` wrapped so each call is recorded."""
+        nid = self.intern(name or getattr(fn, "__name__", "call"))
+        clock = time.perf_counter_ns
+
+        def traced(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            t = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(nid, t, clock())
+        traced.__wrapped__ = fn
+        traced.__name__ = getattr(fn, "__name__", "traced")
+        traced.__doc__ = getattr(fn, "__doc__", None)
+        return traced
+
+    def clear(self):
+        self.count = 0
+
+    def spans(self):
+        """``(name_id, start, duration, thread)`` arrays of the kept spans, oldest first."""
+        n = min(self.count, self.capacity)
+        if self.count <= self.capacity:
+            idx = np.arange(n)
+        else:
+            idx = (np.arange(n) + self.count) % self.capacity
+        return self.name_id[idx], self.start[idx], self.duration[idx], self.thread[idx]
+
+    def summary(self):
+        """Per-name count, total, mean, p50, p99 and max in milliseconds."""
+        ids, _, dur, _ = self.spans()
+        out = {}
+        for i in np.unique(ids):
+            d = dur[ids == i] / 1e6
+            out[self.names[i]] = {
+                "count": len(d),
+                "total_ms": float(d.sum()),
+                "mean_ms": float(d.mean()),
+                "p50_ms": float(np.percentile(d, 50)),
+                "p99_ms": float(np.percentile(d, 99)),
+                "max_ms": float(d.max()),
+            }
+        return out
+
+    def format_summary(self):
+        rows = sorted(self.summary().items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+        lines = ["{:<28} {:>8} {:>11} {:>9} {:>9} {:>9}".format(
+            "call", "count", "total ms", "mean ms", "p50 ms", "p99 ms")]
+        for name, r in rows:
+            lines.append("{:<28} {:>8} {:>11.2f} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+                name, r["count"], r["total_ms"], r["mean_ms"], r["p50_ms"], r["p99_ms"]))
+        return "\n".join(lines)
+
+    def histogram(self, name, bins=20):
+        """Log-spaced histogram of one call's durations: ``(counts, edges_ms)``."""
+        ids, _, dur, _ = self.spans()
+        d = dur[ids == self._ids[name]] / 1e6
+        lo, hi = max(d.min(), 1e-4), max(d.max(), 1e-4) * 1.0001
+        return np.histogram(d, bins=np.geomspace(lo, hi, bins + 1))
+
+    def to_chrome_trace(self, path=None):
+        """Export the spans as Chrome trace / Perfetto JSON.
+
+        Returns the trace dict, and also writes it to ``path`` if given.
+        """
+        ids, start, dur, thread = self.spans()
+        tids = dict((t, k) for k, t in enumerate(np.unique(thread).tolist()))
+        events = [{"name": self.names[i], "ph": "X", "pid": 1, "tid": tids[t],
+                   "ts": (s - self.t0) / 1e3, "dur": d / 1e3}
+                  for i, s, d, t in zip(ids.tolist(), start.tolist(), dur.tolist(), thread.tolist())]
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(trace, f)
+        return trace
+
+
+class _Span(object):
+    __slots__ = ("tracer", "nid", "t")
+
+    def __init__(self, tracer, nid):
+        self.tracer = tracer
+        self.nid = nid
+
+    def __enter__(self):
+        self.t = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        if self.tracer.enabled:
+            self.tracer.record(self.nid, self.t, time.perf_counter_ns())
+        return False
+
+
+class Instrumented(object):
+    """Proxy that records calls and attribute access on the wrapped object."""
+    def __init__(self, obj, tracer, name, children=CHILDREN):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_tracer", tracer)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_children", children)
+
+    def _cache(self, attr, value):
+        # Stored on the instance, so later lookups never reach __getattr__.
+        object.__setattr__(self, attr, value)
+        return value
+
+    def __getattr__(self, attr):
+        tracer = self._tracer
+        obj = self._obj
+        if attr in self._children:
+            child = getattr(obj, attr)
+            return self._cache(attr, Instrumented(child, tracer, self._name + "." + attr, self._children))
+        if not tracer.enabled:
+            return getattr(obj, attr)
+        t = time.perf_counter_ns()
+        value = getattr(obj, attr)
+        end = time.perf_counter_ns()
+        if callable(value):
+            wrapped = tracer.wrap(value, "{}.{}()".format(self._name, attr))
+            # Bound methods of the wrapped object stay the same, cache them.
+            if getattr(value, "__self__", None) is obj:
+                self._cache(attr, wrapped)
+            return wrapped
+        tracer.record(tracer.intern("{}.{}".format(self._name, attr)), t, end)
+        return value
+
+    def __setattr__(self, attr, value):
+        tracer = self._tracer
+        if not tracer.enabled:
+            setattr(self._obj, attr, value)
+            return
+        t = time.perf_counter_ns()
+        setattr(self._obj, attr, value)
+        tracer.record(tracer.intern("{}.{}=".format(self._name, attr)), t, time.perf_counter_ns())
+
+    def __repr__(self):
+        return repr(self._obj)
+
+
+def instrument(obj, tracer, name, children=CHILDREN):
+    """Wrap ``obj`` (a scope or target, real or simulated) for tracing.
+
+    Returns ``obj`` unchanged if ``tracer`` is disabled, so leaving the
+    call in a notebook costs nothing.
+    """
+    if not tracer.enabled:
+        return obj
+    return Instrumented(obj, tracer, name, children)
@@ -0,0 +1,186 @@
+"""Live trace plotting that does not hold up the capture loop.
+
+Attack 2 calls ``plot.send(trace)`` on a ``real_time_plot`` for every
+attempt and waits for matplotlib to redraw. :class:`LivePlot` only copies
+the trace into a ring buffer in :meth:`LivePlot.send`. A background
+thread redraws at most ``fps`` times a second, showing each recent trace
+as a min/max envelope decimated to ``bins`` points. Traces sent with
+``highlight=True`` (the ``success_plot`` ones) are kept separately and
+always drawn.
+
+matplotlib is only imported by :meth:`LivePlot.start`, which creates the
+figure and its artists on the calling (notebook) thread. The redraw
+thread only moves the data of those artists and asks for a redraw.
+
+Example::
+
+    plot = LivePlot(plot_len=5000)
+    plot.start()
+    ...
+    plot.send(trace, highlight=success)
+    ...
+    plot.stop()
+"""
+import threading
+import time
+
+import numpy as np
+
+
+def minmax_decimate(trace, bins, out=None):
+    """Reduce ``trace`` to a ``(2, bins)`` array of per-bin minimum and maximum.
+
+    Trailing samples that do not fill a whole bin are dropped.
+    """
+    trace = np.asarray(trace)
+    per_bin = max(1, len(trace) // bins)
+    bins = min(bins, len(trace) // per_bin)
+    blocks = trace[:bins * per_bin].reshape(bins, per_bin)
+    if out is None:
+        out = np.empty((2, bins))
+    np.min(blocks, axis=1, out=out[0, :bins])
+    np.max(blocks, axis=1, out=out[1, :bins])
+    return out[:, :bins]
+
+
+class LivePlot(object):
+    """Rate limited live plot of the most recent traces.
+
+    Args:
+        plot_len (int): Samples of each trace to keep.
+        history (int): Number of recent traces drawn.
+        bins (int): Points per drawn trace (roughly the plot's pixel width).
+        fps (float): Maximum redraws per second.
+        max_highlights (int): Highlighted traces kept; oldest dropped first.
+        enabled (bool): When False, :meth:`send` returns immediately.
+        draw (callable): Optional ``draw(envelopes, highlights)`` used
+            instead of matplotlib, where both are lists of ``(2, bins)``
+            arrays.
+    """
+    def __init__(self, plot_len=5000, history=8, bins=1000, fps=5.0, max_highlights=4,
+                 enabled=True, draw=None):
+        self.plot_len = plot_len
+        self.history = history
+        self.bins = bins
+        self.fps = fps
+        self.max_highlights = max_highlights
+        self.enabled = enabled
+        self.frames = 0
+        self.sent = 0
+        self._ring = np.zeros((history, plot_len))
+        self._lens = np.zeros(history, dtype=int)
+        self._highlights = []
+        self._head = 0
+        self._count = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._draw = draw
+        self._fig = None
+
+    def send(self, trace, highlight=False):
+        """Queue ``trace`` for display. Never waits for a redraw."""
+        if not self.enabled:
+            return
+        n = min(len(trace), self.plot_len)
+        with self._lock:
+            self._ring[self._head, :n] = trace[:n]
+            self._lens[self._head] = n
+            self._head = (self._head + 1) % self.history
+            self._count = min(self._count + 1, self.history)
+            if highlight:
+                self._highlights.append(minmax_decimate(trace[:n], self.bins).copy())
+                del self._highlights[:-self.max_highlights]
+                self._wake.set()
+            self._dirty = True
+            self.sent += 1
+
+    def start(self):
+        """Create the figure (unless ``draw`` was given) and start redrawing."""
+        if self._draw is None and self._fig is None:
+            self._setup_matplotlib()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-plot")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the redraw thread after drawing a final frame."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.redraw()
+
+    def _snapshot(self):
+        with self._lock:
+            if not self._dirty:
+                return None
+            self._dirty = False
+            envelopes = []
+            for k in range(self._count):
+                i = (self._head - self._count + k) % self.history
+                envelopes.append(minmax_decimate(self._ring[i, :self._lens[i]], self.bins))
+            return envelopes, list(self._highlights)
+
+    def redraw(self):
+        """Draw a frame now if anything changed since the last one."""
+        snap = self._snapshot()
+        if snap is None:
+            return False
+        (self._draw or self._draw_matplotlib)(*snap)
+        self.frames += 1
+        return True
+
+    def _run(self):
+        period = 1.0 / self.fps
+        last = 0.0
+        while not self._stop.is_set():
+            wait = period - (time.perf_counter() - last)
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+                if time.perf_counter() - last < period:
+                    # Woken early (highlight): still respect the frame cap.
+                    self._stop.wait(period - (time.perf_counter() - last))
+            last = time.perf_counter()
+            self.redraw()
+
+    def _setup_matplotlib(self):
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import PolyCollection
+        self._fig, self._ax = plt.subplots()
+        self._polys = []
+        for k in range(self.history):
+            alpha = min(1.0, 0.2 + 0.8 * (k + 1) / self.history)
+            self._polys.append(PolyCollection([], facecolor="C0", alpha=alpha, linewidth=0))
+        for _ in range(self.max_highlights):
+            self._polys.append(PolyCollection([], facecolor="C3", alpha=0.6, linewidth=0))
+        for poly in self._polys:
+            self._ax.add_collection(poly)
+        self._ax.set_xlim(0, self.plot_len)
+
+    def _draw_matplotlib(self, envelopes, highlights):
+        if self._fig is None:
+            self._setup_matplotlib()
+        # Oldest traces get the faintest artists; highlights follow the history ones.
+        fill = [None] * (self.history - len(envelopes)) + list(envelopes)
+        fill += list(highlights) + [None] * (self.max_highlights - len(highlights))
+        lo, hi = np.inf, -np.inf
+        for poly, env in zip(self._polys, fill):
+            if env is None:
+                poly.set_verts([])
+                continue
+            x = np.arange(env.shape[1]) * (self.plot_len / float(self.bins))
+            poly.set_verts([np.concatenate([np.column_stack([x, env[1]]),
+                                            np.column_stack([x[::-1], env[0][::-1]])])])
+            lo, hi = min(lo, env[0].min()), max(hi, env[1].max())
+        if lo < hi:
+            pad = 0.05 * (hi - lo)
+            self._ax.set_ylim(lo - pad, hi + pad)
+        self._fig.canvas.draw_idle()
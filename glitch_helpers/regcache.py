@@ -0,0 +1,173 @@
+"""Shadow register cache for ``scope.glitch``.
+
+Every ``scope.glitch.<setting> = value`` is a USB transaction, and a change
+of ``width`` or ``offset`` also makes the FPGA partially reconfigure its
+glitch clock phase. The lab loops set the same values over and over: the
+``for i in range(0, 100)`` ext_offset loop, ``repeat``/``output``/
+``clk_src``/``trigger_src`` at the top of every cell, and the whole setup
+again after a crash.
+
+:class:`GlitchCache` sits in front of ``scope.glitch``, remembers what was
+last written, and drops writes of an unchanged value. Inside
+:meth:`GlitchCache.batch` writes are held back and flushed once, in
+:data:`WRITE_ORDER`, so mode settings go out before the timing ones::
+
+    glitch = GlitchCache(scope.glitch)
+    for width, offset, ext_offset in sweep(Range(-12, -10, 1), Range(-48, -40, 1), range(100)):
+        with glitch.batch():
+            glitch.clk_src = "clkgen"       # dropped after the first time
+            glitch.output = "clock_xor"
+            glitch.width = width
+            glitch.offset = offset
+            glitch.ext_offset = ext_offset
+        ...
+    print(glitch.writes, glitch.skipped)
+
+Reads of a cached setting return the value last written through the
+cache, not the quantised value the hardware reports. Call
+:meth:`GlitchCache.invalidate` if something else (a reconnect,
+``scope.default_setup()``, direct writes to ``scope.glitch``) may have
+changed the hardware.
+
+:func:`sweep` orders a grid so the expensive settings change least often.
+"""
+import contextlib
+import itertools
+
+from glitch_helpers.search import axis_values
+
+WRITE_ORDER = ("clk_src", "trigger_src", "output", "repeat",
+               "width", "width_fine", "offset", "offset_fine", "ext_offset")
+"""Settings cached by :class:`GlitchCache`, in the order a batch writes them."""
+
+RECONFIG = ("width", "width_fine", "offset", "offset_fine")
+"""Settings whose change triggers partial reconfiguration of the FPGA."""
+
+_MISSING = object()
+
+
+class GlitchCache(object):
+    """Write-through cache of ``scope.glitch`` settings.
+
+    Args:
+        glitch: ``scope.glitch`` (real or :class:`glitch_helpers.sim.SimGlitch`).
+        fields (tuple): Settings to cache, in write order. Anything else
+            is passed straight through.
+    """
+    def __init__(self, glitch, fields=WRITE_ORDER):
+        object.__setattr__(self, "_glitch", glitch)
+        object.__setattr__(self, "_fields", tuple(fields))
+        object.__setattr__(self, "_hw", {})
+        object.__setattr__(self, "_pending", {})
+        object.__setattr__(self, "_depth", 0)
+        object.__setattr__(self, "writes", 0)
+        object.__setattr__(self, "skipped", 0)
+        object.__setattr__(self, "reconfigs", 0)
+
+    def __getattr__(self, name):
+        if name not in self._fields:
+            return getattr(self._glitch, name)
+        value = self._pending.get(name, _MISSING)
+        if value is _MISSING:
+            value = self._hw.get(name, _MISSING)
+        if value is _MISSING:
+            value = self._hw[name] = getattr(self._glitch, name)
+        return value
+
+    def __setattr__(self, name, value):
+        if name not in self._fields:
+            setattr(self._glitch, name, value)
+        elif self._depth:
+            self._pending[name] = value
+        else:
+            self._write(name, value)
+
+    def _write(self, name, value):
+        if self._hw.get(name, _MISSING) == value:
+            object.__setattr__(self, "skipped", self.skipped + 1)
+            return
+        setattr(self._glitch, name, value)
+        self._hw[name] = value
+        object.__setattr__(self, "writes", self.writes + 1)
+        if name in RECONFIG:
+            object.__setattr__(self, "reconfigs", self.reconfigs + 1)
+
+    def flush(self):
+        """Write the settings held back by :meth:`batch`."""
+        pending = self._pending
+        for name in self._fields:
+            if name in pending:
+                self._write(name, pending.pop(name))
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Hold writes back and flush them, in order, at the end of the block."""
+        object.__setattr__(self, "_depth", self._depth + 1)
+        try:
+            yield self
+        finally:
+            object.__setattr__(self, "_depth", self._depth - 1)
+            if not self._depth:
+                self.flush()
+
+    def update(self, params=None, **kwargs):
+        """Set several settings as one batch; takes a dict and/or keywords."""
+        with self.batch():
+            for name, value in dict(params or {}, **kwargs).items():
+                setattr(self, name, value)
+
+    def invalidate(self, *names):
+        """Forget the cached hardware values (all of them if none are named).
+
+        The next write of each forgotten setting always goes to the scope.
+        """
+        if not names:
+            self._hw.clear()
+        for name in names:
+            self._hw.pop(name, None)
+
+    def __repr__(self):
+        return "GlitchCache({!r})".format(self._glitch)
+
+
+def sweep(width_range, offset_range, ext_range, snake=True):
+    """Glitch settings grid ordered to keep reconfiguration to a minimum.
+
+    ``width`` is the outermost loop and ``ext_offset``, which needs no
+    reconfiguration, the innermost. With ``snake`` the inner loops run
+    back and forth, so moving to the next width or offset changes only
+    that one setting.
+
+    Args:
+        width_range, offset_range, ext_range: :class:`Range` or values.
+
+    Yields:
+        ``(width, offset, ext_offset)`` tuples.
+    """
+    widths, offsets, exts = [axis_values(r) for r in (width_range, offset_range, ext_range)]
+    if not snake:
+        for point in itertools.product(widths, offsets, exts):
+            yield point
+        return
+    k = 0
+    for i, width in enumerate(widths):
+        for offset in (offsets if i % 2 == 0 else offsets[::-1]):
+            for ext_offset in (exts if k % 2 == 0 else exts[::-1]):
+                yield width, offset, ext_offset
+            k += 1
+
+
+def count_writes(points, names=("width", "offset", "ext_offset")):
+    """Number of writes of each setting a sequence of points needs.
+
+    Useful to compare orderings, e.g. ``count_writes(sweep(...))`` against
+    the lab's offset-outer loops.
+    """
+    counts = dict.fromkeys(names, 0)
+    last = (_MISSING,) * len(names)
+    for point in points:
+        for name, a, b in zip(names, point, last):
+            if a != b:
+                counts[name] += 1
+        last = tuple(point)
+    return counts
@@ -0,0 +1,228 @@
+"""Columnar, append-only store for glitch results.
+
+The Attack 2 loop keeps ``[offset, width, ext_offset, success,
+repr(response)]`` for every attempt in a Python list, which gets slow and
+large on long campaigns. :class:`ResultStore` keeps one typed numpy array
+per column instead, stores each distinct response string only once and
+writes full chunks to disk as plain ``.npy`` files that are memory mapped
+when read back.
+
+Example::
+
+    store = ResultStore("attack2_results")
+    ...
+    store.append(offset=scope.glitch.offset, width=scope.glitch.width,
+                 ext_offset=scope.glitch.ext_offset, success=success,
+                 response=response)
+    ...
+    store.flush()
+    hits = store.select(success=True, width=(-12, -10))
+    print(hits["ext_offset"], store.decode(hits["response"]))
+"""
+from collections import OrderedDict
+import json
+import os
+
+import numpy as np
+
+DEFAULT_COLUMNS = OrderedDict([
+    ("offset", "f8"),
+    ("width", "f8"),
+    ("ext_offset", "i4"),
+    ("success", "?"),
+])
+
+_META_FILE = "store.json"
+_CHUNK_DIR = "chunk_{:06d}"
+
+
+class ResultStore(object):
+    """Append-only table of glitch attempts.
+
+    Args:
+        path (str): Directory to write chunks to. ``None`` keeps
+            everything in memory.
+        columns (dict): Column name to numpy dtype string. A ``response``
+            column holding dictionary codes is always added.
+        chunk_size (int): Rows buffered before a chunk is sealed (and
+            written out, if ``path`` is set).
+    """
+    def __init__(self, path=None, columns=DEFAULT_COLUMNS, chunk_size=65536):
+        self.path = path
+        self.columns = OrderedDict(columns)
+        self.columns["response"] = "i4"
+        self.chunk_size = chunk_size
+        self.vocab = {}
+        self.strings = []
+        self.chunks = []
+        self._new_buffer()
+        if path is not None:
+            if os.path.exists(os.path.join(path, _META_FILE)):
+                self._load()
+            else:
+                os.makedirs(path, exist_ok=True)
+                self._save_meta()
+
+    def _new_buffer(self):
+        self._buf = OrderedDict((k, np.zeros(self.chunk_size, dtype=dt))
+                                for k, dt in self.columns.items())
+        self._n = 0
+
+    def __len__(self):
+        return sum(len(c["response"]) for c in self.chunks) + self._n
+
+    def encode(self, response):
+        """Return the dictionary code for ``response``, adding it if new."""
+        code = self.vocab.get(response)
+        if code is None:
+            code = len(self.strings)
+            self.vocab[response] = code
+            self.strings.append(response)
+        return code
+
+    def decode(self, codes):
+        """Map a code (or array of codes) back to response strings."""
+        if np.ndim(codes) == 0:
+            return self.strings[int(codes)]
+        return [self.strings[c] for c in np.asarray(codes).tolist()]
+
+    def append(self, response="", **values):
+        """Add one row. Columns that are not given are left as zero."""
+        i = self._n
+        buf = self._buf
+        for k, v in values.items():
+            buf[k][i] = v
+        buf["response"][i] = self.encode(response)
+        self._n = i + 1
+        if self._n == self.chunk_size:
+            self._seal()
+
+    def extend(self, response=None, **columns):
+        """Add many rows at once from equal length arrays."""
+        n = len(next(iter(columns.values()))) if columns else len(response)
+        codes = np.zeros(n, dtype="i4")
+        if response is not None:
+            codes[:] = [self.encode(r) for r in response]
+        start = 0
+        while start < n:
+            take = min(n - start, self.chunk_size - self._n)
+            sl = slice(self._n, self._n + take)
+            for k, v in columns.items():
+                self._buf[k][sl] = v[start:start + take]
+            self._buf["response"][sl] = codes[start:start + take]
+            self._n += take
+            start += take
+            if self._n == self.chunk_size:
+                self._seal()
+
+    def _seal(self):
+        if self._n == 0:
+            return
+        chunk = OrderedDict((k, v[:self._n].copy()) for k, v in self._buf.items())
+        if self.path is not None:
+            d = os.path.join(self.path, _CHUNK_DIR.format(len(self.chunks)))
+            os.makedirs(d, exist_ok=True)
+            for k, v in chunk.items():
+                np.save(os.path.join(d, k + ".npy"), v)
+            chunk = self._map_chunk(d)
+            self._save_meta()
+        self.chunks.append(chunk)
+        self._new_buffer()
+
+    def flush(self):
+        """Seal the partially filled buffer and write it out."""
+        self._seal()
+        if self.path is not None:
+            self._save_meta()
+
+    def _save_meta(self):
+        meta = {"columns": list(self.columns.items()),
+                "chunks": len(self.chunks),
+                "strings": self.strings}
+        tmp = os.path.join(self.path, _META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, _META_FILE))
+
+    def _map_chunk(self, d):
+        return OrderedDict((k, np.load(os.path.join(d, k + ".npy"), mmap_mode="r"))
+                           for k in self.columns)
+
+    def _load(self):
+        with open(os.path.join(self.path, _META_FILE)) as f:
+            meta = json.load(f)
+        self.columns = OrderedDict((k, str(v)) for k, v in meta["columns"])
+        self.strings = list(meta["strings"])
+        self.vocab = dict((s, i) for i, s in enumerate(self.strings))
+        self.chunks = [self._map_chunk(os.path.join(self.path, _CHUNK_DIR.format(i)))
+                       for i in range(meta["chunks"])]
+        self._new_buffer()
+
+    @classmethod
+    def open(cls, path, chunk_size=65536):
+        """Reopen a store written earlier. New rows are appended to it.
+
+        Raises:
+            FileNotFoundError: If ``path`` holds no store.
+        """
+        meta = os.path.join(path, _META_FILE)
+        if not os.path.exists(meta):
+            raise FileNotFoundError("No result store at {} ({} is missing)".format(path, meta))
+        return cls(path, columns=[], chunk_size=chunk_size)
+
+    def _parts(self):
+        for chunk in self.chunks:
+            yield chunk
+        if self._n:
+            yield OrderedDict((k, v[:self._n]) for k, v in self._buf.items())
+
+    def column(self, name):
+        """Return one whole column as a single array."""
+        parts = [p[name] for p in self._parts()]
+        if not parts:
+            return np.zeros(0, dtype=self.columns[name])
+        return np.concatenate(parts)
+
+    def mask(self, part, **conditions):
+        """Boolean mask of the rows of ``part`` that match ``conditions``.
+
+        A condition is either a value to compare against or a ``(lo, hi)``
+        tuple, inclusive on both ends. ``response`` conditions take the
+        response string.
+        """
+        m = np.ones(len(part["response"]), dtype=bool)
+        for k, cond in conditions.items():
+            col = part[k]
+            if k == "response" and not isinstance(cond, tuple):
+                code = self.vocab.get(cond)
+                if code is None:
+                    m[:] = False
+                    continue
+                cond = code
+            if isinstance(cond, tuple):
+                lo, hi = cond
+                m &= (col >= lo) & (col <= hi)
+            else:
+                m &= col == cond
+        return m
+
+    def count(self, **conditions):
+        """Number of rows matching ``conditions``."""
+        return int(sum(np.count_nonzero(self.mask(p, **conditions)) for p in self._parts()))
+
+    def select(self, columns=None, **conditions):
+        """Return ``{column: array}`` of the rows matching ``conditions``.
+
+        Example::
+
+            store.select(success=True, width=(-12, -10))
+        """
+        columns = list(columns or self.columns)
+        out = dict((k, []) for k in columns)
+        for p in self._parts():
+            m = self.mask(p, **conditions)
+            if m.any():
+                for k in columns:
+                    out[k].append(p[k][m])
+        return dict((k, np.concatenate(v) if v else np.zeros(0, dtype=self.columns[k]))
+                    for k, v in out.items())
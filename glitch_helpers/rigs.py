@@ -0,0 +1,326 @@
+"""Run one glitch campaign across several scope/target rigs.
+
+Every notebook drives a single global ``scope``/``target``. A
+:class:`RigScheduler` instead splits the parameter space into shards and
+runs them on several rigs, each in its own process. Shards are handed out
+one at a time, so a fast rig simply takes more of them. A shard that a
+rig is sitting on for too long is also given to another idle rig (the
+first result wins), and a rig whose process dies has its shard put back
+and is restarted. All results are merged into one
+:class:`~glitch_helpers.results.ResultStore`.
+
+Rigs are described by a :class:`RigSpec`. The ``factory`` must be
+picklable (a module level function or class instance) because it is
+called inside the worker process to connect to the hardware.
+
+Example::
+
+    rigs = [RigSpec("arm0", "CWLITEARM", HardwareRig(sn="50203120...")),
+            RigSpec("xmega0", "CWLITEXMEGA", HardwareRig(sn="44203120..."))]
+    space = {"width": Range(-12, -10, 1), "offset": Range(-48, -40, 1),
+             "ext_offset": Range(0, 100, 1), "repeat": [1]}
+    store = RigScheduler(rigs, password_attempt).run(space)
+    print(store.count(success=True))
+"""
+from collections import deque, namedtuple, OrderedDict
+import itertools
+import multiprocessing
+import queue
+import time
+import traceback
+
+from glitch_helpers.regcache import GlitchCache
+from glitch_helpers.results import ResultStore
+from glitch_helpers.search import axis_values
+
+PLATFORM_SETTINGS = {
+    "CWLITEARM": {"clk_src": "clkgen", "output": "clock_xor", "trigger_src": "ext_single", "repeat": 1},
+    "CW308_STM32F3": {"clk_src": "clkgen", "output": "clock_xor", "trigger_src": "ext_single", "repeat": 1},
+    "CWLITEXMEGA": {"clk_src": "clkgen", "output": "clock_xor", "trigger_src": "ext_single", "repeat": 105},
+    "CW303": {"clk_src": "clkgen", "output": "clock_xor", "trigger_src": "ext_single", "repeat": 105},
+}
+"""``scope.glitch`` settings used by the notebooks' ``PLATFORM`` branches."""
+
+RigSpec = namedtuple("RigSpec", ["name", "platform", "factory"])
+"""A rig: a name, a ``PLATFORM`` string and a ``factory()`` returning ``(scope, target)``."""
+
+
+class HardwareRig(object):
+    """Connects to a physical ChipWhisperer by serial number."""
+    def __init__(self, sn=None):
+        self.sn = sn
+
+    def __call__(self):
+        import chipwhisperer as cw
+        scope = cw.scope(sn=self.sn)
+        target = cw.target(scope)
+        scope.default_setup()
+        return scope, target
+
+
+class SimRig(object):
+    """Simulated rig for testing, see :mod:`glitch_helpers.sim`.
+
+    Args:
+        seed (int): Seed for the simulated target.
+        fault_rate (callable): Passed to :func:`glitch_helpers.sim.connect`.
+            Must be picklable.
+        crash_after (int): Make ``target.read`` fail after this many calls,
+            to exercise crash recovery.
+        **latencies: ``arm_latency``, ``capture_latency`` and
+            ``read_latency`` in seconds.
+    """
+    def __init__(self, seed=0, fault_rate=None, crash_after=None, **latencies):
+        self.seed = seed
+        self.fault_rate = fault_rate
+        self.crash_after = crash_after
+        self.latencies = latencies
+
+    def __call__(self):
+        from glitch_helpers import sim
+        scope, target = sim.connect(fault_rate=self.fault_rate, seed=self.seed, **self.latencies)
+        if self.crash_after is not None:
+            read, reads = target.read, [0]
+
+            def crashing_read(*args, **kwargs):
+                reads[0] += 1
+                if reads[0] > self.crash_after:
+                    raise IOError("simulated USB failure")
+                return read(*args, **kwargs)
+            target.read = crashing_read
+        return scope, target
+
+
+def password_attempt(scope, target, params, reset):
+    """One Attack 2 attempt against ``glitch3()``.
+
+    ``reset`` is the rig's ``reset_target(scope)``.
+
+    Returns:
+        ``(success, response)``.
+    """
+    target.flush()
+    scope.arm()
+    target.write("x\n")
+    if scope.capture():
+        reset(scope)
+    response = target.read(timeout=10)
+    return "Welcome" in response, response
+
+
+def shard_space(space, shard_size):
+    """Split a parameter space into shards of at most ``shard_size`` points.
+
+    Args:
+        space (dict): Parameter name to :class:`Range` or list of values.
+
+    Returns:
+        List of shards, each a list of parameter tuples in the order of
+        ``space``.
+    """
+    axes = [axis_values(v) for v in space.values()]
+    points = list(itertools.product(*axes))
+    return [points[i:i + shard_size] for i in range(0, len(points), shard_size)]
+
+
+def _rig_main(index, spec, names, attempt, inbox, outbox):
+    # Imported here so that importing the package doesn't import clock_glitch,
+    # which would upset ``python -m glitch_helpers.clock_glitch``.
+    from glitch_helpers.clock_glitch import make_reset
+    try:
+        scope, target = spec.factory()
+        reset = make_reset(spec.platform)
+        glitch = GlitchCache(scope.glitch)
+        glitch.update(PLATFORM_SETTINGS.get(spec.platform, {}))
+        if hasattr(scope, "io"):
+            scope.io.hs2 = "glitch"
+    except Exception:
+        outbox.put(("error", index, None, traceback.format_exc()))
+        return
+    outbox.put(("ready", index, None, None))
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        shard_id, points = item
+        rows = []
+        try:
+            for point in points:
+                params = OrderedDict(zip(names, point))
+                glitch.update(params)
+                success, response = attempt(scope, target, params, reset)
+                rows.append(point + (bool(success), response))
+        except Exception:
+            outbox.put(("error", index, shard_id, traceback.format_exc()))
+            return
+        outbox.put(("done", index, shard_id, rows))
+    for obj in (target, scope):
+        try:
+            obj.dis()
+        except Exception:
+            pass
+
+
+class _Rig(object):
+    def __init__(self, spec):
+        self.spec = spec
+        self.process = None
+        self.inbox = None
+        self.shard = None
+        self.started = 0.0
+        self.restarts = 0
+        self.done = 0
+        self.busy_time = 0.0
+        self.ready = False
+        self.dead = False
+
+
+class RigScheduler(object):
+    """Shards a glitch parameter space over several rigs.
+
+    Args:
+        rigs (list): :class:`RigSpec` for each rig.
+        attempt (callable): ``attempt(scope, target, params, reset)``
+            returning ``(success, response)``. Runs in the worker
+            processes, so it must be picklable. The glitch settings in
+            ``params`` have already been applied to ``scope.glitch``, and
+            ``reset(scope)`` is ``reset_target`` for the rig's platform.
+        shard_size (int): Points per shard. Smaller shards rebalance
+            better, larger ones have less overhead.
+        shard_timeout (float): Seconds after which a shard still being
+            worked on is also handed to an idle rig.
+        max_restarts (int): How often a crashed rig is restarted before it
+            is dropped.
+        store (ResultStore): Where to merge results. A new in-memory store
+            is made if not given.
+        context: ``multiprocessing`` context to use.
+    """
+    def __init__(self, rigs, attempt=password_attempt, shard_size=100, shard_timeout=60.0,
+                 max_restarts=2, store=None, context=None):
+        self.rigs = [_Rig(spec) for spec in rigs]
+        self.attempt = attempt
+        self.shard_size = shard_size
+        self.shard_timeout = shard_timeout
+        self.max_restarts = max_restarts
+        self.store = store
+        self.ctx = context or multiprocessing.get_context()
+        self.errors = []
+
+    def _start(self, i, names, outbox):
+        rig = self.rigs[i]
+        rig.inbox = self.ctx.Queue()
+        rig.process = self.ctx.Process(target=_rig_main, name="rig-" + rig.spec.name,
+                                       args=(i, rig.spec, names, self.attempt, rig.inbox, outbox))
+        rig.process.daemon = True
+        rig.process.start()
+        rig.shard = None
+        rig.ready = False
+
+    def _give(self, rig, shard_id, shards):
+        rig.shard = shard_id
+        rig.started = time.perf_counter()
+        rig.inbox.put((shard_id, shards[shard_id]))
+
+    def _crashed(self, i, names, outbox, pending, message):
+        rig = self.rigs[i]
+        self.errors.append((rig.spec.name, message))
+        if rig.shard is not None:
+            pending.appendleft(rig.shard)
+            rig.shard = None
+        if rig.process is not None:
+            rig.process.join(timeout=1)
+        if rig.restarts < self.max_restarts:
+            rig.restarts += 1
+            self._start(i, names, outbox)
+        else:
+            rig.dead = True
+
+    def run(self, space):
+        """Run every point of ``space`` once and return the merged store.
+
+        Raises:
+            RuntimeError: If every rig died before the space was covered.
+        """
+        names = list(space.keys())
+        shards = shard_space(space, self.shard_size)
+        pending = deque(range(len(shards)))
+        finished = set()
+        if self.store is None:
+            columns = OrderedDict((n, "f8") for n in names)
+            columns["success"] = "?"
+            columns["rig"] = "i2"
+            self.store = ResultStore(columns=columns)
+
+        outbox = self.ctx.Queue()
+        for i in range(len(self.rigs)):
+            self._start(i, names, outbox)
+
+        try:
+            while len(finished) < len(shards):
+                live = [r for r in self.rigs if not r.dead]
+                if not live:
+                    raise RuntimeError("All rigs failed:\n" + "\n".join(m for _, m in self.errors))
+
+                now = time.perf_counter()
+                for i, rig in enumerate(self.rigs):
+                    if rig.dead or not rig.ready or rig.shard is not None:
+                        continue
+                    while pending and pending[0] in finished:
+                        pending.popleft()
+                    if pending:
+                        self._give(rig, pending.popleft(), shards)
+                        continue
+                    # Nothing left to hand out: take over the oldest straggler.
+                    stragglers = [r for r in self.rigs if r.shard is not None and r is not rig
+                                  and r.shard not in finished and now - r.started > self.shard_timeout]
+                    if stragglers:
+                        slow = min(stragglers, key=lambda r: r.started)
+                        self._give(rig, slow.shard, shards)
+
+                try:
+                    kind, i, shard_id, payload = outbox.get(timeout=0.05)
+                except queue.Empty:
+                    for i, rig in enumerate(self.rigs):
+                        if not rig.dead and rig.process is not None and not rig.process.is_alive():
+                            self._crashed(i, names, outbox, pending,
+                                          "{} exited with code {}".format(rig.spec.name, rig.process.exitcode))
+                    continue
+
+                rig = self.rigs[i]
+                if kind == "ready":
+                    rig.ready = True
+                elif kind == "error":
+                    self._crashed(i, names, outbox, pending, payload)
+                elif kind == "done":
+                    rig.busy_time += time.perf_counter() - rig.started
+                    rig.shard = None
+                    if shard_id not in finished:
+                        finished.add(shard_id)
+                        rig.done += 1
+                        self._merge(i, names, payload)
+        finally:
+            for rig in self.rigs:
+                if rig.process is not None and rig.process.is_alive():
+                    rig.inbox.put(None)
+            for rig in self.rigs:
+                if rig.process is not None:
+                    rig.process.join(timeout=5)
+                    if rig.process.is_alive():
+                        rig.process.terminate()
+        self.store.flush()
+        return self.store
+
+    def _merge(self, rig, names, rows):
+        if not rows:
+            return
+        cols = list(zip(*rows))
+        columns = dict((n, cols[k]) for k, n in enumerate(names))
+        columns["success"] = cols[len(names)]
+        columns["rig"] = [rig] * len(rows)
+        self.store.extend(response=cols[len(names) + 1], **columns)
+
+    def summary(self):
+        """Shards completed, restarts and busy time per rig."""
+        return dict((r.spec.name, {"shards": r.done, "restarts": r.restarts,
+                                   "busy": r.busy_time, "dead": r.dead})
+                    for r in self.rigs)
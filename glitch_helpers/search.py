@@ -0,0 +1,217 @@
+"""Coarse-to-fine search over glitch parameters.
+
+The attack loops in the clock glitch lab walk every width x offset x
+ext_offset point. Most of that space is dead, so :class:`AdaptiveSearch`
+starts on a coarse grid and then only refines around the points that
+produced successes or resets, halving the step on every round until it is
+back at the step given in each :class:`Range`.
+
+Example::
+
+    def attempt(params):
+        scope.glitch.width = params["width"]
+        scope.glitch.offset = params["offset"]
+        scope.arm()
+        reset_target(scope)
+        scope.capture()
+        response = target.read(timeout=10)
+        if '1234' in response:
+            return "success"
+        elif len(response.split("hello\\nA")[-1]) > 1:
+            return "reset"
+        return "normal"
+
+    search = AdaptiveSearch({"width": Range(-20, 0, 1),
+                             "offset": Range(-49, -35, 1)}, attempt)
+    for params, group in search.run():
+        gr.add(group, (params["width"], params["offset"]))
+"""
+from collections import namedtuple, OrderedDict
+import itertools
+import math
+
+import numpy as np
+
+Range = namedtuple('Range', ['min', 'max', 'step'])
+
+GROUPS = ("success", "reset", "normal")
+
+FINE_AXES = ("ext_offset",)
+"""Parameters that are never coarsened unless ``coarse_step`` says so.
+
+A glitch usually only lands at one or two ext_offset cycles, which a
+coarse grid would step right over. Unlike width and offset, changing
+ext_offset doesn't reconfigure the FPGA, so walking it in full is cheap.
+"""
+
+
+def range_values(r):
+    """Return the values covered by a :class:`Range` as a numpy array.
+
+    Like ``range()``, ``max`` is exclusive. Float steps (as used in the VCC
+    glitch lab) are supported.
+    """
+    if r.step <= 0:
+        raise ValueError("Range step must be positive, got {}".format(r.step))
+    n = int(math.ceil((r.max - r.min) / r.step - 1e-9))
+    return r.min + np.arange(max(n, 1)) * r.step
+
+
+def axis_values(v):
+    """Values of one parameter axis as a list: a :class:`Range` or any iterable."""
+    if isinstance(v, Range):
+        return range_values(v).tolist()
+    return list(v)
+
+
+class AdaptiveSearch(object):
+    """Successive halving search over a grid of glitch parameters.
+
+    Args:
+        ranges (dict): Maps a parameter name to a :class:`Range` (or any
+            iterable of values). Order is kept, so pass an OrderedDict on
+            older Pythons.
+        classify (callable): Called as ``classify(params)`` with a dict of
+            parameter values. Must return one of ``groups``.
+        samples (int): Number of attempts at each point.
+        coarse_step (int or dict): Spacing of the first grid, in multiples
+            of each range's step. Rounded down to a power of two. An int
+            applies to every parameter except those in :data:`FINE_AXES`;
+            a dict gives the spacing per parameter name, 1 if missing.
+        keep (float): Fraction of the promising points to refine around on
+            each round.
+        reset_weight (float): How much a reset counts towards a point's
+            score compared to a success. Resets usually sit right next to
+            successes, so they are worth exploring too.
+        max_attempts (int): Optional hard cap on the total number of
+            attempts.
+        groups (tuple): Outcome names. The first is treated as success and
+            the second as reset.
+    """
+    def __init__(self, ranges, classify, samples=1, coarse_step=4, keep=0.25,
+                 reset_weight=0.5, max_attempts=None, groups=GROUPS):
+        self.names = list(ranges.keys())
+        self.values = []
+        for name in self.names:
+            r = ranges[name]
+            if isinstance(r, Range):
+                self.values.append(range_values(r))
+            else:
+                self.values.append(np.asarray(list(r)))
+        self.classify = classify
+        self.samples = samples
+        self.keep = keep
+        self.reset_weight = reset_weight
+        self.max_attempts = max_attempts
+        self.groups = tuple(groups)
+
+        if isinstance(coarse_step, dict):
+            steps = [coarse_step.get(name, 1) for name in self.names]
+        else:
+            steps = [1 if name in FINE_AXES else coarse_step for name in self.names]
+        self.start_strides = [max(1, min(_floor_pow2(step), _floor_pow2(len(v) - 1)))
+                              for step, v in zip(steps, self.values)]
+
+        self.counts = OrderedDict()
+        self.results = []
+        self.attempts = 0
+
+    @property
+    def grid_size(self):
+        """Number of points in the full (fine) grid."""
+        return int(np.prod([len(v) for v in self.values]))
+
+    def params(self, point):
+        """Convert a grid index tuple to a dict of parameter values."""
+        return OrderedDict((name, self.values[d][i].item())
+                           for d, (name, i) in enumerate(zip(self.names, point)))
+
+    def score(self, point):
+        """Success rate plus weighted reset rate of an evaluated point."""
+        c = self.counts[point]
+        total = c.sum()
+        if total == 0:
+            return 0.0
+        return (c[0] + self.reset_weight * c[1]) / total
+
+    def _budget_left(self):
+        return self.max_attempts is None or self.attempts < self.max_attempts
+
+    def evaluate(self, point):
+        """Run ``samples`` attempts at ``point`` and record the outcomes."""
+        c = self.counts.setdefault(point, np.zeros(len(self.groups), dtype=np.int64))
+        params = self.params(point)
+        for _ in range(self.samples):
+            if not self._budget_left():
+                break
+            group = self.classify(params)
+            c[self.groups.index(group)] += 1
+            self.results.append((params, group))
+            self.attempts += 1
+
+    def coarse_points(self):
+        """Grid index tuples of the first, coarse grid."""
+        axes = []
+        for v, s in zip(self.values, self.start_strides):
+            idx = list(range(0, len(v), s))
+            # Always include the far edge so nothing falls off the end.
+            if idx[-1] != len(v) - 1:
+                idx.append(len(v) - 1)
+            axes.append(idx)
+        return itertools.product(*axes)
+
+    def neighbours(self, point, strides):
+        """Unvisited points within one stride of ``point``."""
+        axes = []
+        for i, s, v in zip(point, strides, self.values):
+            axes.append(sorted(set(min(max(i + o, 0), len(v) - 1) for o in (-s, 0, s))))
+        for p in itertools.product(*axes):
+            if p not in self.counts:
+                yield p
+
+    def promising(self):
+        """Evaluated points worth refining around, best first."""
+        scored = [(self.score(p), p) for p in self.counts]
+        scored = [sp for sp in scored if sp[0] > 0]
+        scored.sort(key=lambda sp: sp[0], reverse=True)
+        n = max(1, int(math.ceil(self.keep * len(scored)))) if scored else 0
+        return [p for _, p in scored[:n]]
+
+    def run(self):
+        """Run the search.
+
+        Returns:
+            list of ``(params, group)`` tuples, one per attempt, in the
+            order they were made.
+        """
+        for point in self.coarse_points():
+            if not self._budget_left():
+                return self.results
+            self.evaluate(point)
+
+        strides = list(self.start_strides)
+        refined = False
+        while any(s > 1 for s in strides) or not refined:
+            strides = [max(1, s // 2) for s in strides]
+            refined = all(s == 1 for s in strides)
+            for point in self.promising():
+                for p in self.neighbours(point, strides):
+                    if not self._budget_left():
+                        return self.results
+                    self.evaluate(p)
+        return self.results
+
+    def best(self, n=10):
+        """Return the ``n`` best points as ``(params, success_rate, reset_rate)``."""
+        rows = []
+        for p, c in self.counts.items():
+            total = max(int(c.sum()), 1)
+            rows.append((self.params(p), float(c[0]) / total, float(c[1]) / total))
+        rows.sort(key=lambda r: (r[1], r[2]), reverse=True)
+        return rows[:n]
+
+
+def _floor_pow2(n):
+    if n < 1:
+        return 1
+    return 2 ** int(math.log2(n))
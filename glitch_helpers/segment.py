@@ -0,0 +1,122 @@
+"""Power trace guided ext_offset targeting.
+
+Attack 2 sweeps 100 ext_offsets per width/offset cell, even though the
+instructions worth glitching (the ``for(cnt = 0; cnt < 5; cnt++)``
+comparison and the ``if (!passok)`` branch in ``glitch3()``) only sit in a
+few clock cycles. The reference traces Attack 2 already captures show
+where those are.
+
+:func:`rank_ext_offsets` cuts a batch of unglitched traces into clock
+cycles, finds cycles where the average power signature changes sharply
+(instruction boundaries) and the end of the periodic part of the trace
+(the last loop iteration), and returns ext_offsets ranked by how likely
+they are to hit a branch.
+
+Example::
+
+    refs = np.array([capture_reference() for _ in range(50)])
+    candidates = rank_ext_offsets(refs, samples_per_cycle=4, top=15)
+    for ext_offset in candidates:
+        scope.glitch.ext_offset = ext_offset
+        ...
+
+``samples_per_cycle`` is 4 with the usual ``scope.clock.adc_src =
+"clkgen_x4"``. ``start`` is the sample at which ext_offset 0 begins,
+0 when the ADC and the glitch module share the trigger.
+"""
+import numpy as np
+
+
+def cycle_matrix(traces, samples_per_cycle, start=0):
+    """Reshape ``(K, samples)`` traces into ``(K, cycles, samples_per_cycle)``."""
+    traces = np.atleast_2d(np.asarray(traces, dtype=float))[:, start:]
+    cycles = traces.shape[1] // samples_per_cycle
+    return traces[:, :cycles * samples_per_cycle].reshape(len(traces), cycles, samples_per_cycle)
+
+
+def novelty(cycles):
+    """How much each cycle's mean power signature differs from the previous one.
+
+    Scaled by the trace-to-trace noise so it is comparable between boards.
+
+    Args:
+        cycles: Output of :func:`cycle_matrix`.
+
+    Returns:
+        Array of one score per cycle (the first is 0).
+    """
+    mean = cycles.mean(axis=0)
+    noise = cycles.std(axis=0).mean() + 1e-12
+    d = np.sqrt(np.square(np.diff(mean, axis=0)).sum(axis=1)) / noise
+    return np.concatenate([[0.0], d])
+
+
+def loop_period(cycles, max_period=32):
+    """Most likely loop body length in cycles, or 0 if nothing repeats.
+
+    Picks the lag at which the mean per-cycle signature best matches
+    itself, relative to how different neighbouring cycles are.
+    """
+    mean = cycles.mean(axis=0)
+    n = len(mean)
+    base = np.sqrt(np.square(np.diff(mean, axis=0)).sum(axis=1)).mean() + 1e-12
+    best, best_score = 0, 0.5
+    for p in range(2, min(max_period, n // 3) + 1):
+        d = np.sqrt(np.square(mean[p:] - mean[:-p]).sum(axis=1))
+        # Only the best matching stretch needs to repeat, not the whole trace.
+        k = max(1, len(d) // 4)
+        score = np.partition(d, k - 1)[:k].mean() / base
+        if score < best_score:
+            best, best_score = p, score
+    return best
+
+
+def loop_exits(cycles, period, min_repeats=2):
+    """Cycles where a periodic stretch of at least ``min_repeats`` periods ends."""
+    if period <= 0:
+        return []
+    mean = cycles.mean(axis=0)
+    noise = cycles.std(axis=0).mean() + 1e-12
+    d = np.sqrt(np.square(mean[period:] - mean[:-period]).sum(axis=1)) / noise
+    periodic = np.concatenate([np.zeros(period, dtype=bool), d < np.median(d)])
+    exits = []
+    run = 0
+    for c, p in enumerate(periodic):
+        if p:
+            run += 1
+        else:
+            if run >= min_repeats * period:
+                exits.append(c)
+            run = 0
+    if run >= min_repeats * period:
+        exits.append(len(periodic))
+    return exits
+
+
+def rank_ext_offsets(traces, samples_per_cycle=4, top=20, start=0, max_period=32,
+                     exit_span=3, exit_weight=2.0):
+    """Rank ext_offsets by how likely they are to land on a branch.
+
+    Args:
+        traces: ``(K, samples)`` unglitched reference traces.
+        samples_per_cycle (int): ADC samples per target clock cycle.
+        top (int): Number of candidates to return.
+        start (int): Sample index of ext_offset 0.
+        max_period (int): Longest loop body searched for, in cycles.
+        exit_span (int): Cycles either side of a loop exit that get a boost.
+        exit_weight (float): Size of that boost, in units of the largest
+            novelty score.
+
+    Returns:
+        List of ext_offsets, best first.
+    """
+    cycles = cycle_matrix(traces, samples_per_cycle, start)
+    score = novelty(cycles)
+    if score.max() > 0:
+        score = score / score.max()
+    period = loop_period(cycles, max_period)
+    for c in loop_exits(cycles, period):
+        lo, hi = max(0, c - exit_span), min(len(score), c + exit_span + 1)
+        score[lo:hi] += exit_weight * (1 - np.abs(np.arange(lo, hi) - c) / float(exit_span + 1))
+    order = np.argsort(-score, kind="stable")
+    return [int(c) for c in order[:top]]
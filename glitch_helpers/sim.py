@@ -0,0 +1,411 @@
+"""Software stand-ins for the ChipWhisperer scope and target.
+
+These implement just enough of ``scope.glitch``, ``scope.adc``,
+``scope.io`` and ``target`` for the helpers in this package to be run
+without hardware attached. The simulated target emulates the glitch-simple
+and bootloader-glitch firmware used by the labs (see :class:`SimTarget`).
+Whether a glitch lands, resets the target or does nothing is decided by
+``fault_rate``: either a plain function of ``scope.glitch`` or a
+:class:`FaultMap` of success and reset probabilities over (width, offset,
+ext_offset). As on the hardware, glitches only take effect with
+``scope.io.hs2 = "glitch"`` or one of the ``glitch_lp``/``glitch_hp``
+MOSFETs enabled.
+
+Example::
+
+    scope, target = sim.connect(fault_rate=lambda g: 0.1 if g.width < -10 else 0, hs2="glitch")
+    runner = CampaignRunner(scope, target, reset=sim.reset_target)
+
+    # Lab-like behaviour, including resets and hung targets. hs2 is left
+    # at "clkgen" here, so glitches only land once the lab code sets
+    # scope.io.hs2 = "glitch" (as setup_glitch and attack2 do):
+    scope, target = sim.connect(fault_rate=sim.default_fault_map("glitch3"))
+"""
+from collections import namedtuple
+import random
+import time
+
+import numpy as np
+
+
+Island = namedtuple("Island", ["center", "spread", "success", "reset"])
+"""A region of the glitch parameter space where faults happen.
+
+``center`` and ``spread`` are ``(width, offset, ext_offset)`` tuples; a
+``None`` ext_offset centre means ext_offset doesn't matter. ``success``
+and ``reset`` are the peak probabilities at the centre, falling off as a
+Gaussian with standard deviation ``spread`` along each axis.
+"""
+
+
+class FaultMap(object):
+    """Probabilistic fault model over (width, offset, ext_offset).
+
+    Pass as ``fault_rate`` to :func:`connect`. Called with ``scope.glitch``
+    it returns ``(p_success, p_reset)``. Results are cached per setting, so
+    sweeping a grid costs one dict lookup per attempt.
+
+    Args:
+        islands (list): :class:`Island` regions. Their probabilities
+            combine as independent chances of a fault.
+        reset (float): Reset probability everywhere else.
+    """
+    def __init__(self, islands, reset=0.0):
+        self.islands = list(islands)
+        self.background_reset = reset
+        self._cache = {}
+
+    def probabilities(self, width, offset, ext_offset):
+        miss_success = 1.0
+        miss_reset = 1.0 - self.background_reset
+        point = (width, offset, ext_offset)
+        for island in self.islands:
+            z = 0.0
+            for x, c, s in zip(point, island.center, island.spread):
+                if c is not None:
+                    z += ((x - c) / float(s)) ** 2
+            shape = np.exp(-0.5 * z)
+            miss_success *= 1.0 - island.success * shape
+            miss_reset *= 1.0 - island.reset * shape
+        success, reset = 1.0 - miss_success, 1.0 - miss_reset
+        if success + reset > 1.0:
+            success, reset = success / (success + reset), reset / (success + reset)
+        return float(success), float(reset)
+
+    def __call__(self, glitch):
+        key = (glitch.width, glitch.offset, glitch.ext_offset)
+        p = self._cache.get(key)
+        if p is None:
+            p = self._cache[key] = self.probabilities(*key)
+        return p
+
+    def grid(self, widths, offsets, ext_offset=0):
+        """``(success, reset)`` arrays of shape ``(len(widths), len(offsets))``."""
+        out = np.array([[self.probabilities(w, o, ext_offset) for o in offsets] for w in widths])
+        return out[..., 0], out[..., 1]
+
+
+def default_fault_map(firmware):
+    """A :class:`FaultMap` resembling a CW-Lite ARM target running ``firmware``.
+
+    Successes sit in a small island of the width/offset plane (and, for
+    the triggered firmware, at a few ext_offsets), surrounded by a wider
+    region of resets towards the larger, more violent glitches.
+    """
+    if firmware == "glitch1":
+        return FaultMap([Island((-10, -41, None), (1.5, 2.5, None), 0.6, 0.0),
+                         Island((-5, -41, None), (3.0, 6.0, None), 0.0, 0.5)])
+    if firmware == "glitch3":
+        return FaultMap([Island((-11, -44, 7), (1.0, 2.0, 0.6), 0.35, 0.0),
+                         Island((-6, -44, 7), (3.0, 6.0, 3.0), 0.0, 0.4)], reset=0.002)
+    if firmware == "glitch_inf":
+        return FaultMap([Island((-10, -41, None), (2.0, 3.0, None), 0.05, 0.0),
+                         Island((-4, -41, None), (3.0, 6.0, None), 0.0, 0.02)])
+    if firmware == "bootloader":
+        return FaultMap([Island((-9, -40, 980), (1.5, 3.0, 0.7), 0.25, 0.0),
+                         Island((-4, -40, 980), (3.0, 6.0, 2.0), 0.0, 0.3)], reset=0.002)
+    raise ValueError("Unknown firmware {!r}, expected one of {}".format(firmware, FIRMWARES))
+
+
+class SimGlitch(object):
+    """Settings normally found under ``scope.glitch``."""
+    def __init__(self):
+        self.clk_src = "target"
+        self.output = "clock_xor"
+        self.trigger_src = "manual"
+        self.width = 10.0
+        self.width_fine = 0
+        self.offset = 10.0
+        self.offset_fine = 0
+        self.ext_offset = 0
+        self.repeat = 1
+
+    def __repr__(self):
+        return "\n".join("{:<12} = {}".format(k, v) for k, v in sorted(vars(self).items()))
+
+
+class SimADC(object):
+    """Settings normally found under ``scope.adc``."""
+    def __init__(self):
+        self.timeout = 2
+        self.samples = 5000
+        self.state = False
+        self.trig_count = 0
+
+
+class SimIO(object):
+    """Settings normally found under ``scope.io``.
+
+    Driving ``nrst`` (ARM) or ``pdic`` (XMEGA) low resets the connected
+    target, so ``reset_target`` from Setup_Generic works unchanged.
+    """
+    def __init__(self, scope):
+        self._scope = scope
+        self._nrst = "high_z"
+        self._pdic = "high_z"
+        self.hs2 = "clkgen"
+        self.glitch_hp = False
+        self.glitch_lp = False
+
+    @property
+    def nrst(self):
+        return self._nrst
+
+    @nrst.setter
+    def nrst(self, value):
+        if value == "low" and self._nrst != "low" and self._scope.target is not None:
+            self._scope.target.reset()
+        self._nrst = value
+
+    @property
+    def pdic(self):
+        return self._pdic
+
+    @pdic.setter
+    def pdic(self, value):
+        if value == "low" and self._pdic != "low" and self._scope.target is not None:
+            self._scope.target.reset()
+        self._pdic = value
+
+
+class SimScope(object):
+    """Stand-in for a ChipWhisperer-Lite scope.
+
+    Traces are a fixed power template plus noise sliced from a bank
+    generated once, so a capture costs about as much as one array add.
+    A glitch adds a bump at ``ext_offset``; after a reset or a hang the
+    trace drops to a flat idle level.
+
+    Args:
+        seed (int): Seed for the noise and fault decisions.
+        arm_latency (float): Seconds :meth:`arm` takes.
+        capture_latency (float): Seconds :meth:`capture` takes.
+        trig_count (int): Trigger high time reported on each capture.
+        trig_jitter (float): Standard deviation of the trigger count, in
+            cycles.
+    """
+    def __init__(self, seed=0, arm_latency=0.0, capture_latency=0.0, trig_count=1000, trig_jitter=0.0):
+        self.glitch = SimGlitch()
+        self.adc = SimADC()
+        self.io = SimIO(self)
+        self.rng = np.random.RandomState(seed)
+        self.arm_latency = arm_latency
+        self.capture_latency = capture_latency
+        self.base_trig_count = trig_count
+        self.trig_jitter = trig_jitter
+        self.target = None
+        self._armed = False
+        self._trace = np.zeros(self.adc.samples)
+        self._template = None
+        self._noise = None
+
+    def arm(self):
+        _sleep(self.arm_latency)
+        self._armed = True
+
+    def capture(self):
+        """Run the pending operation on the target. Returns True on timeout."""
+        _sleep(self.capture_latency)
+        armed, self._armed = self._armed, False
+        target = self.target
+        if target is not None and target._hung:
+            # The trigger never goes low again until the target is reset.
+            self.adc.state = True
+            return True
+        if not armed or target is None or not target._pending:
+            self.adc.state = False
+            return True
+        outcome = target._execute(self)
+        trig_count = self.base_trig_count
+        if self.trig_jitter:
+            trig_count += int(round(self.rng.normal(0, self.trig_jitter)))
+        self.adc.trig_count = trig_count
+        self._trace = self._make_trace(outcome)
+        if target._hung:
+            self.adc.state = True
+            return True
+        self.adc.state = False
+        return False
+
+    def get_last_trace(self):
+        return self._trace
+
+    def _make_trace(self, outcome):
+        """Synthetic trace for an attempt with ``outcome`` (see :meth:`SimTarget._outcome`).
+
+        ``True`` is accepted for a glitch that landed.
+        """
+        n = self.adc.samples
+        if self._template is None or len(self._template) != n:
+            t = np.arange(n)
+            self._template = 0.1 * np.sin(2 * np.pi * t / 4.0) + 0.05 * np.sin(2 * np.pi * t / 97.0)
+            self._noise = self.rng.normal(0, 0.005, 8 * n)
+        k = self.rng.randint(0, len(self._noise) - n)
+        trace = self._template + self._noise[k:k + n]
+        if outcome:
+            start = min(int(self.glitch.ext_offset) * 4, n - 1)
+            if outcome == "reset":
+                trace[start:] = self._noise[k + start:k + n] - 0.1
+            else:
+                trace[start:start + 200] += 0.2
+        return trace
+
+    def dis(self):
+        pass
+
+
+FIRMWARES = ("glitch1", "glitch3", "glitch_inf", "bootloader")
+"""Firmware behaviours :class:`SimTarget` can emulate."""
+
+BOOTLOADER_COMMAND = "p516261276720736265747267206762206f686c207a76797821\n"
+
+
+class SimTarget(object):
+    """Stand-in for the serial target.
+
+    ``firmware`` selects what the target runs:
+
+    * ``"glitch1"``: glitch-simple built with ``FUNC_SEL=GLITCH1``. Each reset
+      prints ``"hello\nA"`` and triggers; a glitch adds ``"1234"``, a reset
+      fault adds garbage.
+    * ``"glitch3"``: ``FUNC_SEL=GLITCH3``, the password check. Each write
+      triggers and answers ``"Denied\n"`` or, glitched, ``"Welcome\n"``.
+      A reset fault hangs the target until it is reset: nothing is
+      answered and ``scope.adc.state`` stays True.
+    * ``"glitch_inf"``: ``FUNC_SEL=GLITCH_INF``. Prints a ``"40000 200 200"``
+      counter line whenever the line is polled; a glitch changes the count
+      and a reset fault prints the ``"hello"`` banner.
+    * ``"bootloader"``: the bootloader-glitch firmware. A decrypt command
+      triggers and answers ``"r0\n"``; a glitch leaks memory after it and a
+      reset fault hangs the target as for ``"glitch3"``.
+
+    Args:
+        fault_rate (callable): Called with ``scope.glitch`` for each attempt.
+            Returns the probability that the glitch lands, or a
+            ``(p_success, p_reset)`` tuple, e.g. a :class:`FaultMap`.
+        firmware (str): One of :data:`FIRMWARES`.
+        read_latency (float): Seconds each :meth:`read` takes.
+        reset_latency (float): Seconds a reset takes.
+        seed (int): Seed for the fault decisions.
+    """
+    def __init__(self, fault_rate=None, firmware="glitch3", read_latency=0.0, reset_latency=0.0, seed=0):
+        if firmware not in FIRMWARES:
+            raise ValueError("Unknown firmware {!r}, expected one of {}".format(firmware, FIRMWARES))
+        self.fault_rate = fault_rate or (lambda glitch: 0.0)
+        self.firmware = firmware
+        self.read_latency = read_latency
+        self.reset_latency = reset_latency
+        self.rng = random.Random(seed)
+        self.scope = None
+        self._rx = ""
+        self._pending = None
+        self._hung = False
+
+    def flush(self):
+        self._rx = ""
+
+    def write(self, data):
+        if self.firmware in ("glitch3", "bootloader") and not self._hung:
+            self._pending = data
+
+    def in_waiting(self):
+        if not self._rx and self.firmware == "glitch_inf":
+            self._rx = self._counter_line()
+        return len(self._rx)
+
+    def read(self, num=0, timeout=250):
+        _sleep(self.read_latency)
+        if num <= 0:
+            num = len(self._rx)
+        out, self._rx = self._rx[:num], self._rx[num:]
+        return out
+
+    def reset(self):
+        _sleep(self.reset_latency)
+        self._rx = "hello\n"
+        self._pending = "boot" if self.firmware == "glitch1" else None
+        self._hung = False
+
+    def _outcome(self, scope):
+        """``"success"``, ``"reset"`` or None for an attempt with ``scope.glitch``."""
+        io = scope.io
+        if io.hs2 != "glitch" and not io.glitch_lp and not io.glitch_hp:
+            return None
+        p = self.fault_rate(scope.glitch)
+        success, reset = p if isinstance(p, tuple) else (p, 0.0)
+        u = self.rng.random()
+        if u < success:
+            return "success"
+        if u < success + reset:
+            return "reset"
+        return None
+
+    def _counter_line(self):
+        scope = self.scope
+        if scope is not None and scope.glitch.trigger_src == "ext_continuous":
+            outcome = self._outcome(scope)
+            if outcome == "success":
+                return "{} 200 200\n".format(40000 - 1 - self.rng.randrange(200))
+            if outcome == "reset":
+                return "hello\n"
+        return "40000 200 200\n"
+
+    def _execute(self, scope):
+        """Run the triggered part of the firmware and return its outcome."""
+        pending, self._pending = self._pending, None
+        if self.firmware == "bootloader" and pending != BOOTLOADER_COMMAND:
+            self._rx += "r1\n"
+            return None
+        outcome = self._outcome(scope)
+        if outcome == "reset":
+            if self.firmware == "glitch1":
+                self._rx += "A" + "".join(chr(self.rng.randrange(256)) for _ in range(4))
+            else:
+                self._hung = True
+            return outcome
+        glitched = outcome == "success"
+        if self.firmware == "glitch1":
+            self._rx += "A1234" if glitched else "A"
+        elif self.firmware == "glitch3":
+            self._rx += "Welcome\n" if glitched else "Denied\n"
+        elif self.firmware == "bootloader":
+            self._rx += "r0"
+            if glitched:
+                self._rx += "".join(chr(self.rng.randrange(256)) for _ in range(64))
+            self._rx += "\n"
+        return outcome
+
+    def dis(self):
+        pass
+
+
+def connect(fault_rate=None, firmware="glitch3", seed=0, trig_jitter=0.0, hs2=None, **latencies):
+    """Return a connected ``(scope, target)`` pair.
+
+    ``hs2`` sets ``scope.io.hs2`` if given; pass ``"glitch"`` for code
+    that doesn't route the glitch itself. ``latencies`` may contain
+    ``arm_latency``, ``capture_latency``, ``read_latency`` and
+    ``reset_latency``.
+    """
+    scope = SimScope(seed=seed, arm_latency=latencies.get("arm_latency", 0.0),
+                     capture_latency=latencies.get("capture_latency", 0.0),
+                     trig_jitter=trig_jitter)
+    if hs2 is not None:
+        scope.io.hs2 = hs2
+    target = SimTarget(fault_rate=fault_rate, firmware=firmware, seed=seed,
+                       read_latency=latencies.get("read_latency", 0.0),
+                       reset_latency=latencies.get("reset_latency", 0.0))
+    scope.target = target
+    target.scope = scope
+    return scope, target
+
+
+def reset_target(scope):
+    """Same as ``reset_target`` from ``Setup_Generic.ipynb``, without the sleeps."""
+    scope.io.nrst = "low"
+    scope.io.nrst = "high_z"
+
+
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
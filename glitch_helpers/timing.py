@@ -0,0 +1,158 @@
+"""Trigger timing profiles and ext_offset windows.
+
+Fault_3 measures ``scope.adc.trig_count`` once and then hard codes windows
+like ``range(response_time - 22, response_time - 19)`` per platform.
+:class:`TriggerProfiler` captures many unglitched runs instead, keeps the
+distribution of trigger counts (and host side response times), and turns
+it into an ext_offset window that is widened by the observed jitter.
+:class:`JitterTracker` follows the trigger count during a campaign so a
+drift away from the profile can be noticed and the window recomputed.
+
+Example (Fault_3)::
+
+    def run_once():
+        scope.arm()
+        target.write("p516261276720736265747267206762206f686c207a76797821\\n")
+        scope.capture()
+        return target.read(timeout=50)
+
+    scope.io.hs2 = "clkgen"            # profile without glitches
+    prof = TriggerProfiler(scope, run_once)
+    prof.capture(200)
+    scope.io.hs2 = "glitch"
+    ext_range = prof.window(PLATFORM)
+"""
+import time
+
+import numpy as np
+
+PLATFORM_WINDOWS = {
+    "CWLITEARM": (22, 19),
+    "CW308_STM32F3": (22, 19),
+    "CWLITEXMEGA": (15, 0),
+    "CW303": (15, 0),
+}
+"""``(lead, lag)`` used by Fault_3: ``range(trig_count - lead, trig_count - lag)``."""
+
+DEFAULT_WINDOW = (40, 0)
+
+
+class TriggerProfiler(object):
+    """Builds a trigger count distribution from unglitched runs.
+
+    Args:
+        scope: ChipWhisperer scope.
+        run_once (callable): Runs one unglitched attempt (arm, send,
+            capture, read). Its return value is ignored.
+    """
+    def __init__(self, scope, run_once):
+        self.scope = scope
+        self.run_once = run_once
+        self.trig_counts = np.zeros(0, dtype=np.int64)
+        self.response_times = np.zeros(0)
+
+    def capture(self, n=100):
+        """Run ``n`` attempts and add their trigger counts to the profile."""
+        counts = np.zeros(n, dtype=np.int64)
+        times = np.zeros(n)
+        for i in range(n):
+            start = time.perf_counter()
+            self.run_once()
+            times[i] = time.perf_counter() - start
+            counts[i] = self.scope.adc.trig_count
+        self.trig_counts = np.concatenate([self.trig_counts, counts])
+        self.response_times = np.concatenate([self.response_times, times])
+        return counts
+
+    def stats(self):
+        """Summary of the trigger count distribution."""
+        c = self.trig_counts
+        if len(c) == 0:
+            raise ValueError("No captures yet, call capture() first")
+        return {
+            "n": len(c),
+            "median": float(np.median(c)),
+            "min": int(c.min()),
+            "max": int(c.max()),
+            "std": float(c.std()),
+            "p1": float(np.percentile(c, 1)),
+            "p99": float(np.percentile(c, 99)),
+            "response_ms": float(np.median(self.response_times) * 1e3),
+        }
+
+    def histogram(self):
+        """``(values, counts)`` of the distinct trigger counts seen."""
+        return np.unique(self.trig_counts, return_counts=True)
+
+    def window(self, platform=None, lead=None, lag=None, coverage=98.0):
+        """ext_offset candidates covering the observed jitter.
+
+        The per-platform ``(lead, lag)`` from :data:`PLATFORM_WINDOWS` (or
+        the explicit arguments) is applied to both ends of the central
+        ``coverage`` percent of trigger counts, instead of to one
+        measurement.
+
+        Returns:
+            A ``range`` of ext_offset values.
+        """
+        default_lead, default_lag = PLATFORM_WINDOWS.get(platform, DEFAULT_WINDOW)
+        lead = default_lead if lead is None else lead
+        lag = default_lag if lag is None else lag
+        tail = (100.0 - coverage) / 2
+        lo = int(np.floor(np.percentile(self.trig_counts, tail)))
+        hi = int(np.ceil(np.percentile(self.trig_counts, 100 - tail)))
+        return range(max(0, lo - lead), max(1, hi - lag))
+
+    def ranked_offsets(self, platform=None, lead=None, lag=None):
+        """ext_offsets in :meth:`window`, most likely first.
+
+        Each offset is weighted by how often the trigger count it assumes
+        was seen, so the commonest timing is tried first.
+        """
+        w = self.window(platform, lead, lag)
+        default_lead, default_lag = PLATFORM_WINDOWS.get(platform, DEFAULT_WINDOW)
+        lead = default_lead if lead is None else lead
+        lag = default_lag if lag is None else lag
+        values, counts = self.histogram()
+        offsets = np.arange(w.start, w.stop)
+        score = np.zeros(len(offsets))
+        for v, c in zip(values, counts):
+            # Offsets that this trigger count's window covers.
+            score += c * ((offsets >= v - lead) & (offsets < v - lag))
+        return offsets[np.argsort(-score, kind="stable")].tolist()
+
+
+class JitterTracker(object):
+    """Exponentially weighted trigger count mean/variance during a campaign.
+
+    Args:
+        profile (TriggerProfiler): Baseline the drift is measured against.
+        alpha (float): Weight of each new sample.
+        tolerance (float): Drift, in baseline standard deviations (at least
+            one cycle), after which :meth:`drifted` is True.
+    """
+    def __init__(self, profile, alpha=0.05, tolerance=3.0):
+        s = profile.stats()
+        self.base_mean = s["median"]
+        self.base_std = max(s["std"], 1.0)
+        self.mean = s["median"]
+        self.var = s["std"] ** 2
+        self.alpha = alpha
+        self.tolerance = tolerance
+        self.n = 0
+
+    def update(self, trig_count):
+        """Add one trigger count, e.g. ``scope.adc.trig_count`` after a capture."""
+        d = trig_count - self.mean
+        self.mean += self.alpha * d
+        self.var = (1 - self.alpha) * (self.var + self.alpha * d * d)
+        self.n += 1
+
+    @property
+    def jitter(self):
+        """Current trigger count standard deviation estimate."""
+        return float(np.sqrt(self.var))
+
+    def drifted(self):
+        """True if the mean trigger count moved away from the baseline."""
+        return abs(self.mean - self.base_mean) > self.tolerance * self.base_std
@@ -0,0 +1,176 @@
+"""Event driven, line oriented reader for the target UART.
+
+``do_glitch()`` in the VCC glitch lab builds lines with
+``time.sleep(0.1); target.in_waiting(); target.read()``, so every chunk can
+sit in the buffer for up to 100 ms before it is looked at.
+:class:`LineReader` moves reading onto a background thread that polls the
+serial port at a fine interval and hands complete lines to the notebook
+through a queue, so the caller wakes up as soon as a line is in.
+
+Example (replacing ``do_glitch()``)::
+
+    reader = LineReader(target)
+    reader.start()
+    ...
+    successes, crashes = do_glitch(reader, scope, glitch_on, glitch_off)
+    ...
+    reader.stop()
+"""
+import queue
+import threading
+import time
+
+GLITCH_INF_COUNT = 40000
+"""Counter value the GLITCH_INF firmware prints when no glitch hit."""
+
+
+def parse_counter(line):
+    """Return the leading counter of a ``"40000 ..."`` line, or None."""
+    head = line.split(" ", 1)[0].strip()
+    try:
+        return int(head)
+    except ValueError:
+        return None
+
+
+class LineReader(object):
+    """Reads ``target`` on a background thread and queues complete lines.
+
+    The target must only be read through this object while it is running.
+    Writing to it from the notebook is fine.
+
+    Args:
+        target: ChipWhisperer target.
+        poll (float): Seconds between ``in_waiting()`` checks when the line
+            is quiet. Bytes are picked up as soon as the next check sees
+            them.
+        maxlines (int): Lines kept before the oldest are dropped.
+    """
+    def __init__(self, target, poll=0.001, maxlines=10000):
+        self.target = target
+        self.poll = poll
+        self.lines = queue.Queue(maxsize=maxlines)
+        self.last_rx = time.perf_counter()
+        self._partial = ""
+        self._skip_partial = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="uart-reader")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _put(self, line):
+        try:
+            self.lines.put_nowait(line)
+        except queue.Full:
+            self.lines.get_nowait()
+            self.lines.put_nowait(line)
+
+    def _run(self):
+        while not self._stop.is_set():
+            n = self.target.in_waiting()
+            if not n:
+                self._stop.wait(self.poll)
+                continue
+            data = self.target.read(n, timeout=0)
+            self.last_rx = time.perf_counter()
+            with self._lock:
+                text = self._partial + data
+                parts = text.split("\n")
+                self._partial = parts.pop()
+                for line in parts:
+                    if self._skip_partial:
+                        self._skip_partial = False
+                        continue
+                    self._put(line)
+
+    def sync(self):
+        """Drop queued lines and any half received line.
+
+        The next line returned by :meth:`readline` then starts after this
+        call, like the first read loop of ``do_glitch()``.
+        """
+        with self._lock:
+            while True:
+                try:
+                    self.lines.get_nowait()
+                except queue.Empty:
+                    break
+            self._skip_partial = bool(self._partial)
+            self._partial = ""
+
+    def readline(self, timeout=None):
+        """Return the next complete line (without ``"\\n"``), or None on timeout."""
+        try:
+            return self.lines.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def idle_for(self):
+        """Seconds since the last byte arrived."""
+        return time.perf_counter() - self.last_rx
+
+    def __iter__(self):
+        while not self._stop.is_set():
+            line = self.readline(timeout=0.1)
+            if line is not None:
+                yield line
+
+
+def recover(scope, glitch_on, glitch_off, settle=0.01):
+    """Pulse the glitch MOSFET off and on again to revive a silent target."""
+    glitch_off(scope)
+    time.sleep(settle)
+    glitch_on(scope)
+
+
+def do_glitch(reader, scope, glitch_on, glitch_off, timeout=0.2, expected=GLITCH_INF_COUNT):
+    """Event driven version of ``do_glitch()`` from the VCC glitch lab.
+
+    Waits for the next full counter line. If nothing arrives within
+    ``timeout`` the target is revived with ``glitch_off``/``glitch_on``.
+
+    Returns:
+        ``(successes, crashes)``, each 0 or 1, as before.
+    """
+    reader.sync()
+    line = reader.readline(timeout=timeout)
+    if line is None:
+        recover(scope, glitch_on, glitch_off)
+        return 0, 0
+    crashes = 1 if "hello" in line else 0
+    count = parse_counter(line)
+    successes = 1 if count is not None and count != expected else 0
+    return successes, crashes
+
+
+def monitor(reader, lines=20, timeout=1.0):
+    """Yield ``(line, count, crashed)`` for the ext_continuous monitoring cell.
+
+    Stops after ``lines`` lines or when nothing arrives for ``timeout``
+    seconds.
+    """
+    for _ in range(lines):
+        line = reader.readline(timeout=timeout)
+        if line is None:
+            return
+        yield line, parse_counter(line), "hello" in line
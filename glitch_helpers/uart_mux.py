@@ -0,0 +1,183 @@
+"""asyncio monitor for the counter output of many targets at once.
+
+The ext_continuous part of the VCC glitch lab watches one target's
+``"40000 200 200"`` lines with blocking reads and sleeps. :class:`UartMux`
+watches any number of ``(scope, target)`` pairs from one event loop. Each
+target's serial port is drained in bulk on a worker thread and split into
+lines as the bytes arrive. Every line is checked for a changed counter
+(a glitch that landed) and for the ``"hello"`` banner of a reset. A
+target that resets or goes silent gets its own ``glitch_off``/``glitch_on``
+recovery, which never holds up the other targets.
+
+Example::
+
+    mux = UartMux(on_event=lambda e: print(e.name, e.kind, e.line))
+    for name, (scope, target) in rigs.items():
+        mux.add(name, scope, target, glitch_on=glitch_on, glitch_off=glitch_off)
+    await mux.run(60)          # in a notebook; mux.run_sync(60) in a script
+    print(mux.summary())
+
+Callbacks may be plain functions or coroutine functions. The scope and
+target objects are only ever touched from one worker thread at a time per
+target, so hardware and simulated targets both work.
+"""
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+from glitch_helpers.uart import GLITCH_INF_COUNT, parse_counter
+
+Event = namedtuple("Event", ["time", "name", "kind", "line", "count"])
+"""Something seen on one target. ``kind`` is ``"glitch"``, ``"reset"`` or
+``"silent"``; ``count`` is the parsed counter, or None."""
+
+
+class LineSplitter(object):
+    """Turns chunks of serial data into complete lines."""
+    def __init__(self):
+        self.partial = ""
+
+    def feed(self, text):
+        """Add ``text`` and return the lines it completed (without ``"\\n"``)."""
+        parts = (self.partial + text).split("\n")
+        self.partial = parts.pop()
+        return parts
+
+    def clear(self):
+        self.partial = ""
+
+
+class Channel(object):
+    """One monitored target, see :meth:`UartMux.add`."""
+    def __init__(self, name, scope, target, glitch_on=None, glitch_off=None,
+                 expected=GLITCH_INF_COUNT, on_event=None):
+        self.name = name
+        self.scope = scope
+        self.target = target
+        self.glitch_on = glitch_on
+        self.glitch_off = glitch_off
+        self.expected = expected
+        self.on_event = on_event
+        self.lines = LineSplitter()
+        self.last_rx = time.perf_counter()
+        self.counts = {"lines": 0, "glitch": 0, "reset": 0, "silent": 0, "recoveries": 0}
+
+    def drain(self):
+        """Read whatever is waiting. Runs on a worker thread."""
+        n = self.target.in_waiting()
+        if not n:
+            return ""
+        return self.target.read(n, timeout=0)
+
+
+class UartMux(object):
+    """Watches the serial output of several targets concurrently.
+
+    Args:
+        poll (float): Seconds to wait before polling a quiet target again.
+        silence (float): A target that sends nothing for this long is
+            recovered.
+        settle (float): Seconds between ``glitch_off`` and ``glitch_on``.
+        recover_on_reset (bool): Also recover a target that prints the
+            ``"hello"`` banner.
+        on_event (callable): Called with every :class:`Event`, in addition
+            to the per-target callback.
+        maxevents (int): Most recent events kept in :attr:`events`.
+    """
+    def __init__(self, poll=0.001, silence=0.2, settle=0.01, recover_on_reset=True, on_event=None,
+                 maxevents=10000):
+        self.poll = poll
+        self.silence = silence
+        self.settle = settle
+        self.recover_on_reset = recover_on_reset
+        self.on_event = on_event
+        self.channels = {}
+        self.events = deque(maxlen=maxevents)
+        self._stopping = False
+
+    def add(self, name, scope, target, glitch_on=None, glitch_off=None,
+            expected=GLITCH_INF_COUNT, on_event=None):
+        """Monitor ``target``.
+
+        ``glitch_on(scope)`` and ``glitch_off(scope)`` are the lab's
+        functions for this target; recovery is skipped if they are None.
+        """
+        ch = Channel(name, scope, target, glitch_on, glitch_off, expected, on_event)
+        self.channels[name] = ch
+        return ch
+
+    def stop(self):
+        """Make :meth:`run` return after the current polls."""
+        self._stopping = True
+
+    async def run(self, duration=None):
+        """Monitor all targets for ``duration`` seconds, or until :meth:`stop`."""
+        self._stopping = False
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self.channels)))
+        tasks = [loop.create_task(self._watch(ch, loop, executor)) for ch in self.channels.values()]
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+                self.stop()
+                await asyncio.gather(*tasks)
+        finally:
+            self._stopping = True
+            executor.shutdown(wait=True)
+
+    def run_sync(self, duration=None):
+        """:meth:`run` from code without an event loop of its own."""
+        asyncio.run(self.run(duration))
+
+    async def _watch(self, ch, loop, executor):
+        ch.last_rx = time.perf_counter()
+        while not self._stopping:
+            text = await loop.run_in_executor(executor, ch.drain)
+            now = time.perf_counter()
+            if text:
+                ch.last_rx = now
+                for line in ch.lines.feed(text):
+                    await self._line(ch, line, loop, executor)
+                continue
+            if now - ch.last_rx > self.silence:
+                await self._emit(ch, Event(now, ch.name, "silent", "", None))
+                await self._recover(ch, loop, executor)
+            await asyncio.sleep(self.poll)
+
+    async def _line(self, ch, line, loop, executor):
+        ch.counts["lines"] += 1
+        if "hello" in line:
+            await self._emit(ch, Event(time.perf_counter(), ch.name, "reset", line, None))
+            if self.recover_on_reset:
+                await self._recover(ch, loop, executor)
+            return
+        count = parse_counter(line)
+        if count is not None and count != ch.expected:
+            await self._emit(ch, Event(time.perf_counter(), ch.name, "glitch", line, count))
+
+    async def _emit(self, ch, event):
+        ch.counts[event.kind] += 1
+        self.events.append(event)
+        for fn in (ch.on_event, self.on_event):
+            if fn is not None:
+                result = fn(event)
+                if asyncio.iscoroutine(result):
+                    await result
+
+    async def _recover(self, ch, loop, executor):
+        if ch.glitch_off is None or ch.glitch_on is None:
+            ch.last_rx = time.perf_counter()
+            return
+        await loop.run_in_executor(executor, ch.glitch_off, ch.scope)
+        await asyncio.sleep(self.settle)
+        await loop.run_in_executor(executor, ch.glitch_on, ch.scope)
+        ch.counts["recoveries"] += 1
+        ch.lines.clear()
+        ch.last_rx = time.perf_counter()
+
+    def summary(self):
+        """Per-target counts of lines, glitches, resets, silences and recoveries."""
+        return dict((name, dict(ch.counts)) for name, ch in self.channels.items())
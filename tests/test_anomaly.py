@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from glitch_helpers import sim
+from glitch_helpers.anomaly import TraceAnomalyDetector
+
+
+def capture(scope, target):
+    target.flush()
+    scope.arm()
+    target.write("x\n")
+    timed_out = scope.capture()
+    if timed_out:
+        sim.reset_target(scope)
+    return np.array(scope.get_last_trace(), copy=True), target.read()
+
+
+def test_reference_statistics():
+    traces = np.random.RandomState(0).normal(size=(20, 30))
+    det = TraceAnomalyDetector(30, warmup=20)
+    for trace in traces:
+        assert det.observe(trace) is None
+    assert det.ready
+    np.testing.assert_allclose(det.mean, traces.mean(axis=0))
+    np.testing.assert_allclose(det.std, traces.std(axis=0, ddof=1))
+
+
+def test_score_needs_warmup():
+    det = TraceAnomalyDetector(10, warmup=2)
+    det.add_reference(np.zeros(10))
+    with pytest.raises(RuntimeError):
+        det.score(np.zeros(10))
+
+
+def test_flags_glitched_sim_traces():
+    scope, target = sim.connect(fault_rate=lambda g: 0.5 if g.width < -10 else 0.0, hs2="glitch")
+    det = TraceAnomalyDetector(scope.adc.samples, warmup=30, window=(0, 2000))
+    scope.glitch.width = 0
+    for _ in range(30):
+        det.add_reference(capture(scope, target)[0])
+    normal = np.array([capture(scope, target)[0] for _ in range(20)])
+    assert not det.flag_batch(normal).any()
+
+    scope.glitch.width = -12
+    traces, success = zip(*[capture(scope, target) for _ in range(40)])
+    traces = np.array(traces)
+    success = np.array(["Welcome" in r for r in success])
+    assert success.any()
+    scores = det.score_batch(traces)
+    np.testing.assert_allclose(scores, [det.score(t) for t in traces])
+    np.testing.assert_array_equal(det.flag_batch(traces), success)
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+from glitch_helpers.archive import TraceArchive
+
+
+def test_round_trip_and_reopen(tmp_path):
+    path = str(tmp_path / "traces")
+    rng = np.random.RandomState(0)
+    traces = np.round(rng.uniform(-0.5, 0.5, (10, 50)) * 1024) / 1024
+    with TraceArchive(path, samples=50, block_size=4, codec="zlib") as archive:
+        for i, trace in enumerate(traces[:7]):
+            archive.add(trace, outcome="success" if i == 3 else "normal",
+                        width=-i, offset=i, ext_offset=2 * i)
+
+    archive = TraceArchive.open(path)
+    assert archive.codec == "zlib"
+    assert len(archive) == 7
+    np.testing.assert_array_equal(archive.traces(range(7)), traces[:7])
+    assert list(archive.query(outcome="success")) == [3]
+    assert list(archive.query(ext_offset=(4, 8))) == [2, 3, 4]
+    for i, trace in enumerate(traces[7:], 7):
+        archive.add(trace, width=-i, offset=i, ext_offset=2 * i)
+    archive.close()
+
+    archive = TraceArchive(path, samples=50, block_size=4)
+    assert archive.codec == "zlib"
+    assert len(archive) == 10
+    assert archive.find(9) == 9
+    np.testing.assert_array_equal(archive.traces(range(10)), traces)
+    archive.close()
+
+
+def test_keep_every_skips_normal_traces(tmp_path):
+    with TraceArchive(str(tmp_path / "t"), samples=8, keep_every=3, codec="zlib") as archive:
+        kept = [archive.add(np.zeros(8), outcome="success" if i == 4 else "normal") for i in range(7)]
+    assert kept == [True, False, False, True, True, False, True]
+    assert archive.find(4) == 2
+    assert archive.find(5) is None
+
+
+def test_mismatched_settings_are_rejected(tmp_path):
+    path = str(tmp_path / "traces")
+    TraceArchive(path, samples=50, codec="zlib").close()
+    with pytest.raises(ValueError):
+        TraceArchive(path, samples=100)
+    with pytest.raises(ValueError):
+        TraceArchive(path, samples=50, block_size=8)
+
+
+def test_reopen_after_torn_flush(tmp_path):
+    path = str(tmp_path / "traces")
+    traces = np.arange(8 * 6).reshape(8, 6) / 1024.0
+    with TraceArchive(path, samples=6, block_size=2, codec="zlib") as archive:
+        for i, trace in enumerate(traces[:4]):
+            archive.add(trace, width=i)
+    with open(str(tmp_path / "traces" / "index.bin"), "ab") as f:
+        f.write(b"\x01" * 5)
+
+    archive = TraceArchive.open(path)
+    assert len(archive) == 4
+    for i, trace in enumerate(traces[4:6], 4):
+        archive.add(trace, width=i)
+    archive.close()
+    archive = TraceArchive.open(path)
+    assert list(archive.index["width"]) == [0, 1, 2, 3, 4, 5]
+    np.testing.assert_array_equal(archive.traces(range(6)), traces[:6])
+
+    # A block record torn off after its index rows were written: those
+    # rows are dropped along with it.
+    with open(str(tmp_path / "traces" / "blocks.bin"), "r+b") as f:
+        f.truncate(os.path.getsize(f.name) - 3)
+    archive = TraceArchive.open(path)
+    assert len(archive) == 4
+    assert archive.attempts == 4
+    archive.add(traces[6], width=6)
+    archive.close()
+    archive = TraceArchive.open(path)
+    assert list(archive.index["width"]) == [0, 1, 2, 3, 6]
+    np.testing.assert_array_equal(archive.traces(range(5)), traces[[0, 1, 2, 3, 6]])
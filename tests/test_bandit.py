@@ -0,0 +1,54 @@
+import numpy as np
+
+from glitch_helpers import sim
+from glitch_helpers.bandit import BetaScheduler
+from glitch_helpers.search import Range
+
+
+def test_finds_the_glitch3_island():
+    scope, target = sim.connect(fault_rate=sim.default_fault_map("glitch3"), hs2="glitch", seed=3)
+
+    def attempt(params):
+        for k, v in params.items():
+            setattr(scope.glitch, k, v)
+        target.flush()
+        scope.arm()
+        target.write("x\n")
+        if scope.capture():
+            sim.reset_target(scope)
+            target.read()
+            return "reset"
+        return "success" if "Welcome" in target.read() else "normal"
+
+    sched = BetaScheduler({"width": Range(-12, -10, 1), "offset": Range(-48, -40, 1),
+                           "ext_offset": Range(0, 20, 1)}, seed=0)
+    assert sched.run(attempt, budget=3000) == 3000
+    params, mean, trials, successes = sched.best(1)[0]
+    assert params["ext_offset"] == 7 and abs(params["offset"] + 44) <= 2
+    assert successes > 0
+    # The attempts went to the island, not evenly over the 320 cells.
+    assert trials > 3000 / 320 * 5
+
+
+def test_retire_rules():
+    sched = BetaScheduler({"a": [0, 1, 2]}, retire_after=3)
+    for _ in range(3):
+        sched.update(0, "reset")
+        sched.update(1, "normal")
+    assert not sched.active[0]
+    assert sched.active[1]
+    for _ in range(200):
+        sched.update(1, "normal")
+    assert not sched.active[1]
+    sched.update(2, "success")
+    for _ in range(500):
+        sched.update(2, "normal")
+    assert sched.active[2]
+    assert list(sched.next(k=5)) == [2]
+
+
+def test_run_stops_when_everything_is_retired():
+    sched = BetaScheduler({"a": [0, 1]}, retire_after=2, seed=1)
+    assert sched.run(lambda params: "reset", budget=100) == 4
+    assert len(sched.next()) == 0
+    np.testing.assert_array_equal(sched.trials, [2, 2])
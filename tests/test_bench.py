@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from glitch_helpers import bench
+
+
+def test_every_benchmark_runs():
+    results = bench.run(n=20)
+    assert sorted(results) == sorted(bench.BENCHMARKS)
+    for name, r in results.items():
+        assert r["attempts"] == 20, name
+        assert r["attempts_per_sec"] > 0
+        assert r["p50_ms"] <= r["p99_ms"]
+        assert set(r["stages_ms"]) == set(r["stage_share"])
+        assert 0 < sum(r["stage_share"].values()) <= 1.0 + 1e-9
+    assert "classify" in bench.format_results(results)
+
+
+def test_latency_profile_shows_up_in_stages():
+    profile = dict(bench.PROFILES["zero"], reset=0.002)
+    r = bench.run(["attack1"], n=10, profile=profile)["attack1"]
+    assert r["stages_ms"]["reset"] >= 2.0
+    assert max(r["stage_share"], key=r["stage_share"].get) == "reset"
+    r = bench.run(["attack1"], n=10, profile=profile, scale=0.0)["attack1"]
+    assert r["stages_ms"]["reset"] < 2.0
+
+
+def test_main_json(capsys):
+    bench.main(["attack2", "-n", "5", "--json"])
+    assert json.loads(capsys.readouterr().out)["attack2"]["attempts"] == 5
+    with pytest.raises(SystemExit):
+        bench.main(["nope"])
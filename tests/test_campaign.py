@@ -0,0 +1,55 @@
+import pytest
+
+from glitch_helpers import sim
+from glitch_helpers.campaign import CampaignRunner
+
+
+def points(n):
+    return [{"width": -12, "offset": -45, "ext_offset": i} for i in range(n)]
+
+
+def test_handler_error_stops_run_and_is_cleared():
+    scope, target = sim.connect(hs2="glitch")
+    runner = CampaignRunner(scope, target, reset=sim.reset_target, capture_trace=False)
+    seen = []
+
+    def handler(attempt):
+        seen.append(attempt.index)
+        if attempt.index == 3:
+            raise RuntimeError("bad attempt")
+    runner.add_handler("check", handler)
+    with pytest.raises(RuntimeError):
+        runner.run(points(50))
+    assert 3 in seen
+    assert runner.attempts < 50
+
+    runner.handlers = [("count", lambda attempt: seen.append(attempt.index))]
+    del seen[:]
+    assert runner.run(points(5)) == 5
+    assert len(seen) == 5
+
+
+def test_responses_reach_handlers():
+    scope, target = sim.connect(fault_rate=lambda g: 1.0, hs2="glitch")
+    runner = CampaignRunner(scope, target, reset=sim.reset_target)
+    responses = []
+    runner.add_handler("collect", lambda attempt: responses.append(attempt.response))
+    runner.run(points(4))
+    assert responses == ["Welcome\n"] * 4
+
+
+def test_reset_each_needs_reset():
+    scope, target = sim.connect()
+    with pytest.raises(ValueError):
+        CampaignRunner(scope, target, reset_each=True)
+
+
+def test_direct_scope_writes_between_runs_are_not_skipped():
+    scope, target = sim.connect(hs2="glitch")
+    runner = CampaignRunner(scope, target, reset=sim.reset_target, capture_trace=False)
+    fired = []
+    runner.add_handler("width", lambda attempt: fired.append((attempt.params["width"], scope.glitch.width)))
+    runner.run([{"width": -12}])
+    scope.glitch.width = -5
+    runner.run([{"width": -12}])
+    assert fired == [(-12, -12), (-12, -12)]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from glitch_helpers import sim
+from glitch_helpers.capture import BatchCapture, capture_batch
+
+
+def connect(firmware="glitch3"):
+    return sim.connect(fault_rate=lambda g: 1.0 if g.ext_offset == 7 else 0.0, firmware=firmware,
+                       hs2="glitch")
+
+
+def test_batch_run():
+    scope, target = connect()
+    batch = BatchCapture(scope, target, reset=sim.reset_target)
+    settings = [(-12, -45, e) for e in range(10)]
+    traces, meta, responses = batch.run(settings)
+    assert traces.shape == (10, scope.adc.samples)
+    assert meta["ext_offset"].tolist() == list(range(10))
+    assert meta["trig_count"].tolist() == [-1] * 10
+    assert responses == ["Welcome\n" if e == 7 else "Denied\n" for e in range(10)]
+    # width and offset were only written once.
+    assert batch.glitch.writes == 1 + 1 + 10
+
+
+def test_buffers_are_reused():
+    scope, target = connect()
+    batch = BatchCapture(scope, target, reset=sim.reset_target, trig_count=True)
+    traces, meta, _ = batch.run([(-12, -45, 0)] * 4)
+    assert meta["trig_count"].tolist() == [scope.adc.trig_count] * 4
+    again, _, _ = batch.run([(-12, -45, 1)] * 2)
+    assert np.shares_memory(traces, again)
+    owned, _, _ = capture_batch(scope, target, [(-12, -45, 0)], reset=sim.reset_target)
+    assert not np.shares_memory(owned, traces)
+
+
+def test_reset_mode():
+    scope, target = connect("glitch1")
+    traces, meta, responses = capture_batch(scope, target, [(-12, -45, 7), (-12, -45, 0)],
+                                            command=None, reset=sim.reset_target)
+    assert responses == ["hello\nA1234", "hello\nA"]
+
+
+def test_reset_mode_needs_reset():
+    scope, target = connect("glitch1")
+    with pytest.raises(ValueError):
+        BatchCapture(scope, target, command=None)
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+from glitch_helpers.cellstats import DONE, HIGH, OPEN, ZERO, CellStats, wilson
+
+
+def test_wilson():
+    lo, hi = wilson([0, 5, 0], [5, 5, 0], z=1.64)
+    assert lo[0] == 0 and hi[0] == pytest.approx(0.35, abs=0.01)
+    assert lo[1] == pytest.approx(0.65, abs=0.01) and hi[1] == pytest.approx(1)
+    assert (lo[2], hi[2]) == (0, 1)
+
+
+def test_dead_cell_needs_sample_size_failures():
+    stats = CellStats({"width": [0]})
+    for _ in range(4):
+        stats.add(0, "normal")
+        assert stats.state[0] == OPEN
+    stats.add(0, "reset")
+    assert stats.state[0] == ZERO
+
+
+def test_working_and_uncertain_cells():
+    stats = CellStats({"width": [0, 1]}, max_samples=6)
+    for _ in range(3):
+        stats.add(0, "success")
+    assert stats.state[0] == HIGH
+    for group in ["success"] + ["normal"] * 5:
+        assert stats.state[1] == OPEN
+        stats.add(1, group)
+    assert stats.state[1] == DONE
+
+
+def test_success_reopens_dropped_neighbours():
+    stats = CellStats({"width": [0, 1, 2]}, zero_upper=0.6)
+    for cell in (0, 2):
+        stats.add(cell, "normal")
+        stats.add(cell, "normal")
+    assert list(stats.state[[0, 2]]) == [ZERO, ZERO]
+    stats.add(1, "success")
+    assert list(stats.state) == [OPEN, OPEN, OPEN]
+    for _ in range(3):
+        stats.add(0, "normal")
+    assert stats.state[0] == ZERO
+
+
+def isolated_weak_cells(seed, **kwargs):
+    rng = random.Random(seed)
+    rates = dict(((w, o), rng.uniform(0.2, 0.3)) for w in range(0, 20, 4) for o in range(0, 20, 4))
+    stats = CellStats({"width": range(20), "offset": range(20)}, **kwargs)
+    used = stats.run(lambda p: "success" if rng.random() < rates.get((p["width"], p["offset"]), 0)
+                     else "normal")
+    found = [stats.successes[stats.cells.index(cell)] > 0 for cell in rates]
+    return np.mean(found), used
+
+
+def test_defaults_find_isolated_weak_cells():
+    found = [isolated_weak_cells(seed)[0] for seed in range(20)]
+    # Fixed sample_size=5 misses about a quarter: (1 - 0.25) ** 5.
+    assert np.mean(found) > 0.7
+    loose = [isolated_weak_cells(seed, zero_upper=0.6)[0] for seed in range(20)]
+    assert np.mean(loose) < 0.5
+
+
+def test_run_spends_savings_on_uncertain_cells():
+    rates = {0: 0.9, 1: 0.9, 2: 0.3, 3: 0.0}
+    rng = random.Random(0)
+    stats = CellStats({"width": range(4)})
+    used = stats.run(lambda p: "success" if rng.random() < rates[p["width"]] else "normal")
+    assert used <= 20
+    assert stats.trials[3] == 5
+    assert stats.trials[2] > 5 or stats.state[2] == ZERO
+    assert stats.table()[0][:3] == [0, stats.trials[0], stats.successes[0]]
+    assert stats.best(2)[0][0]["width"] in (0, 1)
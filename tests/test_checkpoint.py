@@ -0,0 +1,97 @@
+import json
+
+from glitch_helpers.checkpoint import CheckpointedSweep, StopSweep, Sweep
+from glitch_helpers.search import Range
+
+
+def make_sweep():
+    return Sweep([("width", Range(-2, 0, 1)), ("offset", [10, 20, 30])], repeat=2)
+
+
+def test_resume_after_stop(tmp_path):
+    path = str(tmp_path / "sweep.jsonl")
+    sweep = make_sweep()
+
+    def stop_at_five(params):
+        if stop_at_five.calls == 5:
+            raise StopSweep({"n": 5})
+        stop_at_five.calls += 1
+        return {"n": stop_at_five.calls - 1}
+    stop_at_five.calls = 0
+
+    run = CheckpointedSweep(sweep, path)
+    assert not run.run(stop_at_five)
+    assert run.stopped
+    assert sorted(run.done) == list(range(6))
+
+    seen = []
+    run = CheckpointedSweep(sweep, path)
+    assert run.cursor == 6
+    assert run.run(lambda params: seen.append(params) or {"n": -1})
+    assert len(seen) == len(sweep) - 6
+    assert seen[0] == sweep.point(6)
+    assert sorted(run.done) == list(range(len(sweep)))
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "sweep.jsonl")
+    sweep = make_sweep()
+    def attempt(params):
+        if params["offset"] == 20:
+            raise StopSweep({"ok": True})
+        return {"ok": True}
+
+    run = CheckpointedSweep(sweep, path)
+    run.run(attempt)
+    assert sorted(run.done) == [0, 1, 2]
+    with open(path, "a") as f:
+        f.write('{"i": 3, "r": {"ok"')
+
+    run = CheckpointedSweep(sweep, path)
+    assert sorted(run.done) == [0, 1, 2]
+    assert run.run(lambda params: {"ok": False})
+    with open(path) as f:
+        lines = f.read().splitlines()
+    entries = [json.loads(line) for line in lines[1:]]
+    assert [e["i"] for e in entries] == list(range(len(sweep)))
+    assert entries[3]["r"] == {"ok": False}
+
+
+def test_header_without_newline_is_rewritten(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    sweep = make_sweep()
+    path.write_text(json.dumps({"sweep": sweep.spec()}))
+    run = CheckpointedSweep(sweep, str(path))
+    assert run.done == {}
+    run.run(lambda params: 1)
+    assert len(CheckpointedSweep(sweep, str(path)).done) == len(sweep)
+
+
+def test_corrupt_line_in_the_middle_keeps_later_records(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    sweep = make_sweep()
+    CheckpointedSweep(sweep, str(path)).run(lambda params: params["width"])
+    lines = path.read_text().splitlines(True)
+    lines[3] = lines[3][:5] + "\x00garbage\n"
+    path.write_text("".join(lines))
+    size = path.stat().st_size
+
+    run = CheckpointedSweep(sweep, str(path))
+    assert run.corrupt == 1
+    assert sorted(run.done) == [i for i in range(len(sweep)) if i != 2]
+    assert path.stat().st_size == size
+    assert run.pending() == [2]
+    assert run.run(lambda params: params["width"])
+    assert sorted(CheckpointedSweep(sweep, str(path)).done) == list(range(len(sweep)))
+
+
+def test_corrupt_last_line_is_cut_off(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    sweep = make_sweep()
+    CheckpointedSweep(sweep, str(path)).run(lambda params: 1)
+    with open(str(path), "a") as f:
+        f.write('{"i": 3, \n\n')
+    run = CheckpointedSweep(sweep, str(path))
+    assert run.corrupt == 0
+    assert len(run.done) == len(sweep)
+    assert path.read_text().endswith('"r": 1}\n')
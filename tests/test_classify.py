@@ -0,0 +1,33 @@
+from glitch_helpers.classify import Classifier, contains, for_firmware, regex
+
+
+def test_first_matching_rule_wins():
+    clf = Classifier([("success", contains("x")), ("reset", contains("x")), ("reset", contains("y"))])
+    assert clf("xy") == "success"
+    assert clf("y") == "reset"
+    assert clf("z") == "normal"
+    assert clf.rule_index("y") == 2
+    assert clf.rule_index("z") == 3
+
+
+def test_glitch1_rules():
+    clf = for_firmware("glitch1")
+    assert clf("hello\nA1234") == "success"
+    assert clf("hello\nA\x01\x02") == "reset"
+    assert clf("hello\nA") == "normal"
+    assert clf("") == "crash"
+
+
+def test_regex_with_capture_groups():
+    clf = Classifier([("success", regex("W(el)(come)")), ("reset", contains("hello"))])
+    assert clf.rule_index("hello\nWelcome") == 0
+    assert clf("hello\nWelcome") == "success"
+    assert clf("hello\nDenied") == "reset"
+    assert clf(b"Welcome\n") == "success"
+
+
+def test_batch_matches_single():
+    clf = for_firmware("glitch3")
+    responses = ["Welcome\n", "Denied\n", "", "Denied\nWelcome\n"]
+    codes = clf.classify_batch(responses)
+    assert list(clf.names(codes)) == [clf(r) for r in responses]
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+
+from glitch_helpers import clock_glitch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def config(attack):
+    return {"simulate": True, "attack": attack, "width_range": [-12, -10, 1],
+            "offset_range": [-44, -42, 1], "ext_range": [0, 3], "sample_size": 2}
+
+
+def test_sim_firmware_follows_attack():
+    for attack, firmware in clock_glitch.ATTACK_FIRMWARE.items():
+        scope, target, reset = clock_glitch.connect(config(attack))
+        assert target.firmware == firmware
+    scope, target, reset = clock_glitch.connect(dict(config("attack1"), sim_firmware="glitch3"))
+    assert target.firmware == "glitch3"
+
+
+def test_run_config_counts():
+    result = clock_glitch.run_config(config("attack1"), log=None)
+    assert result["attempts"] == 2 * 2 * 2
+    assert result["cells"] == 4
+    assert result["success_cells"] <= result["cells"]
+    result = clock_glitch.run_config(config("attack2"), log=None)
+    assert result["attempts"] == 2 * 2 * 3
+    assert result["cells"] == 4
+
+
+def test_cli(tmp_path):
+    cfg = tmp_path / "campaign.json"
+    out = tmp_path / "result.json"
+    cfg.write_text(json.dumps(dict(config("attack2"), output=str(out))))
+    proc = subprocess.run([sys.executable, "-W", "error::RuntimeWarning", "-m", "glitch_helpers.clock_glitch",
+                           "-q", str(cfg)], cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stderr == ""
+    assert proc.stdout.startswith("attack2 on CWLITEARM: ")
+    assert json.loads(out.read_text())["attempts"] == 12
+
+
+def test_import_is_light():
+    code = ("import sys, glitch_helpers.clock_glitch; "
+            "sys.exit(len([m for m in ('matplotlib', 'tqdm', 'chipwhisperer', 'IPython') if m in sys.modules]))")
+    assert subprocess.call([sys.executable, "-c", code], cwd=ROOT) == 0
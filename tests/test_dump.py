@@ -0,0 +1,69 @@
+import io
+
+from glitch_helpers.dump import (escape, extract_dump, hexdump, print_dump, read_dump,
+                                 strip_response)
+
+
+class Leaking(object):
+    """Target that has ``chunks`` waiting, one per poll."""
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, n, timeout=0):
+        chunk = self.chunks.pop(0)
+        assert n == len(chunk)
+        return chunk
+
+
+def test_read_dump_drains_until_idle():
+    target = Leaking(["\x00\x01", "AB", "\xff"])
+    data = read_dump(target, "r0", idle=0.01)
+    assert data == bytearray(b"r0\x00\x01AB\xff")
+    assert target.chunks == []
+
+
+def test_read_dump_stops_at_max_bytes():
+    target = Leaking(["x" * 10] * 5)
+    assert len(read_dump(target, max_bytes=25, idle=0.01)) == 30
+    assert len(target.chunks) == 2
+
+
+def test_strip_response():
+    assert strip_response("junk r0\n\x01\x02", b"r0") == b"\n\x01\x02"
+    assert strip_response(b"no prefix") == b"no prefix"
+
+
+def test_escape_matches_my_print():
+    assert escape("ok\n\x00\x7f") == "ok\n0x000x7F"
+
+
+def test_hexdump_lines():
+    text = "".join(hexdump(b"Hello, world!\x00\x01\x02\x03", width=8, start=0x10))
+    assert text.splitlines() == [
+        "00000010  48 65 6C 6C 6F 2C 20 77  |Hello, w|",
+        "00000018  6F 72 6C 64 21 00 01 02  |orld!...|",
+        "00000020  03                       |.       |",
+    ]
+    assert "".join(hexdump(bytes(range(256)) * 3, chunk_rows=5)) == "".join(hexdump(bytes(range(256)) * 3))
+
+
+def test_print_dump_elides_middle():
+    out = io.StringIO()
+    print_dump(bytes(100 * 16), max_lines=4, out=out)
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 5
+    assert lines[1].startswith("00000010")
+    assert lines[2] == "... 96 lines (1536 bytes) not shown ..."
+    assert lines[3].startswith("00000620")
+    assert lines[4].startswith("00000630")
+
+
+def test_extract_dump_saves_leaked_bytes(tmp_path):
+    path = str(tmp_path / "dump.bin")
+    data = extract_dump(Leaking(["\x10\x20", "\x30"]), "r0\x01", path, idle=0.01)
+    assert data == b"\x01\x10\x20\x30"
+    with open(path, "rb") as f:
+        assert f.read() == data
@@ -0,0 +1,57 @@
+from glitch_helpers import sim
+from glitch_helpers.health import CRASH, NORMAL, PARTIAL, RESET, HealthMonitor
+
+
+class Replay(object):
+    """Target that has ``text`` waiting."""
+    def __init__(self, text):
+        self.text = text
+
+    def in_waiting(self):
+        return len(self.text)
+
+    def read(self, num=0, timeout=0):
+        out, self.text = self.text[:num], self.text[num:]
+        return out
+
+
+def attempt(scope, target, monitor):
+    target.flush()
+    scope.arm()
+    target.write("x\n")
+    return monitor.read_response(scope.capture())
+
+
+def test_expected_len_without_prefix():
+    scope, target = sim.connect()
+    monitor = HealthMonitor(scope, target, sim.reset_target, expected_len=7, timeout=5.0, idle=2.0)
+    assert attempt(scope, target, monitor) == ("Denied\n", NORMAL)
+
+
+def test_expected_len_after_prefix():
+    scope, _ = sim.connect()
+    monitor = HealthMonitor(scope, Replay("hello\nA12"), None, expected_len=4, prefix="hello\nA",
+                            timeout=0.05, idle=0.01)
+    assert monitor.read_response() == ("hello\nA12", PARTIAL)
+    monitor.target = Replay("hello\nA1234")
+    assert monitor.read_response() == ("hello\nA1234", NORMAL)
+
+
+def test_reset_banner():
+    scope, _ = sim.connect()
+    monitor = HealthMonitor(scope, Replay("Den\x00hello\n"), None, timeout=0.05, idle=0.01)
+    assert monitor.read_response()[1] == RESET
+
+
+def test_hung_target_is_reset_only_when_needed():
+    scope, target = sim.connect(fault_rate=lambda g: (0.0, 1.0), hs2="glitch")
+    monitor = HealthMonitor(scope, target, sim.reset_target, terminators=("Denied\n", "Welcome\n"))
+    assert attempt(scope, target, monitor) == ("", CRASH)
+    assert monitor.hung()
+    assert monitor.recover(CRASH)
+    assert target.read() == "hello\n"
+
+    scope.io.hs2 = "clkgen"
+    assert attempt(scope, target, monitor) == ("Denied\n", NORMAL)
+    assert not monitor.recover(NORMAL)
+    assert monitor.resets == 1
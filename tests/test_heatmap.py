@@ -0,0 +1,45 @@
+import numpy as np
+
+from glitch_helpers.heatmap import GlitchHeatmap
+from glitch_helpers.search import Range
+
+
+def test_add_batch():
+    heatmap = GlitchHeatmap({"width": Range(-2, 2, 1), "offset": Range(0, 3, 1)})
+    heatmap.add_batch([], np.zeros((0, 2)))
+    heatmap.add_batch(np.array([]), [])
+    assert heatmap.counts.sum() == 0
+    heatmap.add_batch(["success", "normal", "reset"], [[-1, 1], [0, 2], [5, 5]])
+    heatmap.add_batch(np.array([0.0]), [[-1, 1]])
+    assert heatmap.counts.sum() == 3
+    assert heatmap.dropped == 1
+    assert heatmap.counts[0].sum() == 2
+
+
+def test_batch_matches_add():
+    rng = np.random.RandomState(0)
+    values = np.column_stack([rng.randint(-3, 3, 200), rng.randint(-1, 5, 200), rng.randint(0, 4, 200)])
+    groups = rng.choice(["success", "reset", "normal"], 200)
+    params = {"width": Range(-2, 2, 1), "offset": Range(0, 3, 1), "ext_offset": [0, 1, 2, 3]}
+    one, batch = GlitchHeatmap(params), GlitchHeatmap(params)
+    for g, v in zip(groups, values):
+        one.add(g, v)
+    batch.add_batch(groups, values)
+    np.testing.assert_array_equal(one.counts, batch.counts)
+    assert one.dropped == batch.dropped > 0
+
+
+def test_rates_reduce_and_best():
+    heatmap = GlitchHeatmap({"width": Range(0, 2, 1), "offset": Range(0, 2, 1), "ext_offset": [5, 6]})
+    heatmap.add_batch(["success", "normal", "success", "normal"],
+                      [[0, 1, 5], [0, 1, 5], [1, 0, 6], [1, 1, 6]])
+    rate = heatmap.rate("success")
+    assert rate[0, 1, 0] == 0.5 and rate[1, 0, 1] == 1.0
+    assert np.isnan(rate[0, 0, 0])
+    data, names = heatmap.reduce(rate)
+    assert names == ["width", "offset"]
+    np.testing.assert_array_equal(data, [[np.nan, 0.5], [1.0, 0.0]])
+    data, names = heatmap.reduce(rate, ext_offset=5)
+    assert np.isnan(data[1, 0])
+    params, best, attempts = heatmap.best(n=1)[0]
+    assert dict(params) == {"width": 1.0, "offset": 0.0, "ext_offset": 6.0} and best == 1.0
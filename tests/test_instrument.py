@@ -0,0 +1,60 @@
+import json
+
+from glitch_helpers import sim
+from glitch_helpers.instrument import Tracer, instrument
+
+
+def run_attempts(scope, target, reset, n):
+    for _ in range(n):
+        scope.glitch.width = -12
+        scope.arm()
+        reset(scope)
+        scope.capture()
+        target.read(timeout=10)
+
+
+def test_records_scope_and_target_calls(tmp_path):
+    tracer = Tracer()
+    scope, target = sim.connect(firmware="glitch1")
+    scope = instrument(scope, tracer, "scope")
+    target = instrument(target, tracer, "target")
+    reset = tracer.wrap(sim.reset_target, "reset_target")
+    run_attempts(scope, target, reset, 10)
+    summary = tracer.summary()
+    for name in ("scope.arm()", "scope.capture()", "target.read()", "reset_target",
+                 "scope.glitch.width=", "scope.io.nrst="):
+        assert summary[name]["count"] == (20 if name == "scope.io.nrst=" else 10), name
+    assert "reset_target" in tracer.format_summary()
+    path = str(tmp_path / "trace.json")
+    tracer.to_chrome_trace(path)
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    assert len(events) == tracer.count
+    assert all(e["dur"] >= 0 for e in events)
+    counts, edges = tracer.histogram("scope.capture()", bins=5)
+    assert counts.sum() == 10 and len(edges) == 6
+
+
+def test_ring_buffer_keeps_the_newest_spans():
+    tracer = Tracer(capacity=4)
+    for i in range(6):
+        with tracer.span("s{}".format(i)):
+            pass
+    ids, start, _, _ = tracer.spans()
+    assert [tracer.names[i] for i in ids] == ["s2", "s3", "s4", "s5"]
+    assert list(start) == sorted(start)
+
+
+def test_disabled_tracer_is_free():
+    tracer = Tracer(enabled=False)
+    scope, target = sim.connect()
+    assert instrument(scope, tracer, "scope") is scope
+    fn = tracer.wrap(lambda x: x + 1, "inc")
+    assert fn(1) == 2
+    with tracer.span("s"):
+        pass
+    assert tracer.count == 0
+    # Settings still reach the real object.
+    wrapped = instrument(scope, Tracer(), "scope")
+    wrapped.glitch.offset = -44
+    assert scope.glitch.offset == -44
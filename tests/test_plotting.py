@@ -0,0 +1,52 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from glitch_helpers.plotting import LivePlot, minmax_decimate
+
+
+def test_minmax_decimate():
+    env = minmax_decimate(np.arange(10.0), 3)
+    np.testing.assert_array_equal(env, [[0, 3, 6], [2, 5, 8]])
+
+
+def test_send_never_draws_on_the_caller():
+    frames = []
+    plot = LivePlot(plot_len=100, history=3, bins=10, fps=1000.0,
+                    draw=lambda env, hi: frames.append((threading.current_thread().name, len(env), len(hi))))
+    plot.start()
+    for i in range(50):
+        plot.send(np.full(100, float(i)), highlight=i == 10)
+        assert all(name == "live-plot" for name, _, _ in frames)
+    deadline = time.perf_counter() + 2
+    while not frames and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    plot.stop()
+    assert plot.sent == 50
+    assert frames and frames[0][0] == "live-plot"
+    assert frames[-1][1:] == (3, 1)
+    assert plot.frames == len(frames)
+
+
+def test_disabled_plot_ignores_traces():
+    plot = LivePlot(enabled=False, draw=lambda env, hi: None)
+    plot.send(np.zeros(10))
+    assert plot.sent == 0
+    assert not plot.redraw()
+
+
+def test_matplotlib_figure_is_made_by_start():
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    plot = LivePlot(plot_len=200, history=2, bins=20, fps=1000.0, max_highlights=1)
+    plot.start()
+    fig = plot._fig
+    assert fig is not None
+    for i in range(5):
+        plot.send(np.sin(np.arange(200) / 10.0) * i, highlight=i == 4)
+    plot.stop()
+    assert plot._fig is fig
+    assert [len(p.get_paths()) for p in plot._polys] == [1, 1, 1]
+    assert plot._ax.get_ylim()[1] >= 4
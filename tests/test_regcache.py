@@ -0,0 +1,73 @@
+from glitch_helpers.regcache import GlitchCache, count_writes, sweep
+from glitch_helpers.search import Range
+
+
+class Recorder(object):
+    def __init__(self):
+        object.__setattr__(self, "log", [])
+
+    def __setattr__(self, name, value):
+        self.log.append((name, value))
+        object.__setattr__(self, name, value)
+
+
+def test_unchanged_writes_are_skipped():
+    hw = Recorder()
+    glitch = GlitchCache(hw)
+    for ext_offset in range(3):
+        glitch.update(width=-12, offset=-45, ext_offset=ext_offset)
+    assert hw.log == [("width", -12), ("offset", -45), ("ext_offset", 0),
+                      ("ext_offset", 1), ("ext_offset", 2)]
+    assert (glitch.writes, glitch.skipped, glitch.reconfigs) == (5, 4, 2)
+    assert glitch.width == -12
+
+
+def test_batch_writes_in_write_order():
+    hw = Recorder()
+    glitch = GlitchCache(hw)
+    with glitch.batch():
+        glitch.ext_offset = 7
+        glitch.width = -12
+        glitch.clk_src = "clkgen"
+        assert hw.log == []
+        assert glitch.width == -12
+    assert [name for name, _ in hw.log] == ["clk_src", "width", "ext_offset"]
+
+
+def test_uncached_settings_pass_through():
+    hw = Recorder()
+    glitch = GlitchCache(hw)
+    glitch.arm_timing = "before_scope"
+    glitch.arm_timing = "before_scope"
+    assert hw.log == [("arm_timing", "before_scope")] * 2
+
+
+def test_invalidate_forces_next_write():
+    hw = Recorder()
+    glitch = GlitchCache(hw)
+    glitch.update(width=-12, offset=-45)
+    hw.width = -5
+    glitch.invalidate("width")
+    glitch.update(width=-12, offset=-45)
+    assert hw.width == -12
+    assert glitch.skipped == 1
+    glitch.invalidate()
+    glitch.update(width=-12, offset=-45)
+    assert glitch.skipped == 1
+
+
+def test_sweep_snakes_inner_loops():
+    points = list(sweep([0, 1], [0, 1], [0, 1, 2]))
+    assert sorted(points) == sorted(sweep([0, 1], [0, 1], [0, 1, 2], snake=False))
+    assert points[:6] == [(0, 0, 0), (0, 0, 1), (0, 0, 2), (0, 1, 2), (0, 1, 1), (0, 1, 0)]
+    assert points[6] == (1, 1, 0)
+    for a, b in zip(points, points[1:]):
+        assert sum(x != y for x, y in zip(a, b)) == 1
+
+
+def test_sweep_needs_fewer_writes_than_offset_outer_loops():
+    width, offset, ext = Range(-12, -10, 1), Range(-48, -40, 1), range(100)
+    snake = count_writes(sweep(width, offset, ext))
+    assert snake == {"width": 2, "offset": 15, "ext_offset": 100 + 15 * 99}
+    lab = count_writes((w, o, e) for o in range(-48, -40) for w in range(-12, -10) for e in ext)
+    assert lab["width"] == 16 and snake["width"] < lab["width"]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from glitch_helpers.results import ResultStore
+
+
+def fill(store, n, start=0):
+    for i in range(start, start + n):
+        store.append(offset=i % 5, width=-(i % 3), ext_offset=i, success=i % 7 == 0,
+                     response="Welcome\n" if i % 7 == 0 else "Denied\n")
+
+
+def test_reopen_and_select(tmp_path):
+    path = str(tmp_path / "store")
+    store = ResultStore(path, chunk_size=8)
+    fill(store, 20)
+    store.flush()
+
+    store = ResultStore.open(path, chunk_size=8)
+    assert len(store) == 20
+    hits = store.select(success=True)
+    assert list(hits["ext_offset"]) == [0, 7, 14]
+    assert store.decode(hits["response"]) == ["Welcome\n"] * 3
+    assert store.count(response="Denied\n") == 17
+    assert store.count(response="never seen") == 0
+
+    fill(store, 10, start=20)
+    store.flush()
+    store = ResultStore.open(path)
+    assert len(store) == 30
+    assert list(store.select(success=True)["ext_offset"]) == [0, 7, 14, 21, 28]
+    sel = store.select(["ext_offset"], width=(-1, 0), offset=(0, 1))
+    expected = [i for i in range(30) if -(i % 3) >= -1 and i % 5 <= 1]
+    np.testing.assert_array_equal(sel["ext_offset"], expected)
+
+
+def test_in_memory_store():
+    store = ResultStore()
+    fill(store, 5)
+    assert len(store) == 5
+    assert store.column("ext_offset").tolist() == [0, 1, 2, 3, 4]
+
+
+def test_open_missing_store(tmp_path):
+    path = tmp_path / "typo"
+    with pytest.raises(FileNotFoundError):
+        ResultStore.open(str(path))
+    assert not path.exists()
@@ -0,0 +1,100 @@
+import os
+import queue
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from glitch_helpers import clock_glitch
+from glitch_helpers.rigs import RigScheduler, RigSpec, SimRig, _rig_main, shard_space
+from glitch_helpers.search import Range
+
+SPACE = {"width": Range(-12, -10, 1), "offset": Range(-45, -43, 1), "ext_offset": Range(0, 30, 1)}
+
+
+class RecordingIO(object):
+    def __init__(self):
+        object.__setattr__(self, "writes", [])
+
+    def __setattr__(self, name, value):
+        self.writes.append(name)
+
+
+def reset_lines(scope, target, params, reset):
+    scope.io = RecordingIO()
+    reset(scope)
+    return True, ",".join(scope.io.writes)
+
+
+def run_worker(platform, monkeypatch):
+    monkeypatch.setattr(clock_glitch.time, "sleep", lambda s: None)
+    inbox, outbox = queue.Queue(), queue.Queue()
+    inbox.put((0, [(-12,)]))
+    inbox.put(None)
+    _rig_main(0, RigSpec("r", platform, SimRig()), ["width"], reset_lines, inbox, outbox)
+    assert outbox.get_nowait()[0] == "ready"
+    kind, _, shard, rows = outbox.get_nowait()
+    assert (kind, shard) == ("done", 0)
+    return rows[0][-1]
+
+
+def test_reset_follows_platform(monkeypatch):
+    assert run_worker("CWLITEARM", monkeypatch) == "nrst,nrst"
+    assert run_worker("CWLITEXMEGA", monkeypatch) == "pdic,pdic"
+
+
+def test_shard_space():
+    shards = shard_space({"a": Range(0, 5, 1), "b": [1, 2]}, 4)
+    assert [len(s) for s in shards] == [4, 4, 2]
+    assert shards[0][:2] == [(0, 1), (0, 2)]
+
+
+def covered(store):
+    points = np.column_stack([store.column(n) for n in ("width", "offset", "ext_offset")])
+    return sorted(map(tuple, points.tolist()))
+
+
+def test_every_point_runs_once():
+    expected = sorted(shard for s in shard_space(SPACE, 10) for shard in s)
+    rigs = [RigSpec("fast", "CWLITEARM", SimRig(seed=1)),
+            RigSpec("slow", "CWLITEXMEGA", SimRig(seed=2, read_latency=0.02))]
+    scheduler = RigScheduler(rigs, shard_size=10)
+    store = scheduler.run(SPACE)
+    assert covered(store) == [tuple(float(x) for x in p) for p in expected]
+    summary = scheduler.summary()
+    assert summary["fast"]["shards"] + summary["slow"]["shards"] == 12
+    assert summary["fast"]["shards"] > summary["slow"]["shards"]
+    assert scheduler.errors == []
+
+
+def test_crashed_rig_is_restarted_and_its_shard_redone():
+    rigs = [RigSpec("flaky", "CWLITEARM", SimRig(crash_after=15)),
+            RigSpec("ok", "CWLITEARM", SimRig(read_latency=0.002))]
+    scheduler = RigScheduler(rigs, shard_size=10, max_restarts=1)
+    store = scheduler.run(SPACE)
+    assert len(covered(store)) == len(set(covered(store))) == 120
+    assert scheduler.summary()["flaky"]["restarts"] == 1
+    assert any("simulated USB failure" in message for _, message in scheduler.errors)
+
+
+def test_straggler_shard_is_handed_to_an_idle_rig():
+    rigs = [RigSpec("stuck", "CWLITEARM", SimRig(read_latency=0.05)),
+            RigSpec("ok", "CWLITEARM", SimRig())]
+    scheduler = RigScheduler(rigs, shard_size=30, shard_timeout=0.2)
+    store = scheduler.run(SPACE)
+    assert len(covered(store)) == len(set(covered(store))) == 120
+    assert scheduler.summary()["ok"]["shards"] == 4
+
+
+def test_all_rigs_dead():
+    rigs = [RigSpec("bad", "CWLITEARM", SimRig(crash_after=0))]
+    with pytest.raises(RuntimeError):
+        RigScheduler(rigs, shard_size=10, max_restarts=0).run(SPACE)
+
+
+def test_package_import_leaves_clock_glitch_alone():
+    # python -m glitch_helpers.clock_glitch warns if the package already imported it.
+    code = "import sys, glitch_helpers; sys.exit('glitch_helpers.clock_glitch' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.call([sys.executable, "-c", code], cwd=root) == 0
@@ -0,0 +1,51 @@
+from glitch_helpers import sim
+from glitch_helpers.search import AdaptiveSearch, Range, axis_values, range_values
+
+
+def glitch3_attempt(seed=1):
+    scope, target = sim.connect(fault_rate=sim.default_fault_map("glitch3"), hs2="glitch", seed=seed)
+
+    def attempt(params):
+        for k, v in params.items():
+            setattr(scope.glitch, k, v)
+        target.flush()
+        scope.arm()
+        target.write("x\n")
+        if scope.capture():
+            sim.reset_target(scope)
+            target.read()
+            return "reset"
+        return "success" if "Welcome" in target.read() else "normal"
+    return attempt
+
+
+SPACE = {"width": Range(-20, 0, 1), "offset": Range(-49, -35, 1), "ext_offset": Range(0, 100, 1)}
+
+
+def test_range_values():
+    assert range_values(Range(0, 1, 0.25)).tolist() == [0, 0.25, 0.5, 0.75]
+    assert axis_values(Range(-2, 1, 1)) == [-2, -1, 0]
+    assert axis_values((3, 4)) == [3, 4]
+
+
+def test_ext_offset_is_not_coarsened():
+    search = AdaptiveSearch(SPACE, lambda params: "normal")
+    assert search.start_strides == [4, 4, 1]
+    search = AdaptiveSearch(SPACE, lambda params: "normal", coarse_step={"width": 8})
+    assert search.start_strides == [8, 1, 1]
+
+
+def test_finds_the_glitch3_island():
+    search = AdaptiveSearch(SPACE, glitch3_attempt(), samples=3)
+    results = search.run()
+    hits = [params for params, group in results if group == "success"]
+    assert hits
+    assert search.attempts < search.grid_size * search.samples // 2
+    best, rate, _ = search.best(1)[0]
+    assert rate > 0
+    assert abs(best["width"] + 11) <= 2 and abs(best["offset"] + 44) <= 3 and best["ext_offset"] == 7
+
+
+def test_max_attempts():
+    search = AdaptiveSearch(SPACE, lambda params: "normal", max_attempts=50)
+    assert len(search.run()) == 50
@@ -0,0 +1,43 @@
+import numpy as np
+
+from glitch_helpers.segment import cycle_matrix, loop_exits, loop_period, novelty, rank_ext_offsets
+
+SPC = 4
+
+
+def synthetic_traces(k=30, seed=0):
+    """10 setup cycles, a 5 cycle loop body run 6 times, then 15 cycles after the loop."""
+    rng = np.random.RandomState(seed)
+    setup = rng.uniform(-1, 1, (10, SPC))
+    body = rng.uniform(-1, 1, (5, SPC))
+    tail = rng.uniform(-1, 1, (15, SPC))
+    clean = np.concatenate([setup, np.tile(body, (6, 1)), tail]).ravel()
+    return clean + rng.normal(0, 0.02, (k, len(clean)))
+
+
+def test_cycle_matrix():
+    traces = np.arange(22.0).reshape(2, 11)
+    cycles = cycle_matrix(traces, 4, start=1)
+    assert cycles.shape == (2, 2, 4)
+    assert cycles[0, 1].tolist() == [5, 6, 7, 8]
+
+
+def test_finds_the_loop_and_its_exit():
+    cycles = cycle_matrix(synthetic_traces(), SPC)
+    assert loop_period(cycles) == 5
+    exits = loop_exits(cycles, 5)
+    assert any(abs(c - 40) <= 1 for c in exits)
+    assert novelty(cycles)[0] == 0
+
+
+def test_ranking_puts_the_loop_exit_first():
+    ranked = rank_ext_offsets(synthetic_traces(), samples_per_cycle=SPC, top=5)
+    assert len(ranked) == len(set(ranked)) == 5
+    assert abs(ranked[0] - 40) <= 1
+
+
+def test_flat_traces():
+    traces = np.random.RandomState(1).normal(0, 0.01, (10, 200))
+    cycles = cycle_matrix(traces, SPC)
+    assert loop_exits(cycles, 0) == []
+    assert len(rank_ext_offsets(traces, samples_per_cycle=SPC, top=7)) == 7
@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+
+from glitch_helpers import sim
+
+
+def attempt(scope, target, data="x\n"):
+    target.flush()
+    scope.arm()
+    target.write(data)
+    timeout = scope.capture()
+    return timeout, target.read()
+
+
+def test_glitch_needs_hs2():
+    scope, target = sim.connect(fault_rate=lambda g: 1.0)
+    assert attempt(scope, target) == (False, "Denied\n")
+    scope.io.hs2 = "glitch"
+    assert attempt(scope, target) == (False, "Welcome\n")
+    scope.io.hs2 = "clkgen"
+    scope.io.glitch_lp = True
+    assert attempt(scope, target) == (False, "Welcome\n")
+
+
+def test_capture_without_trigger_times_out():
+    scope, target = sim.connect(hs2="glitch")
+    scope.arm()
+    assert scope.capture() is True
+    assert scope.capture() is True
+    assert target.read() == ""
+
+
+def test_reset_fault_hangs_until_reset():
+    scope, target = sim.connect(fault_rate=lambda g: (0.0, 1.0), hs2="glitch")
+    assert attempt(scope, target) == (True, "")
+    assert scope.adc.state
+    target.fault_rate = lambda g: 0.0
+    assert attempt(scope, target) == (True, "")
+    sim.reset_target(scope)
+    assert target.read() == "hello\n"
+    assert attempt(scope, target) == (False, "Denied\n")
+    assert not scope.adc.state
+
+
+def test_pdic_resets_target():
+    scope, target = sim.connect(fault_rate=lambda g: (0.0, 1.0), hs2="glitch")
+    attempt(scope, target)
+    scope.io.pdic = "low"
+    scope.io.pdic = "high_z"
+    assert target.read() == "hello\n"
+    assert not target._hung
+
+
+def test_glitch1_triggers_on_reset():
+    scope, target = sim.connect(fault_rate=lambda g: 1.0, firmware="glitch1", hs2="glitch")
+    scope.arm()
+    sim.reset_target(scope)
+    assert scope.capture() is False
+    assert target.read() == "hello\nA1234"
+    target.fault_rate = lambda g: (0.0, 1.0)
+    scope.arm()
+    sim.reset_target(scope)
+    scope.capture()
+    response = target.read()
+    assert response.startswith("hello\nA") and len(response) == 11
+
+
+def test_bootloader_leaks_on_glitch():
+    scope, target = sim.connect(fault_rate=lambda g: 0.0, firmware="bootloader", hs2="glitch")
+    assert attempt(scope, target, "p00\n") == (False, "r1\n")
+    assert attempt(scope, target, sim.BOOTLOADER_COMMAND) == (False, "r0\n")
+    target.fault_rate = lambda g: 1.0
+    timeout, response = attempt(scope, target, sim.BOOTLOADER_COMMAND)
+    assert response.startswith("r0") and len(response) == 2 + 64 + 1
+
+
+def test_glitch_inf_counter_lines():
+    scope, target = sim.connect(fault_rate=lambda g: 1.0, firmware="glitch_inf", hs2="glitch")
+    assert target.in_waiting() == len("40000 200 200\n")
+    assert target.read() == "40000 200 200\n"
+    scope.glitch.trigger_src = "ext_continuous"
+    target.in_waiting()
+    count = int(target.read().split()[0])
+    assert 40000 - 200 <= count < 40000
+    target.fault_rate = lambda g: (0.0, 1.0)
+    target.in_waiting()
+    assert target.read() == "hello\n"
+
+
+def test_fault_map_probabilities():
+    fmap = sim.default_fault_map("glitch3")
+    success, reset = fmap.probabilities(-11, -44, 7)
+    assert success == pytest.approx(0.35, abs=0.01)
+    assert fmap.probabilities(-11, -44, 20)[0] < 1e-6
+    assert fmap.probabilities(-40, 40, 7) == pytest.approx((0.0, 0.002))
+    scope, _ = sim.connect()
+    scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset = -11, -44, 7
+    assert fmap(scope.glitch) == (success, reset)
+    assert fmap(scope.glitch) is fmap(scope.glitch)
+    s, r = fmap.grid([-11, -6], [-44, -20], ext_offset=7)
+    assert s.shape == (2, 2) and s[0, 0] == success
+    assert r[1, 0] > r[0, 0]
+    with pytest.raises(ValueError):
+        sim.default_fault_map("glitch2")
+
+
+def test_fault_map_success_rate():
+    scope, target = sim.connect(fault_rate=sim.default_fault_map("glitch3"), hs2="glitch")
+    scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset = -11, -44, 7
+    wins = 0
+    for _ in range(400):
+        timeout, response = attempt(scope, target)
+        if timeout:
+            sim.reset_target(scope)
+        wins += response == "Welcome\n"
+    assert 100 < wins < 180
+
+
+def test_trig_jitter():
+    scope, target = sim.connect(hs2="glitch")
+    counts = []
+    for _ in range(3):
+        attempt(scope, target)
+        counts.append(scope.adc.trig_count)
+    assert counts == [1000] * 3
+    scope, target = sim.connect(hs2="glitch", trig_jitter=5.0)
+    counts = []
+    for _ in range(200):
+        attempt(scope, target)
+        counts.append(scope.adc.trig_count)
+    assert 2 < np.std(counts) < 8
+
+
+def test_traces_show_glitch():
+    scope, target = sim.connect(fault_rate=lambda g: 1.0, hs2="glitch")
+    scope.adc.samples = 1000
+    scope.glitch.ext_offset = 50
+    attempt(scope, target)
+    glitched = scope.get_last_trace()
+    target.fault_rate = lambda g: 0.0
+    attempt(scope, target)
+    normal = scope.get_last_trace()
+    assert len(glitched) == 1000
+    assert np.mean(glitched[200:400] - normal[200:400]) == pytest.approx(0.2, abs=0.01)
+    assert np.abs(glitched[:200] - normal[:200]).max() < 0.05
+
+
+def test_unknown_firmware():
+    with pytest.raises(ValueError):
+        sim.connect(firmware="glitch2")
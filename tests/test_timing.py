@@ -0,0 +1,50 @@
+import pytest
+
+from glitch_helpers import sim
+from glitch_helpers.timing import JitterTracker, TriggerProfiler
+
+
+def profiler(trig_jitter=0.0):
+    scope, target = sim.connect(trig_jitter=trig_jitter, seed=2)
+
+    def run_once():
+        scope.arm()
+        target.write("x\n")
+        scope.capture()
+        return target.read()
+    return scope, TriggerProfiler(scope, run_once)
+
+
+def test_fixed_timing_matches_fault3_window():
+    scope, prof = profiler()
+    with pytest.raises(ValueError):
+        prof.stats()
+    prof.capture(20)
+    assert prof.stats()["median"] == scope.adc.trig_count == 1000
+    assert prof.window("CWLITEARM") == range(1000 - 22, 1000 - 19)
+    assert prof.window("CWLITEXMEGA") == range(1000 - 15, 1000)
+    assert sorted(prof.ranked_offsets("CWLITEARM")) == list(range(978, 981))
+
+
+def test_jitter_widens_the_window():
+    _, prof = profiler(trig_jitter=3.0)
+    prof.capture(300)
+    s = prof.stats()
+    assert s["min"] < 1000 < s["max"]
+    w = prof.window("CWLITEARM")
+    assert w.start < 978 and w.stop > 981
+    ranked = prof.ranked_offsets("CWLITEARM")
+    assert sorted(ranked) == list(w)
+    assert ranked[0] in range(977, 982)
+
+
+def test_jitter_tracker_notices_drift():
+    scope, prof = profiler(trig_jitter=1.0)
+    prof.capture(100)
+    tracker = JitterTracker(prof, alpha=0.1)
+    for _ in range(50):
+        tracker.update(1000)
+    assert not tracker.drifted()
+    for _ in range(100):
+        tracker.update(1020)
+    assert tracker.drifted()
@@ -0,0 +1,71 @@
+import threading
+
+from glitch_helpers import sim
+from glitch_helpers.uart import GLITCH_INF_COUNT, LineReader, do_glitch, monitor, parse_counter
+
+
+class Chunks(object):
+    """Target that hands out the queued chunks one read at a time."""
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+        self.lock = threading.Lock()
+
+    def add(self, chunk):
+        with self.lock:
+            self.chunks.append(chunk)
+
+    def in_waiting(self):
+        with self.lock:
+            return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, num=0, timeout=0):
+        with self.lock:
+            return self.chunks.pop(0)
+
+
+def test_parse_counter():
+    assert parse_counter("40000 200 200") == GLITCH_INF_COUNT
+    assert parse_counter("39871 200 200\r") == 39871
+    assert parse_counter("hello") is None
+    assert parse_counter("") is None
+
+
+def test_lines_split_across_reads():
+    with LineReader(Chunks("40000 2", "00 200\n3999", "9 1 1\nhel")) as reader:
+        assert reader.readline(timeout=1) == "40000 200 200"
+        assert reader.readline(timeout=1) == "39999 1 1"
+        assert reader.readline(timeout=0.05) is None
+
+
+def test_sync_drops_the_partial_line():
+    target = Chunks("40000 200 200\n400")
+    with LineReader(target) as reader:
+        assert reader.readline(timeout=1) == "40000 200 200"
+        reader.sync()
+        target.add("00 200 200\n39000 1 1\n")
+        assert reader.readline(timeout=1) == "39000 1 1"
+
+
+def test_do_glitch_against_sim():
+    scope, target = sim.connect(fault_rate=lambda g: 1.0, firmware="glitch_inf", hs2="glitch")
+    scope.glitch.trigger_src = "ext_continuous"
+    calls = []
+    with LineReader(target) as reader:
+        assert do_glitch(reader, scope, calls.append, calls.append) == (1, 0)
+    scope.io.hs2 = "clkgen"
+    target.flush()
+    with LineReader(target) as reader:
+        assert do_glitch(reader, scope, calls.append, calls.append) == (0, 0)
+        rows = list(monitor(reader, lines=3))
+    assert calls == []
+    assert [r[1] for r in rows] == [GLITCH_INF_COUNT] * 3
+
+
+def test_do_glitch_recovers_a_silent_target():
+    scope, _ = sim.connect()
+    calls = []
+    with LineReader(Chunks()) as reader:
+        result = do_glitch(reader, scope, lambda s: calls.append("on"), lambda s: calls.append("off"),
+                           timeout=0.01)
+    assert result == (0, 0)
+    assert calls == ["off", "on"]
@@ -0,0 +1,73 @@
+import asyncio
+
+from glitch_helpers import sim
+from glitch_helpers.uart_mux import LineSplitter, UartMux
+
+
+def glitch_on(scope):
+    scope.glitch.trigger_src = "ext_continuous"
+
+
+def glitch_off(scope):
+    scope.glitch.trigger_src = "manual"
+
+
+class Silent(object):
+    def in_waiting(self):
+        return 0
+
+
+def test_line_splitter():
+    lines = LineSplitter()
+    assert lines.feed("40000 2") == []
+    assert lines.feed("00 200\n39999 200 200\nhel") == ["40000 200 200", "39999 200 200"]
+    lines.clear()
+    assert lines.feed("lo\n") == ["lo"]
+
+
+def test_glitches_and_resets_are_reported_per_target():
+    mux = UartMux(silence=5.0)
+    seen = []
+    for name, rate in (("quiet", 0.0), ("faulty", (0.05, 0.01))):
+        scope, target = sim.connect(fault_rate=lambda g, rate=rate: rate, firmware="glitch_inf",
+                                    hs2="glitch", seed=1)
+        glitch_on(scope)
+        mux.add(name, scope, target, glitch_on=glitch_on, glitch_off=glitch_off,
+                on_event=seen.append)
+    mux.run_sync(0.3)
+    summary = mux.summary()
+    assert summary["quiet"]["lines"] > 50
+    assert summary["quiet"]["glitch"] == summary["quiet"]["reset"] == 0
+    faulty = summary["faulty"]
+    assert faulty["glitch"] > 0 and faulty["reset"] > 0
+    assert faulty["recoveries"] == faulty["reset"]
+    assert len(seen) == len(mux.events) == faulty["glitch"] + faulty["reset"]
+    glitches = [e for e in mux.events if e.kind == "glitch"]
+    assert all(e.name == "faulty" and e.count < 40000 for e in glitches)
+
+
+def test_silent_target_is_recovered():
+    calls = []
+    mux = UartMux(silence=0.05, settle=0)
+    mux.add("dead", None, Silent(), glitch_on=lambda s: calls.append("on"),
+            glitch_off=lambda s: calls.append("off"))
+    mux.add("alive", *sim.connect(firmware="glitch_inf"))
+
+    async def notify(event):
+        calls.append(event.kind)
+    mux.on_event = notify
+    mux.run_sync(0.2)
+    assert mux.channels["dead"].counts["silent"] >= 2
+    assert calls[:4] == ["silent", "off", "on", "silent"]
+    assert mux.summary()["alive"]["silent"] == 0
+
+
+def test_stop_ends_run():
+    mux = UartMux()
+    mux.add("t", *sim.connect(firmware="glitch_inf"))
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.05, mux.stop)
+        await mux.run()
+    asyncio.run(main())
+    assert mux.summary()["t"]["lines"] > 0